@@ -2,7 +2,6 @@ import eel
 import os
 import tkinter
 from tkinter import filedialog
-import base64
 import threading
 import sys
 import platform
@@ -13,20 +12,46 @@ from ctypes import wintypes
 import signal
 import atexit
 import socket
+import functools
+import logging
+import multiprocessing
 
 from src.core import edificio as edificio_logic  
 from src.core.db_manager import DBManager
+from src.core.db_pool import PoolTimeout
+from src.core.migrations import run_migrations
+from src.core.workers import offload, get_worker_stats, shutdown_workers
 from src.core.login import check_admin_credentials
 from src.core import residentes as residentes_logic
 from src.core import contratos as contratos_logic
 from src.core import pagos as pagos_logic
+from src.core import file_server
 from settings.config import APP_TITLE
 
 db_manager = DBManager()
 
+logger = logging.getLogger(__name__)
+
+def with_db_session(func):
+    # PoolTimeout llega a la interfaz como llamada rechazada, igual que WorkerQueueFull; utils.js avisa al usuario.
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            with db_manager.session():
+                return func(*args, **kwargs)
+        except PoolTimeout as err:
+            logger.warning("%s: %s", func.__name__, err)
+            raise
+    return wrapper
+
 def cleanup():
     print("\n🧹 Limpiando recursos...")
     
+    try:
+        shutdown_workers()
+    except Exception as e:
+        print(f"⚠️  Error al detener workers: {e}")
+    
     try:
         if db_manager:
             db_manager.close()
@@ -97,58 +122,104 @@ def check_port_available(port=8080):
 
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_torres():
     return edificio_logic.get_torres_list(db_manager)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def create_torre(nombre):
     return edificio_logic.create_torre(db_manager, nombre)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def delete_torre(id_torre):
     return edificio_logic.delete_torre(db_manager, id_torre)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def update_torre(id_torre, nombre):
     return edificio_logic.update_torre(db_manager, id_torre, nombre)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_departamentos_by_torre(id_torre):
     return edificio_logic.get_deptos_by_torre(db_manager, id_torre)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_estacionamientos_by_torre(id_torre):
     return edificio_logic.get_estac_by_torre(db_manager, id_torre)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def create_departamento(id_torre, numero, piso):
     return edificio_logic.create_departamento(db_manager, id_torre, numero, piso)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def create_departamentos_batch(id_torre, numero_inicio, numero_fin, piso):
     return edificio_logic.create_departamentos_batch(db_manager, id_torre, numero_inicio, numero_fin, piso)
 
 @eel.expose
+@offload('db')
+@with_db_session
+def create_departamentos_ranges(id_torre, rangos, piso=None):
+    return edificio_logic.create_departamentos_ranges(db_manager, id_torre, rangos, piso)
+
+@eel.expose
+@offload('db')
+@with_db_session
+def create_departamentos_layout(id_torre, piso_inicio, piso_fin, unidades_por_piso):
+    return edificio_logic.create_departamentos_layout(db_manager, id_torre, piso_inicio, piso_fin, unidades_por_piso)
+
+@eel.expose
+@offload('db')
+@with_db_session
 def delete_departamento(id_depto):
     return edificio_logic.delete_departamento(db_manager, id_depto)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def update_departamento(id_depto, numero, piso):
     return edificio_logic.update_departamento(db_manager, id_depto, numero, piso)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def create_estacionamiento(id_torre, box_numero, tipo):
     return edificio_logic.create_estacionamiento(db_manager, id_torre, box_numero, tipo)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def create_estacionamientos_batch(id_torre, box_inicio, box_fin, tipo):
     return edificio_logic.create_estacionamientos_batch(db_manager, id_torre, box_inicio, box_fin, tipo)
 
 @eel.expose
+@offload('db')
+@with_db_session
+def create_estacionamientos_ranges(id_torre, rangos_por_tipo):
+    return edificio_logic.create_estacionamientos_ranges(db_manager, id_torre, rangos_por_tipo)
+
+@eel.expose
+@offload('db')
+@with_db_session
 def delete_estacionamiento(id_estac):
     return edificio_logic.delete_estacionamiento(db_manager, id_estac)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def update_estacionamiento(id_estac, box_numero, tipo):
     return edificio_logic.update_estacionamiento(db_manager, id_estac, box_numero, tipo)
 
@@ -159,75 +230,109 @@ def ping():
     return "pong"
 
 @eel.expose
+@offload('db')
 def reconnect_db():
     return db_manager.connect()
 
 @eel.expose
+def get_db_pool_stats():
+    return db_manager.get_pool_stats()
+
+@eel.expose
+def get_db_diagnostics(limit=50):
+    diagnostics = db_manager.get_diagnostics(limit)
+    diagnostics['workers'] = get_worker_stats()
+    return diagnostics
+
+@eel.expose
+@offload('db')
+@with_db_session
 def check_credentials(rut, password):
     return check_admin_credentials(db_manager, rut, password)
 
 
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_residentes_list(search_term=None, status='Activo'):
     return residentes_logic.get_list(db_manager, search_term, status)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_form_data(resident_id=None):
     return residentes_logic.get_details_for_form(db_manager, resident_id)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def save_resident_data(data, resident_id=None):
     return residentes_logic.save(db_manager, data, resident_id)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def delete_residente_by_id(residente_id):
     return residentes_logic.delete_by_id(db_manager, residente_id)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def reactivate_residente_by_id(residente_id):
     return residentes_logic.reactivate_by_id(db_manager, residente_id)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def permanently_delete_residente_by_id(residente_id):
     return residentes_logic.permanently_delete_by_id(db_manager, residente_id)
 
 
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_contract_templates_list():
     return contratos_logic.get_list(db_manager)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_contract_template_details(template_id):
     return contratos_logic.get_details(db_manager, template_id)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def save_contract_template_data(data, template_id=None):
     return contratos_logic.save(db_manager, data, template_id)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def delete_contract_template_by_id(template_id):
     return contratos_logic.delete_by_id(db_manager, template_id)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_contract_file_data(template_id):
     return contratos_logic.get_file(db_manager, template_id)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def download_contract_file(template_id):
     try:
-        file_data = contratos_logic.get_raw_file(db_manager, template_id)
-        if not file_data or not file_data.get('datos_archivo'):
+        file_data = contratos_logic.get_file(db_manager, template_id, download=True)
+        if not file_data:
             return {'success': False, 'message': "Error: No se encontraron los datos del archivo."}
 
-      
-        content_b64 = base64.b64encode(file_data['datos_archivo']).decode('utf-8')
-
         return {
             'success': True,
             'filename': file_data['nombre_archivo'],
-            'content_b64': content_b64
+            'url': file_data['url']
         }
             
     except Exception as e:
@@ -248,21 +353,6 @@ def select_contract_pdf():
     root.destroy()
     return file_path
     
-@eel.expose
-def get_contract_file_data_from_path(file_path):
-    if not file_path:
-        return {'success': False, 'message': 'No se proporcionó una ruta de archivo.'}
-    try:
-        with open(file_path, 'rb') as f:
-            file_bytes = f.read()
-        
-        content_b64 = base64.b64encode(file_bytes).decode('utf-8')
-        
-        return {'success': True, 'content_b64': content_b64}
-    except FileNotFoundError:
-        return {'success': False, 'message': 'El archivo no fue encontrado en la ruta especificada.'}
-    except Exception as e:
-        return {'success': False, 'message': f'Error al leer el archivo: {e}'}
 
 
 
@@ -271,66 +361,101 @@ def get_uf_info():
     return pagos_logic.get_uf_data()
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_resident_status_list():
     return pagos_logic.get_resident_status_list(db_manager)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_resident_debt_details(resident_id):
     return pagos_logic.get_resident_debt_details(db_manager, resident_id)
 
 @eel.expose
+@offload('db')
+@with_db_session
+def get_debt_table():
+    return pagos_logic.get_debt_table(db_manager)
+
+@eel.expose
+@offload('db')
+@with_db_session
 def process_payment(resident_id, meses_a_pagar, cobrar_multas):
     return pagos_logic.process_payment(db_manager, resident_id, meses_a_pagar, cobrar_multas)
 
 @eel.expose
-def get_payment_history(filters):
-    return pagos_logic.get_payment_history(db_manager, filters)
+@offload('db')
+@with_db_session
+def get_payment_history(filters, cursor=None, page_size=None):
+    return pagos_logic.get_payment_history(db_manager, filters, cursor, page_size)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def update_payment_record(payment_id, data):
     return pagos_logic.update_payment_record(db_manager, payment_id, data)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def get_all_active_residents_for_dropdown():
     return pagos_logic.get_all_active_residents_for_dropdown(db_manager)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def create_payment_adjustment(resident_id, periodo, monto, observaciones):
     return pagos_logic.create_payment_adjustment(db_manager, resident_id, periodo, monto, observaciones)
 
 @eel.expose
+@offload('db')
+@with_db_session
 def delete_payment_record(payment_id):
     return pagos_logic.delete_payment_record(db_manager, payment_id)
 
 @eel.expose
+@offload('reports')
 def export_payment_history_to_excel(records):
     return pagos_logic.export_payment_history_to_excel(records)
 
 @eel.expose
+@offload('reports')
 def export_payment_history_to_csv(records):
     return pagos_logic.export_payment_history_to_csv(records)
 
 @eel.expose
+@offload('reports')
 def export_payment_history_to_pdf(records):
     return pagos_logic.export_payment_history_to_pdf_current_view(records)
 
 @eel.expose
+@offload('reports')
+@with_db_session
 def export_full_history_to_excel(filters):
     return pagos_logic.export_full_history_to_excel(db_manager, filters)
 
 @eel.expose
+@offload('reports')
+@with_db_session
 def export_full_history_to_csv(filters):
     return pagos_logic.export_full_history_to_csv(db_manager, filters)
 
 @eel.expose
+@offload('reports')
+@with_db_session
 def export_full_history_to_pdf(filters):
     return pagos_logic.export_payment_history_to_pdf(db_manager, filters)
 
 @eel.expose
+@offload('reports')
+@with_db_session
 def export_audit_log_to_excel():
     return pagos_logic.export_audit_log_to_excel(db_manager)
 
 @eel.expose
+@offload('reports')
+@with_db_session
 def export_audit_log_to_csv():
     return pagos_logic.export_audit_log_to_csv(db_manager)
 
@@ -419,7 +544,9 @@ def main():
             print("   Luego: taskkill /F /PID [número_del_proceso]")
             sys.exit(1)
     
-    db_manager.connect()
+    if db_manager.connect():
+        with db_manager.session():
+            run_migrations(db_manager)
     
     uf_thread = threading.Thread(target=pagos_logic.periodic_uf_updater, daemon=True)
     uf_thread.start()
@@ -430,6 +557,7 @@ def main():
         eel_folder = os.path.join(os.path.dirname(__file__), 'src', 'ui', 'templates')
 
     eel.init(eel_folder)
+    file_server.register_routes()
     
     
     start_page = 'login.html'
@@ -461,4 +589,6 @@ def main():
         raise
 
 if __name__ == '__main__':
+    # Necesario para los workers de proceso en el ejecutable empaquetado.
+    multiprocessing.freeze_support()
     main()
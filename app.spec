@@ -4,7 +4,7 @@ a = Analysis(
     ['app.py'],
     pathex=[],
     binaries=[],
-    datas=[('src/ui/templates', 'ui/templates')],
+    datas=[('src/ui/templates', 'ui/templates'), ('database/migrations', 'database/migrations')],
     hiddenimports=['passlib.handlers.pbkdf2', 'pyodbc'],
     hookspath=[],
     hooksconfig={},
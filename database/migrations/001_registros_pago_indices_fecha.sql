@@ -0,0 +1,9 @@
+-- Índices para los filtros del historial de pagos (rango de fechas, ajustes y multas).
+-- El historial ordena por fecha_pago DESC, id DESC y filtra por rangos semiabiertos de fecha_pago.
+-- explain: SELECT id FROM registros_pago WHERE fecha_pago >= '2024-01-01' AND fecha_pago < '2024-02-01' ORDER BY fecha_pago DESC, id DESC
+-- El filtro de multas no lleva índice propio: monto_multa > 0 se evalúa sobre las filas del rango de fechas.
+-- explain: SELECT id FROM registros_pago WHERE estado = 'Ajuste' ORDER BY fecha_pago DESC
+-- explain: SELECT id FROM registros_pago WHERE monto_multa > 0 AND fecha_pago >= '2024-01-01' AND fecha_pago < '2024-02-01' ORDER BY fecha_pago DESC, id DESC
+
+ALTER TABLE `registros_pago` ADD INDEX `idx_fecha_pago_id` (`fecha_pago`, `id`);
+ALTER TABLE `registros_pago` ADD INDEX `idx_estado_fecha_pago` (`estado`, `fecha_pago`);
@@ -0,0 +1,6 @@
+-- Índices para los filtros por estado de residentes y por contrato vigente de un residente.
+-- explain: SELECT id FROM residentes WHERE estado = 'Activo' ORDER BY nombre_completo
+-- explain: SELECT id FROM contratos WHERE id_residente = 1 AND estado = 'Vigente'
+
+ALTER TABLE `residentes` ADD INDEX `idx_estado_nombre` (`estado`, `nombre_completo`);
+ALTER TABLE `contratos` ADD INDEX `idx_residente_estado` (`id_residente`, `estado`);
@@ -0,0 +1,37 @@
+# Mueve los PDF de contratos_archivos.datos_archivo al almacén de archivos en disco;
+# en la tabla quedan solo el hash SHA-256 y el tamaño.
+from src.core.migrations import _execute_tolerant
+
+# Antes de migrar la columna no existe: el runner informa ese EXPLAIN como no disponible y sigue.
+EXPLAIN = ["SELECT id FROM contratos_archivos WHERE hash_archivo = 'x'"]
+
+def _columns(cursor):
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'contratos_archivos'
+    """)
+    return {row[0] for row in cursor.fetchall()}
+
+def upgrade(db_manager, cursor):
+    _execute_tolerant(cursor, "ALTER TABLE contratos_archivos ADD COLUMN hash_archivo CHAR(64) NULL AFTER nombre_archivo")
+    _execute_tolerant(cursor, "ALTER TABLE contratos_archivos ADD COLUMN tamano_archivo BIGINT NULL AFTER hash_archivo")
+    _execute_tolerant(cursor, "ALTER TABLE contratos_archivos ADD INDEX idx_hash_archivo (hash_archivo)")
+
+    if 'datos_archivo' not in _columns(cursor):
+        return
+
+    cursor.execute("SELECT id FROM contratos_archivos WHERE datos_archivo IS NOT NULL ORDER BY id")
+    ids = [row[0] for row in cursor.fetchall()]
+    for template_id in ids:
+        # De a un archivo para no cargar todos los PDF en memoria.
+        cursor.execute("SELECT datos_archivo FROM contratos_archivos WHERE id = %s", (template_id,))
+        data = cursor.fetchall()[0][0]
+        digest, size = db_manager.blob_store.put_bytes(data)
+        cursor.execute(
+            "UPDATE contratos_archivos SET hash_archivo = %s, tamano_archivo = %s WHERE id = %s",
+            (digest, size, template_id)
+        )
+        print(f"   Plantilla {template_id}: {size} bytes -> {digest[:12]}…")
+
+    # Los archivos ya están escritos en disco; el DDL confirma las actualizaciones anteriores.
+    cursor.execute("ALTER TABLE contratos_archivos DROP COLUMN datos_archivo")
@@ -0,0 +1,20 @@
+# Estado de pagos materializado por contrato: el listado de estados lee una fila por contrato
+# en lugar de todo registros_pago. Se mantiene al escribir pagos (DBManager._refresh_payment_status).
+from src.core.migrations import _execute_tolerant
+
+# Antes de migrar la tabla no existe: el runner informa ese EXPLAIN como no disponible y sigue.
+EXPLAIN = ["SELECT mes_base, meses_pagados FROM estado_pagos_contrato WHERE id_contrato = 1"]
+
+def upgrade(db_manager, cursor):
+    _execute_tolerant(cursor, """
+        CREATE TABLE estado_pagos_contrato (
+            id_contrato INT NOT NULL PRIMARY KEY,
+            mes_base INT NOT NULL,
+            meses_pagados BLOB NOT NULL,
+            primer_mes_impago INT NOT NULL,
+            ultimo_pago DATETIME NULL,
+            actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            CONSTRAINT fk_estado_pagos_contrato FOREIGN KEY (id_contrato) REFERENCES contratos (id) ON DELETE CASCADE
+        )
+    """)
+    db_manager._refresh_payment_status()
@@ -1,4 +1,10 @@
 import os
+import sys
+
+if getattr(sys, 'frozen', False):
+    BASE_DIR = os.path.dirname(sys.executable)
+else:
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 DB_CONFIG = {
     'host': os.environ.get('DB_HOST', '127.0.0.1'),
@@ -9,6 +15,67 @@ DB_CONFIG = {
     'raise_on_warnings': True,
     'use_pure': True  
 }
+
+DB_POOL_CONFIG = {
+    'size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    'ping_after': float(os.environ.get('DB_POOL_PING_AFTER', 60)),
+    'statement_cache_size': int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 64))
+}
+
+# Conexión de solo lectura para reportes y exportaciones; por defecto apunta al mismo servidor.
+# Con DB_REPORT_HOST/DB_REPORT_PORT puede apuntar a una réplica.
+DB_REPORT_CONFIG = {
+    **DB_CONFIG,
+    'host': os.environ.get('DB_REPORT_HOST', DB_CONFIG['host']),
+    'port': int(os.environ.get('DB_REPORT_PORT', DB_CONFIG['port'])),
+    'user': os.environ.get('DB_REPORT_USER', DB_CONFIG['user']),
+    'password': os.environ.get('DB_REPORT_PASSWORD', DB_CONFIG['password']),
+    'autocommit': True,
+    # Se aplica también al reconectar.
+    'init_command': "SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED, READ ONLY"
+}
+
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+
+# Cada exportación en curso retiene una conexión de reportes mientras transmite filas; el pool deja dos
+# libres para las lecturas de pantalla (estado, historial, deuda). DBManager nunca lo abre más chico que REPORT_WORKERS + 1.
+DB_REPORT_POOL_CONFIG = {
+    'enabled': os.environ.get('DB_REPORT_ENABLED', '1') == '1',
+    'size': int(os.environ.get('DB_REPORT_POOL_SIZE', REPORT_WORKERS + 2)),
+    'timeout': float(os.environ.get('DB_REPORT_POOL_TIMEOUT', 30)),
+    'ping_after': float(os.environ.get('DB_POOL_PING_AFTER', 60)),
+    'statement_cache_size': int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 64))
+}
+BLOB_STORE_DIR = os.environ.get('BLOB_STORE_DIR', os.path.join(BASE_DIR, 'data', 'blobs'))
+CONTRACT_MAX_FILE_MB = float(os.environ.get('CONTRACT_MAX_FILE_MB', 50))
+FILE_LINK_TTL = float(os.environ.get('FILE_LINK_TTL', 120))
+PAYMENT_HISTORY_PAGE_SIZE = int(os.environ.get('PAYMENT_HISTORY_PAGE_SIZE', 100))
+RESOURCES_CACHE_TTL = float(os.environ.get('RESOURCES_CACHE_TTL', 300))
+
+DB_METRICS_CONFIG = {
+    'enabled': os.environ.get('DB_METRICS_ENABLED', '1') == '1',
+    'slow_query_ms': float(os.environ.get('DB_SLOW_QUERY_MS', 200)),
+    'slow_log_path': os.environ.get('DB_SLOW_LOG_PATH', os.path.join(BASE_DIR, 'logs', 'slow_queries.log')),
+    'explain': os.environ.get('DB_SLOW_QUERY_EXPLAIN', '1') == '1'
+}
+
+# Las llamadas expuestas a la interfaz se ejecutan fuera del bucle de eventos de Eel.
+# 'kind' puede ser 'thread' o 'process'; al llenarse la cola se rechaza la llamada.
+WORKER_POOLS_CONFIG = {
+    'db': {
+        'kind': 'thread',
+        'workers': int(os.environ.get('DB_WORKERS', DB_POOL_CONFIG['size'])),
+        'queue_size': int(os.environ.get('DB_WORKER_QUEUE', 32)),
+        'queue_timeout': float(os.environ.get('DB_WORKER_QUEUE_TIMEOUT', 5))
+    },
+    'reports': {
+        'kind': os.environ.get('REPORT_WORKER_KIND', 'thread'),
+        'workers': REPORT_WORKERS,
+        'queue_size': int(os.environ.get('REPORT_WORKER_QUEUE', 4)),
+        'queue_timeout': float(os.environ.get('REPORT_WORKER_QUEUE_TIMEOUT', 1))
+    }
+}
 APP_TITLE = "Gestión de Estacionamiento"
 
 
@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.core.periodos import month_index
+
+AL_DIA, PENDIENTE, ATRASADO, ADELANTADO = 0, 1, 2, 3
+ESTADOS = ('Al día', 'Pendiente', 'Atrasado', 'Adelantado')
+DIAS_ATRASADO = 30
+
+# datetime64[M] cuenta meses desde enero de 1970.
+_EPOCH_MONTH = 1970 * 12
+
+
+def _month_dates(months):
+    return (months - _EPOCH_MONTH).astype('datetime64[M]').astype('datetime64[D]')
+
+
+def months_paid(bitmaps, mes_base, month):
+    # Bit de `month` en el mapa de meses pagados de cada contrato (ver payment_status), sin recorrerlos uno a uno:
+    # los mapas se concatenan y se lee el byte de cada uno por su desplazamiento.
+    lengths = np.fromiter(map(len, bitmaps), dtype=np.int64, count=len(bitmaps))
+    data = np.frombuffer(b''.join(bitmaps), dtype=np.uint8)
+    offset = month - np.asarray(mes_base, dtype=np.int64)
+    byte = offset // 8
+    inside = (offset >= 0) & (byte < lengths)
+    values = np.zeros(len(bitmaps), dtype=np.int64)
+    values[inside] = data[(np.cumsum(lengths) - lengths + byte)[inside]]
+    return inside & ((values >> (offset % 8)) & 1).astype(bool)
+
+
+# Días de atraso y estado a partir del primer mes impago ya conocido de cada contrato.
+def evaluate_arrears(first_unpaid, start_days, paid_ahead, today):
+    first_unpaid = np.asarray(first_unpaid, dtype=np.int64)
+    start_days = np.asarray(start_days, dtype=np.int64)
+    paid_ahead = np.asarray(paid_ahead, dtype=bool)
+    current = month_index(today)
+
+    month_dates = _month_dates(first_unpaid)
+    month_lengths = (_month_dates(first_unpaid + 1) - month_dates).astype(np.int64)
+    due = month_dates + (np.minimum(start_days, month_lengths) - 1).astype('timedelta64[D]')
+    overdue = (np.datetime64(today, 'D') - due).astype(np.int64)
+    overdue = np.where((first_unpaid <= current) & (overdue > 0), overdue, 0)
+
+    return {
+        'first_unpaid': first_unpaid,
+        'dias_atraso': overdue,
+        'estado': _status_codes(overdue, paid_ahead),
+        'paid_ahead': paid_ahead,
+    }
+
+
+def _status_codes(overdue, paid_ahead):
+    return np.select(
+        [overdue >= DIAS_ATRASADO, overdue > 0, paid_ahead],
+        [ATRASADO, PENDIENTE, ADELANTADO],
+        AL_DIA
+    )
+
+
+def aggregate_by_group(result, groups, group_count):
+    # Un residente toma el mayor atraso de sus contratos y queda Adelantado si alguno pagó el mes siguiente.
+    groups = np.asarray(groups, dtype=np.int64)
+    overdue = np.zeros(group_count, dtype=np.int64)
+    np.maximum.at(overdue, groups, result['dias_atraso'])
+    paid_ahead = np.zeros(group_count, dtype=bool)
+    paid_ahead[groups[result['paid_ahead']]] = True
+    return {'dias_atraso': overdue, 'estado': _status_codes(overdue, paid_ahead)}
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+CHUNK_SIZE = 1024 * 1024
+
+_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+# Cada archivo se guarda bajo su SHA-256: contenido idéntico ocupa un solo archivo en disco.
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path_for(self, digest):
+        if not _DIGEST.match(str(digest or '')):
+            raise ValueError(f"Hash de archivo inválido: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.isfile(self.path_for(digest))
+
+    def size(self, digest):
+        try:
+            return os.path.getsize(self.path_for(digest))
+        except FileNotFoundError:
+            raise BlobNotFound(f"No se encontró el archivo {digest} en el almacén.")
+
+    def put_stream(self, chunks, validate=None, max_size=None):
+        # Se escribe a un temporal mientras se calcula el hash y luego se mueve a su ruta definitiva.
+        # validate recibe el primer bloque y puede lanzar ValueError para rechazar el archivo.
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if size == 0 and validate:
+                        validate(chunk)
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise ValueError(f"El archivo supera el tamaño máximo de {max_size // (1024 * 1024)} MB.")
+                    sha256.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+            digest = sha256.hexdigest()
+            path = self.path_for(digest)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return digest, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put_bytes(self, data, validate=None, max_size=None):
+        return self.put_stream([bytes(data)], validate, max_size)
+
+    def put_file(self, file_path, validate=None, max_size=None):
+        with open(file_path, 'rb') as f:
+            return self.put_stream(iter(lambda: f.read(CHUNK_SIZE), b''), validate, max_size)
+
+    @contextmanager
+    def lock(self, digest):
+        # Serializa, para un mismo contenido, el alta de una referencia y el borrado del archivo.
+        with self._locks_guard:
+            entry = self._locks.setdefault(digest, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[digest]
+
+    def delete(self, digest):
+        try:
+            os.remove(self.path_for(digest))
+            return True
+        except FileNotFoundError:
+            return False
@@ -1,6 +1,7 @@
-import base64
 import os
 from decimal import Decimal, InvalidOperation
+from src.core import file_server
+from settings.config import CONTRACT_MAX_FILE_MB
 
 def get_list(db_manager):
     return db_manager.get_contract_templates()
@@ -11,19 +12,27 @@ def get_details(db_manager, template_id):
         del details['datos_archivo']
     return details
 
+def _check_pdf(first_chunk):
+    if not first_chunk.startswith(b'%PDF-'):
+        raise ValueError("El archivo seleccionado no es un PDF válido.")
+
+def store_file(db_manager, file_path):
+    # Se lee por bloques desde la ruta elegida: el contenido no pasa por la interfaz.
+    if not file_path or not os.path.isfile(file_path):
+        raise ValueError("El archivo no fue encontrado en la ruta especificada.")
+    if not file_path.lower().endswith('.pdf'):
+        raise ValueError("El archivo seleccionado no es un PDF.")
+    return db_manager.blob_store.put_file(file_path, _check_pdf, int(CONTRACT_MAX_FILE_MB * 1024 * 1024))
+
 def save(db_manager, data, template_id=None):
-    pdf_data = None
+    file_path = None
 
     if not template_id:
-        file_content_b64 = data.get('file_content_b64')
-        if not file_content_b64:
+        file_path = data.pop('file_path', None)
+        if not file_path:
             return False, "Error: No se ha subido ningún archivo."
-        
-        try:
-            pdf_data = base64.b64decode(file_content_b64)
-            del data['file_content_b64']
-        except (base64.binascii.Error, TypeError) as e:
-            return False, f"Error al decodificar el archivo: {e}"
+        if not data.get('nombre_archivo'):
+            data['nombre_archivo'] = os.path.basename(file_path)
 
     print(f"DEBUG: Datos recibidos en save: {data}")
     
@@ -55,17 +64,28 @@ def save(db_manager, data, template_id=None):
         print(f"DEBUG: Error de validación: {e}")
         return False, f"Error de validación: {str(e)}"
 
-    return db_manager.save_contract_template(data, pdf_data, template_id)
+    # El archivo se guarda después de validar los datos para no dejar archivos huérfanos.
+    stored_file = None
+    if file_path:
+        try:
+            stored_file = store_file(db_manager, file_path)
+        except ValueError as e:
+            return False, f"Error: {e}"
+        except OSError as e:
+            return False, f"Error al leer el archivo: {e}"
+
+    return db_manager.save_contract_template(data, stored_file, template_id)
 
 def delete_by_id(db_manager, template_id):
     return db_manager.delete_contract_template(template_id)
 
-def get_file(db_manager, template_id):
+def get_file(db_manager, template_id, download=False):
     file_data = db_manager.get_contract_file(template_id)
-    if file_data and file_data.get('datos_archivo'):
-        file_data['datos_archivo'] = base64.b64encode(file_data['datos_archivo']).decode('utf-8')
-        return file_data
-    return None
-
-def get_raw_file(db_manager, template_id):
-    return db_manager.get_contract_file(template_id)
\ No newline at end of file
+    if not file_data or not file_data.get('hash_archivo'):
+        return None
+    path = db_manager.blob_store.path_for(file_data['hash_archivo'])
+    if not os.path.isfile(path):
+        print(f"Error: falta el archivo de la plantilla {template_id} en el almacén.")
+        return None
+    file_data['url'] = file_server.create_link(path, file_data['nombre_archivo'], download)
+    return file_data
\ No newline at end of file
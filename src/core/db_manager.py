@@ -1,76 +1,382 @@
 import mysql.connector
-from settings.config import DB_CONFIG
+from mysql.connector.constants import FieldType
+from settings.config import DB_CONFIG, DB_POOL_CONFIG, DB_REPORT_CONFIG, DB_REPORT_POOL_CONFIG, REPORT_WORKERS, DB_METRICS_CONFIG, BLOB_STORE_DIR, PAYMENT_HISTORY_PAGE_SIZE, RESOURCES_CACHE_TTL
+from src.core.blob_store import BlobNotFound, BlobStore
+from src.core.db_metrics import InstrumentedConnection, QueryMetrics
+from src.core.db_pool import ConnectionPool
+from src.core.payment_status import build_statuses
+from src.core.search_index import ResidentSearchIndex
+from contextlib import contextmanager
 from decimal import Decimal, InvalidOperation
-import binascii
-import decimal
 import datetime
+import functools
+import json
 import os
+import threading
+import time
 
-def _clean_db_results(result):
-    if result is None:
-        return result
-    if isinstance(result, list):
-        return [_clean_db_results(row) for row in result]
-    
-    cleaned_row = {}
-    for key, value in result.items():
-        if isinstance(value, (datetime.date, decimal.Decimal)):
-            cleaned_row[key] = str(value)
-        else:
-            cleaned_row[key] = value
-    return cleaned_row
+LOST_CONNECTION_ERRNOS = {2006, 2013, 2055}
+
+def _is_connection_lost(err):
+    return isinstance(err, mysql.connector.Error) and err.errno in LOST_CONNECTION_ERRNOS
+
+def _retry_on_lost_connection(func):
+    @functools.wraps(func)
+    def wrapper(db_manager, *args, **kwargs):
+        try:
+            return func(db_manager, *args, **kwargs)
+        except mysql.connector.Error as err:
+            if not _is_connection_lost(err):
+                raise
+            db_manager._drop_lost_connection()
+            pool = db_manager._route_pool()
+            if pool:
+                pool.read_retried()
+            return func(db_manager, *args, **kwargs)
+    return wrapper
+
+def _read_only(snapshot=False):
+    # Los métodos marcados leen desde la conexión de reportes y no compiten con las escrituras.
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(db_manager, *args, **kwargs):
+            with db_manager.reporting(snapshot):
+                return func(db_manager, *args, **kwargs)
+        return wrapper
+    return decorator
+
+_STRING_CONVERTED_TYPES = {
+    FieldType.DATE, FieldType.NEWDATE, FieldType.DATETIME, FieldType.TIMESTAMP,
+    FieldType.DECIMAL, FieldType.NEWDECIMAL
+}
+
+def _row_converter(description, native=False):
+    names = [column[0] for column in description]
+    string_columns = [] if native else [i for i, column in enumerate(description) if column[1] in _STRING_CONVERTED_TYPES]
+
+    if not string_columns:
+        return lambda row: dict(zip(names, row))
+
+    def convert(row):
+        values = list(row)
+        for i in string_columns:
+            if values[i] is not None:
+                values[i] = str(values[i])
+        return dict(zip(names, values))
+    return convert
+
+def _fetch_all(cursor, native=False):
+    rows = cursor.fetchall()
+    if not rows:
+        return []
+    convert = _row_converter(cursor.description, native)
+    return [convert(row) for row in rows]
+
+def _fetch_one(cursor, native=False):
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return _row_converter(cursor.description, native)(row)
+
+def _explain(connection, query, params=()):
+    # EXPLAIN deja una nota (1003) con la consulta reescrita; con raise_on_warnings se convertiría en error.
+    raise_on_warnings = connection.raise_on_warnings
+    connection.raise_on_warnings = False
+    cursor = connection.cursor()
+    try:
+        cursor.execute("EXPLAIN " + query, params)
+        return _fetch_all(cursor, native=True)
+    finally:
+        cursor.close()
+        connection.raise_on_warnings = raise_on_warnings
+
+def _load_json(value):
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    return json.loads(value)
+
+def _filter_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value).strip()[:10])
+
+def _encode_history_cursor(fecha_pago, row_id):
+    fecha = fecha_pago.isoformat() if fecha_pago is not None else ''
+    return f"{fecha}|{row_id}"
+
+def _decode_history_cursor(value):
+    fecha, _, row_id = str(value).partition('|')
+    after_fecha = datetime.datetime.fromisoformat(fecha) if fecha else None
+    return after_fecha, int(row_id)
+
+BULK_PAYMENT_CHUNK_SIZE = 500
+
+_BULK_PAYMENT_ROW = "(%s, %s, NOW(), %s, %s, 'Pagado', %s, %s)"
+
+# Un período ya 'Pagado' solo suma la multa; cualquier otro estado se sobrescribe.
+# Las filas repetidas dentro del mismo INSERT ven el registro recién insertado, igual que el recorrido fila a fila.
+# estado se asigna al final porque las asignaciones anteriores leen el valor previo.
+_BULK_PAYMENT_UPSERT = """
+    INSERT INTO registros_pago (id_contrato, periodo, fecha_pago, monto_esperado, monto_multa, estado, monto_pagado, observaciones)
+    VALUES {values} AS nuevo
+    ON DUPLICATE KEY UPDATE
+        fecha_pago = IF(registros_pago.estado = 'Pagado' AND nuevo.monto_multa > 0, registros_pago.fecha_pago, nuevo.fecha_pago),
+        monto_esperado = IF(registros_pago.estado = 'Pagado' AND nuevo.monto_multa > 0, registros_pago.monto_esperado, nuevo.monto_esperado),
+        monto_pagado = IF(registros_pago.estado = 'Pagado' AND nuevo.monto_multa > 0, registros_pago.monto_pagado + nuevo.monto_multa, nuevo.monto_pagado),
+        observaciones = IF(registros_pago.estado = 'Pagado' AND nuevo.monto_multa > 0, CONCAT(registros_pago.observaciones, %s, nuevo.observaciones), nuevo.observaciones),
+        monto_multa = IF(registros_pago.estado = 'Pagado' AND nuevo.monto_multa > 0, registros_pago.monto_multa + nuevo.monto_multa, nuevo.monto_multa),
+        estado = 'Pagado'
+"""
+
+_PAYMENT_STATUS_UPSERT = """
+    INSERT INTO estado_pagos_contrato (id_contrato, mes_base, meses_pagados, primer_mes_impago, ultimo_pago)
+    VALUES {values} AS nuevo
+    ON DUPLICATE KEY UPDATE
+        mes_base = nuevo.mes_base,
+        meses_pagados = nuevo.meses_pagados,
+        primer_mes_impago = nuevo.primer_mes_impago,
+        ultimo_pago = nuevo.ultimo_pago
+"""
 
 class DBManager:
     def __init__(self):
         self.config = DB_CONFIG
-        self.connection = None
+        self.pool_config = DB_POOL_CONFIG
+        self.pool = None
+        self.report_config = DB_REPORT_CONFIG
+        self.report_pool_config = DB_REPORT_POOL_CONFIG
+        self.report_pool = None
+        self._local = threading.local()
+        self.metrics = None
+        if DB_METRICS_CONFIG['enabled']:
+            self.metrics = QueryMetrics(DB_METRICS_CONFIG['slow_query_ms'], DB_METRICS_CONFIG['slow_log_path'], DB_METRICS_CONFIG['explain'])
+        self.search_index = ResidentSearchIndex()
+        self.blob_store = BlobStore(BLOB_STORE_DIR)
+        self._resources_lock = threading.Lock()
+        self._resources_cache = None
+        self._resources_version = 0
 
-    def connect(self):
+    @property
+    def connection(self):
+        slot = getattr(self._local, self._slot_name(), None)
+        return slot.raw if slot else None
+
+    def _slot_name(self):
+        return 'report_slot' if getattr(self._local, 'reporting', False) else 'slot'
+
+    def _route_pool(self):
+        return self.report_pool if getattr(self._local, 'reporting', False) else self.pool
+
+    def _connection_wrapper(self):
+        return (lambda raw: InstrumentedConnection(raw, self.metrics)) if self.metrics else None
+
+    def _open_report_pool(self):
+        options = {k: v for k, v in self.report_pool_config.items() if k != 'enabled'}
+        if not self.report_pool_config.get('enabled') or options['size'] < 1:
+            return None
+        # Con una conexión por worker de reportes ocupada en exportaciones, las lecturas de pantalla quedarían sin ninguna.
+        options['size'] = max(options['size'], REPORT_WORKERS + 1)
         try:
-            if self.connection and self.connection.is_connected():
-                self.connection.close()
-            
-            self.connection = mysql.connector.connect(**self.config)
-            return True
+            pool = ConnectionPool(self.report_config, connection_wrapper=self._connection_wrapper(), **options)
+            pool.warm()
+            return pool
         except mysql.connector.Error as err:
-            self.connection = None
+            print(f"⚠️  Conexión de reportes no disponible ({err}); se usará la conexión principal.")
+            return None
+
+    def connect(self):
+        self._release()
+        try:
+            new_pool = ConnectionPool(self.config, connection_wrapper=self._connection_wrapper(), **self.pool_config)
+            new_pool.warm()
+        except mysql.connector.Error:
             return False
 
+        old_pool, self.pool = self.pool, new_pool
+        if old_pool:
+            old_pool.close()
+        old_report_pool, self.report_pool = self.report_pool, self._open_report_pool()
+        if old_report_pool:
+            old_report_pool.close()
+        return True
+
     def _ensure_connection(self):
+        name = self._slot_name()
+        if getattr(self._local, name, None) is not None:
+            return
+        if self.pool is None and not self.connect():
+            return
+
+        try:
+            slot = self._route_pool().acquire()
+            if name == 'report_slot' and self._local.snapshot:
+                self._start_snapshot(slot)
+            setattr(self._local, name, slot)
+        except mysql.connector.Error as err:
+            print(f"Error al obtener conexión del pool: {err}")
+        # PoolTimeout se propaga: con el pool agotado no hay que devolver resultados vacíos como si no hubiera datos.
+
+    def _start_snapshot(self, slot):
+        # READ COMMITTED no admite CONSISTENT SNAPSHOT; solo esta transacción sube a REPEATABLE READ.
+        cursor = slot.raw.cursor()
+        try:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+        except mysql.connector.Error:
+            slot.pool.release(slot, discard=True)
+            raise
+        finally:
+            cursor.close()
+
+    def _drop_lost_connection(self):
+        name = self._slot_name()
+        slot = getattr(self._local, name, None)
+        if slot is not None:
+            setattr(self._local, name, None)
+            slot.pool.connection_lost(slot)
+
+    def _release(self):
+        slot = getattr(self._local, 'slot', None)
+        if slot is not None:
+            self._local.slot = None
+            slot.pool.release(slot)
+
+    def _prepared_execute(self, sql, params=()):
+        return getattr(self._local, self._slot_name()).statements.execute(sql, params)
+
+    def _prepared_fetch_all(self, sql, params=(), native=False):
+        return _fetch_all(self._prepared_execute(sql, params), native)
+
+    def _prepared_fetch_one(self, sql, params=(), native=False):
+        rows = self._prepared_fetch_all(sql, params, native)
+        return rows[0] if rows else None
+
+    @contextmanager
+    def session(self):
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
         try:
-            if not self.connection or not self.connection.is_connected():
-                raise mysql.connector.Error("Conexión no existente o cerrada.")
-            self.connection.ping(reconnect=True, attempts=3, delay=2)
+            yield self
         except mysql.connector.Error as err:
+            if _is_connection_lost(err):
+                self._drop_lost_connection()
+            raise
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                self._release()
+
+    @contextmanager
+    def reporting(self, snapshot=False):
+        # Dentro del bloque las consultas usan la conexión de reportes; con snapshot todas ven el mismo estado.
+        if getattr(self._local, 'reporting', False):
+            yield self
+            return
+        if self.pool is None:
             self.connect()
+        if self.report_pool is None:
+            yield self
+            return
+
+        self._local.reporting = True
+        self._local.snapshot = snapshot
+        try:
+            yield self
+        except mysql.connector.Error as err:
+            if _is_connection_lost(err):
+                self._drop_lost_connection()
+            raise
+        finally:
+            slot = getattr(self._local, 'report_slot', None)
+            self._local.report_slot = None
+            self._local.reporting = False
+            if slot is not None:
+                slot.pool.release(slot)
+
+    def _load_search_index(self):
+        self._ensure_connection()
+        if not self.connection:
+            return False
+        version = self.search_index.version
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT r.id, r.nombre_completo, r.rut, r.estado, GROUP_CONCAT(v.patente SEPARATOR ',')
+                FROM residentes r
+                LEFT JOIN residente_vehiculo rv ON r.id = rv.id_residente
+                LEFT JOIN vehiculos v ON rv.id_vehiculo = v.id
+                GROUP BY r.id
+            """)
+            rows = [(rid, nombre, rut, estado, patentes.split(',') if patentes else ())
+                    for rid, nombre, rut, estado, patentes in cursor.fetchall()]
+        finally:
+            cursor.close()
+        return self.search_index.load(rows, version)
+
+    def _resident_search_ids(self, search_term, status=None):
+        # Devuelve None si el índice no está disponible o el término es muy corto o muy amplio; el llamador usa LIKE en ese caso.
+        if not self.search_index.loaded and not self._load_search_index():
+            return None
+        return self.search_index.search(search_term, status)
+
+    def _update_search_index(self, resident_id, data, estado):
+        patentes = [v['patente'] for v in data.get('vehiculos', []) if v.get('patente')]
+        self.search_index.upsert(resident_id, data['residente']['nombre_completo'], data['residente']['rut'], estado, patentes)
+
+    def invalidate_resources_cache(self):
+        with self._resources_lock:
+            self._resources_version += 1
+            self._resources_cache = None
+
+    def get_pool_stats(self):
+        if not self.pool:
+            return {}
+        stats = self.pool.stats()
+        stats['reporting'] = self.report_pool.stats() if self.report_pool else None
+        return stats
+
+    def get_diagnostics(self, limit=50):
+        return {
+            'pool': self.get_pool_stats(),
+            'metrics_enabled': self.metrics is not None,
+            'slow_query_ms': self.metrics.slow_query_ms if self.metrics else None,
+            'queries': self.metrics.summary(limit) if self.metrics else []
+        }
 
     def close(self):
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        self._release()
+        if self.pool:
+            self.pool.close()
+        if self.report_pool:
+            self.report_pool.close()
 
+    @_retry_on_lost_connection
     def get_all_active_residents_for_dropdown(self):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return []
-        cursor = self.connection.cursor(dictionary=True)
+        cursor = self.connection.cursor()
         try:
             cursor.execute("SELECT id, nombre_completo, rut FROM residentes WHERE estado = 'Activo' ORDER BY nombre_completo")
-            return _clean_db_results(cursor.fetchall())
+            return _fetch_all(cursor)
         finally:
             cursor.close()
 
     def create_payment_adjustment(self, resident_id, periodo, monto, observaciones):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return False, "Sin conexión a la base de datos."
         cursor = self.connection.cursor()
         try:
-            cursor.execute("SELECT id FROM contratos WHERE id_residente = %s AND estado = 'Vigente' LIMIT 1", (resident_id,))
-            contrato = cursor.fetchone()
+            contrato = self._prepared_fetch_one("SELECT id FROM contratos WHERE id_residente = %s AND estado = 'Vigente' LIMIT 1", (resident_id,))
             if not contrato:
                 return False, "El residente seleccionado no tiene un contrato vigente."
             
-            id_contrato = contrato[0]
+            id_contrato = contrato['id']
             monto_decimal = Decimal(monto)
             
             query = """
@@ -80,6 +386,7 @@ class DBManager:
             """
             params = (id_contrato, periodo, monto_decimal, observaciones)
             cursor.execute(query, params)
+            self._refresh_payment_status([id_contrato])
             self.connection.commit()
             return True, "Ajuste creado correctamente."
         except (mysql.connector.Error, InvalidOperation) as err:
@@ -90,13 +397,17 @@ class DBManager:
 
     def delete_payment_record(self, payment_id):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return False, "Sin conexión a la base de datos."
         cursor = self.connection.cursor()
         try:
+            cursor.execute("SELECT id_contrato FROM registros_pago WHERE id = %s", (payment_id,))
+            contract_ids = [row[0] for row in cursor.fetchall()]
             cursor.execute("DELETE FROM registros_pago WHERE id = %s", (payment_id,))
+            rows_deleted = cursor.rowcount
+            self._refresh_payment_status(contract_ids)
             self.connection.commit()
-            if cursor.rowcount > 0:
+            if rows_deleted > 0:
                 return True, "Registro de pago eliminado correctamente."
             else:
                 return False, "No se encontró el registro de pago para eliminar."
@@ -106,14 +417,7 @@ class DBManager:
         finally:
             cursor.close()
 
-    def get_payment_history(self, filters):
-        self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
-            return {"error": "Conexion_Perdida"}
-        
-        cursor = self.connection.cursor(dictionary=True)
-        
-        query = """
+    _PAYMENT_HISTORY_SELECT = """
             SELECT
                 rp.id,
                 r.nombre_completo AS residente_nombre,
@@ -129,56 +433,184 @@ class DBManager:
             JOIN contratos c ON rp.id_contrato = c.id
             JOIN residentes r ON c.id_residente = r.id
         """
-        
+
+    def _payment_history_filters(self, filters):
         params = []
         where_conditions = []
 
         if filters.get('residente'):
-            where_conditions.append("(r.nombre_completo LIKE %s OR r.rut LIKE %s)")
-            params.extend([f"%{filters['residente']}%", f"%{filters['residente']}%"])
+            resident_ids = self._resident_search_ids(filters['residente'])
+            if resident_ids is None:
+                where_conditions.append("(r.nombre_completo LIKE %s OR r.rut LIKE %s)")
+                params.extend([f"%{filters['residente']}%", f"%{filters['residente']}%"])
+            elif resident_ids:
+                where_conditions.append(f"r.id IN ({','.join(['%s'] * len(resident_ids))})")
+                params.extend(sorted(resident_ids))
+            else:
+                where_conditions.append("FALSE")
         
+        # Rangos semiabiertos sobre la columna para que MySQL pueda usar idx_fecha_pago_id.
         if filters.get('fecha_desde'):
-            where_conditions.append("DATE(rp.fecha_pago) >= %s")
-            params.append(filters['fecha_desde'])
+            where_conditions.append("rp.fecha_pago >= %s")
+            params.append(_filter_date(filters['fecha_desde']))
             
         if filters.get('fecha_hasta'):
-            where_conditions.append("DATE(rp.fecha_pago) <= %s")
-            params.append(filters['fecha_hasta'])
+            where_conditions.append("rp.fecha_pago < %s")
+            params.append(_filter_date(filters['fecha_hasta']) + datetime.timedelta(days=1))
 
         if filters.get('tipo'):
             if filters['tipo'] == 'Multa':
                 where_conditions.append("rp.monto_multa > 0")
             elif filters['tipo'] == 'Ajuste':
                 where_conditions.append("rp.estado = 'Ajuste'")
-        
+
+        return where_conditions, params
+
+    def _payment_history_query(self, filters):
+        where_conditions, params = self._payment_history_filters(filters)
+        query = self._PAYMENT_HISTORY_SELECT
         if where_conditions:
             query += " WHERE " + " AND ".join(where_conditions)
-            
-        query += " ORDER BY rp.fecha_pago DESC, r.nombre_completo"
-        
+        query += " ORDER BY rp.fecha_pago DESC, rp.id DESC"
+        return query, tuple(params)
+
+    def _iter_query(self, query, params=(), native=True, batch_size=500, read_only=False):
+        # El generador toma su propia conexión de reportes: entre filas el llamador puede usar la principal.
+        slot = None
+        finished = False
+        if read_only and not getattr(self._local, 'reporting', False):
+            if self.pool is None:
+                self.connect()
+            if self.report_pool is not None:
+                slot = self.report_pool.acquire()
         try:
-            cursor.execute(query, tuple(params))
-            records = _clean_db_results(cursor.fetchall())
-            
-            total_arriendo = sum(Decimal(r.get('monto_arriendo', '0') or '0') for r in records if r['estado'] != 'Ajuste')
-            total_multas = sum(Decimal(r.get('monto_multa', '0') or '0') for r in records if r['estado'] != 'Ajuste')
-            total_ajustes = sum(Decimal(r.get('monto_pagado', '0') or '0') for r in records if r['estado'] == 'Ajuste')
-            total_general = sum(Decimal(r.get('monto_pagado', '0') or '0') for r in records)
-
-            summary = {
-                "total_arriendo": str(total_arriendo),
-                "total_multas": str(total_multas),
-                "total_ajustes": str(total_ajustes),
-                "total_general": str(total_general)
-            }
-            
-            return {"records": records, "summary": summary}
+            if slot is None:
+                self._ensure_connection()
+            connection = slot.raw if slot is not None else self.connection
+            if not connection:
+                return
+            cursor = connection.cursor(buffered=False)
+            try:
+                cursor.execute(query, params)
+                convert = _row_converter(cursor.description, native)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield convert(row)
+                finished = True
+            finally:
+                # Si el consumidor corta a mitad de lectura quedan filas pendientes en la conexión.
+                if not finished and slot is None:
+                    try:
+                        connection.consume_results()
+                    except mysql.connector.Error:
+                        pass
+                try:
+                    cursor.close()
+                except mysql.connector.Error:
+                    if finished:
+                        raise
+        except mysql.connector.Error as err:
+            if slot is not None and _is_connection_lost(err):
+                slot.pool.connection_lost(slot)
+                slot = None
+            raise
         finally:
-            cursor.close()
+            # Una conexión de reportes propia con un resultado sin leer no vuelve al pool: leer el resto costaría más que abrir otra.
+            if slot is not None:
+                slot.pool.release(slot, discard=not finished)
+
+    def iter_payment_history(self, filters, native=True):
+        query, params = self._payment_history_query(filters)
+        return self._iter_query(query, params, native, read_only=True)
+
+    @_read_only(snapshot=True)
+    @_retry_on_lost_connection
+    def get_payment_history(self, filters, native=False, cursor=None, page_size=None):
+        self._ensure_connection()
+        if not self.connection:
+            return {"error": "Conexion_Perdida"}
+
+        page_size = max(1, int(page_size or PAYMENT_HISTORY_PAGE_SIZE))
+        try:
+            where_conditions, params = self._payment_history_filters(filters)
+        except ValueError:
+            return {"error": "Fecha de filtro inválida."}
+
+        page_conditions = list(where_conditions)
+        page_params = list(params)
+        if cursor:
+            try:
+                after_fecha, after_id = _decode_history_cursor(cursor)
+            except ValueError:
+                return {"error": "Cursor de paginación inválido."}
+            # Con ORDER BY ... DESC los NULL quedan al final.
+            if after_fecha is None:
+                page_conditions.append("(rp.fecha_pago IS NULL AND rp.id < %s)")
+                page_params.append(after_id)
+            else:
+                page_conditions.append("(rp.fecha_pago < %s OR (rp.fecha_pago = %s AND rp.id < %s) OR rp.fecha_pago IS NULL)")
+                page_params.extend([after_fecha, after_fecha, after_id])
+
+        query = self._PAYMENT_HISTORY_SELECT
+        if page_conditions:
+            query += " WHERE " + " AND ".join(page_conditions)
+        query += " ORDER BY rp.fecha_pago DESC, rp.id DESC LIMIT %s"
+        page_params.append(page_size + 1)
+
+        db_cursor = self.connection.cursor()
+        try:
+            db_cursor.execute(query, tuple(page_params))
+            rows = db_cursor.fetchall()
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            col = {column[0]: i for i, column in enumerate(db_cursor.description)}
+            convert = _row_converter(db_cursor.description, native)
+            records = [convert(row) for row in rows]
+
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                next_cursor = _encode_history_cursor(last[col['fecha_pago']], last[col['id']])
+
+            # El resumen solo se calcula al abrir la primera página.
+            summary = None
+            if not cursor:
+                summary = self._payment_history_summary(db_cursor, where_conditions, params)
+
+            return {"records": records, "summary": summary, "next_cursor": next_cursor}
+        finally:
+            db_cursor.close()
+
+    def _payment_history_summary(self, cursor, where_conditions, params):
+        query = """
+            SELECT
+                COUNT(*) AS total_registros,
+                COALESCE(SUM(CASE WHEN rp.estado <> 'Ajuste' THEN rp.monto_esperado END), 0) AS total_arriendo,
+                COALESCE(SUM(CASE WHEN rp.estado <> 'Ajuste' THEN rp.monto_multa END), 0) AS total_multas,
+                COALESCE(SUM(CASE WHEN rp.estado = 'Ajuste' THEN rp.monto_pagado END), 0) AS total_ajustes,
+                COALESCE(SUM(rp.monto_pagado), 0) AS total_general
+            FROM registros_pago rp
+            JOIN contratos c ON rp.id_contrato = c.id
+            JOIN residentes r ON c.id_residente = r.id
+        """
+        if where_conditions:
+            query += " WHERE " + " AND ".join(where_conditions)
+        cursor.execute(query, tuple(params))
+        total_registros, total_arriendo, total_multas, total_ajustes, total_general = cursor.fetchone()
+        return {
+            "total_registros": int(total_registros),
+            "total_arriendo": str(total_arriendo),
+            "total_multas": str(total_multas),
+            "total_ajustes": str(total_ajustes),
+            "total_general": str(total_general)
+        }
 
     def update_payment_record(self, payment_id, data):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return False, "Sin conexión a la base de datos."
         cursor = self.connection.cursor()
         try:
@@ -198,6 +630,9 @@ class DBManager:
                 payment_id
             )
             cursor.execute(query, params)
+            # monto_esperado decide si el mes cuenta como pagado en el estado materializado.
+            cursor.execute("SELECT id_contrato FROM registros_pago WHERE id = %s", (payment_id,))
+            self._refresh_payment_status([row[0] for row in cursor.fetchall()])
             self.connection.commit()
             return True, "Registro de pago actualizado correctamente."
         except (mysql.connector.Error, InvalidOperation) as err:
@@ -206,11 +641,12 @@ class DBManager:
         finally:
             cursor.close()
             
+    @_retry_on_lost_connection
     def get_residentes_list(self, search_term=None, status='Activo'):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): 
+        if not self.connection: 
             return {"error": "Conexion_Perdida"}
-        cursor = self.connection.cursor(dictionary=True)
+        cursor = self.connection.cursor()
         
         query = """
             SELECT
@@ -227,93 +663,100 @@ class DBManager:
         params.append(status)
 
         if search_term:
-            where_conditions.append("(r.nombre_completo LIKE %s OR r.rut LIKE %s)")
-            params.extend([f"%{search_term}%", f"%{search_term}%"])
+            resident_ids = self._resident_search_ids(search_term, status)
+            if resident_ids is None:
+                where_conditions.append("(r.nombre_completo LIKE %s OR r.rut LIKE %s)")
+                params.extend([f"%{search_term}%", f"%{search_term}%"])
+            elif not resident_ids:
+                return []
+            else:
+                where_conditions.append(f"r.id IN ({','.join(['%s'] * len(resident_ids))})")
+                params.extend(sorted(resident_ids))
         
         query += " WHERE " + " AND ".join(where_conditions)
         query += " GROUP BY r.id ORDER BY r.nombre_completo"
         cursor.execute(query, tuple(params))
-        return _clean_db_results(cursor.fetchall())
+        return _fetch_all(cursor)
 
+    @_retry_on_lost_connection
     def get_resident_details(self, resident_id):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return {}
-        cursor = self.connection.cursor(dictionary=True)
+        cursor = self.connection.cursor()
         try:
-            
+            # Cada colección se agrega en su propia subconsulta para no multiplicar filas entre ellas.
             query = """
                 SELECT 
                     r.id, r.nombre_completo, r.rut, r.email, r.telefono, r.estado,
-                    ps.nombre_completo as pagador_nombre, ps.rut as pagador_rut,
-                    d.id as depto_id, d.numero as depto_numero, t_d.nombre as depto_torre,
-                    v.id as vehiculo_id, v.patente, v.marca, v.modelo, v.tag, v.tipo as vehiculo_tipo,
-                    c.id as contrato_id, c.id_contrato_archivo, c.fecha_inicio,
-                    e.id as est_id, e.box_numero as est_box_numero, t_e.nombre as est_torre, e.tipo as est_tipo
+                    (SELECT JSON_ARRAYAGG(JSON_OBJECT('nombre_completo', ps.nombre_completo, 'rut', ps.rut))
+                     FROM pagadores_secundarios ps
+                     WHERE ps.id_residente = r.id) AS pagadores_secundarios,
+                    (SELECT JSON_ARRAYAGG(JSON_OBJECT('id', d.id, 'numero', d.numero, 'torre', t_d.nombre))
+                     FROM residente_departamento rd
+                     JOIN departamentos d ON rd.id_departamento = d.id
+                     LEFT JOIN torres t_d ON d.id_torre = t_d.id
+                     WHERE rd.id_residente = r.id) AS departamentos,
+                    (SELECT JSON_ARRAYAGG(JSON_OBJECT('id', v.id, 'patente', v.patente, 'marca', v.marca, 'modelo', v.modelo, 'tag', v.tag, 'tipo', v.tipo))
+                     FROM residente_vehiculo rv
+                     JOIN vehiculos v ON rv.id_vehiculo = v.id
+                     WHERE rv.id_residente = r.id) AS vehiculos,
+                    (SELECT JSON_OBJECT('id', c.id, 'id_contrato_archivo', c.id_contrato_archivo, 'fecha_inicio', c.fecha_inicio)
+                     FROM contratos c
+                     WHERE c.id_residente = r.id AND c.estado = 'Vigente'
+                     ORDER BY c.id LIMIT 1) AS contrato,
+                    (SELECT JSON_ARRAYAGG(JSON_OBJECT('id', e.id, 'box_numero', e.box_numero, 'torre', t_e.nombre, 'tipo', e.tipo))
+                     FROM contratos c
+                     JOIN contrato_estacionamiento ce ON c.id = ce.id_contrato
+                     JOIN estacionamientos e ON ce.id_estacionamiento = e.id
+                     LEFT JOIN torres t_e ON e.id_torre = t_e.id
+                     WHERE c.id_residente = r.id AND c.estado = 'Vigente') AS estacionamientos
                 FROM residentes r
-                LEFT JOIN pagadores_secundarios ps ON r.id = ps.id_residente
-                LEFT JOIN residente_departamento rd ON r.id = rd.id_residente
-                LEFT JOIN departamentos d ON rd.id_departamento = d.id
-                LEFT JOIN torres t_d ON d.id_torre = t_d.id
-                LEFT JOIN residente_vehiculo rv ON r.id = rv.id_residente
-                LEFT JOIN vehiculos v ON rv.id_vehiculo = v.id
-                LEFT JOIN contratos c ON r.id = c.id_residente AND c.estado = 'Vigente'
-                LEFT JOIN contrato_estacionamiento ce ON c.id = ce.id_contrato
-                LEFT JOIN estacionamientos e ON ce.id_estacionamiento = e.id
-                LEFT JOIN torres t_e ON e.id_torre = t_e.id
-                WHERE r.id = %s;
+                WHERE r.id = %s
             """
             cursor.execute(query, (resident_id,))
-            rows = _clean_db_results(cursor.fetchall())
+            row = _fetch_one(cursor)
 
-            if not rows:
+            if not row:
                 return {}
 
-            
-            first_row = rows[0]
-            details = {
+            return {
                 'residente': {
-                    'id': first_row['id'], 'nombre_completo': first_row['nombre_completo'],
-                    'rut': first_row['rut'], 'email': first_row['email'],
-                    'telefono': first_row['telefono'], 'estado': first_row['estado']
+                    'id': row['id'], 'nombre_completo': row['nombre_completo'],
+                    'rut': row['rut'], 'email': row['email'],
+                    'telefono': row['telefono'], 'estado': row['estado']
                 },
-                'pagadores_secundarios': [], 'departamentos': [], 'vehiculos': [],
-                'contrato': None, 'estacionamientos': []
+                'pagadores_secundarios': _load_json(row['pagadores_secundarios']) or [],
+                'departamentos': _load_json(row['departamentos']) or [],
+                'vehiculos': _load_json(row['vehiculos']) or [],
+                'contrato': _load_json(row['contrato']),
+                'estacionamientos': _load_json(row['estacionamientos']) or []
             }
 
-            if first_row['contrato_id']:
-                details['contrato'] = {
-                    'id': first_row['contrato_id'],
-                    'id_contrato_archivo': first_row['id_contrato_archivo'],
-                    'fecha_inicio': first_row['fecha_inicio']
-                }
-
-            
-            pagadores_seen, deptos_seen, vehiculos_seen, est_seen = set(), set(), set(), set()
-
-            for row in rows:
-                if row['pagador_rut'] and row['pagador_rut'] not in pagadores_seen:
-                    details['pagadores_secundarios'].append({'nombre_completo': row['pagador_nombre'], 'rut': row['pagador_rut']})
-                    pagadores_seen.add(row['pagador_rut'])
-                if row['depto_id'] and row['depto_id'] not in deptos_seen:
-                    details['departamentos'].append({'id': row['depto_id'], 'numero': row['depto_numero'], 'torre': row['depto_torre']})
-                    deptos_seen.add(row['depto_id'])
-                if row['vehiculo_id'] and row['vehiculo_id'] not in vehiculos_seen:
-                    details['vehiculos'].append({'id': row['vehiculo_id'], 'patente': row['patente'], 'marca': row['marca'], 'modelo': row['modelo'], 'tag': row['tag'], 'tipo': row['vehiculo_tipo']})
-                    vehiculos_seen.add(row['vehiculo_id'])
-                if row['est_id'] and row['est_id'] not in est_seen:
-                    details['estacionamientos'].append({'id': row['est_id'], 'box_numero': row['est_box_numero'], 'torre': row['est_torre'], 'tipo': row['est_tipo']})
-                    est_seen.add(row['est_id'])
-
-            return details
-
         finally:
             cursor.close()
 
     def get_available_resources(self):
+        with self._resources_lock:
+            cached = self._resources_cache
+            version = self._resources_version
+        if cached and time.monotonic() - cached[0] < RESOURCES_CACHE_TTL:
+            return {key: list(rows) for key, rows in cached[1].items()}
+
+        resources = self._load_available_resources()
+        if resources:
+            with self._resources_lock:
+                # Si hubo una escritura mientras se consultaba, no se guarda el resultado.
+                if version == self._resources_version:
+                    self._resources_cache = (time.monotonic(), resources)
+            return {key: list(rows) for key, rows in resources.items()}
+        return resources
+
+    @_retry_on_lost_connection
+    def _load_available_resources(self):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): return {}
-        cursor = self.connection.cursor(dictionary=True)
+        if not self.connection: return {}
+        cursor = self.connection.cursor()
         resources = {}
         
         
@@ -324,7 +767,7 @@ class DBManager:
             WHERE d.estado = 'DISPONIBLE' 
             ORDER BY t.nombre, CAST(d.numero AS UNSIGNED)
         """)
-        resources['departamentos'] = _clean_db_results(cursor.fetchall())
+        resources['departamentos'] = _fetch_all(cursor)
         
         cursor.execute("""
             SELECT e.id, e.box_numero, t.nombre as torre, e.tipo 
@@ -333,62 +776,80 @@ class DBManager:
             WHERE e.estado = 'DISPONIBLE' 
             ORDER BY e.tipo, t.nombre, CAST(e.box_numero AS UNSIGNED)
         """)
-        resources['estacionamientos'] = _clean_db_results(cursor.fetchall())
+        resources['estacionamientos'] = _fetch_all(cursor)
         
         cursor.execute("SELECT id, nombre_contrato FROM contratos_archivos ORDER BY nombre_contrato")
-        resources['contratos_archivos'] = _clean_db_results(cursor.fetchall())
+        resources['contratos_archivos'] = _fetch_all(cursor)
 
         cursor.execute("SELECT id, nombre FROM torres ORDER BY nombre")
-        resources['torres'] = _clean_db_results(cursor.fetchall())
+        resources['torres'] = _fetch_all(cursor)
         
         return resources
 
     def _execute_transactional_update(self, cursor, resident_id, data, resident_status):
-        
-        depto_ids_to_remove = tuple(set(data.get("departamentos", [])) - {r['id_departamento'] for r in cursor.fetchall()})
-
+        # Cada diferencia se aplica con una sola sentencia para acortar los bloqueos sobre departamentos y estacionamientos.
         cursor.execute("UPDATE residentes SET nombre_completo=%s, rut=%s, email=%s, telefono=%s WHERE id=%s",
                        (data['residente']['nombre_completo'], data['residente']['rut'], data['residente']['email'], data['residente']['telefono'], resident_id))
         
         cursor.execute("SELECT id_departamento FROM residente_departamento WHERE id_residente = %s", (resident_id,))
         old_deptos = {r['id_departamento'] for r in cursor.fetchall()}
         new_deptos = set(map(int, data.get("departamentos", [])))
-        deptos_to_add = new_deptos - old_deptos
-        deptos_to_remove = old_deptos - new_deptos
+        deptos_to_add = tuple(sorted(new_deptos - old_deptos))
+        deptos_to_remove = tuple(sorted(old_deptos - new_deptos))
 
         if deptos_to_remove:
-            deptos_to_remove_tuple = tuple(deptos_to_remove)
             if resident_status == 'Activo':
-                cursor.execute(f"UPDATE departamentos SET estado = 'DISPONIBLE' WHERE id IN ({','.join(['%s'] * len(deptos_to_remove_tuple))})", deptos_to_remove_tuple)
-            cursor.execute(f"DELETE FROM residente_departamento WHERE id_residente = %s AND id_departamento IN ({','.join(['%s'] * len(deptos_to_remove_tuple))})", (resident_id,) + deptos_to_remove_tuple)
+                cursor.execute(f"UPDATE departamentos SET estado = 'DISPONIBLE' WHERE id IN ({','.join(['%s'] * len(deptos_to_remove))})", deptos_to_remove)
+            cursor.execute(f"DELETE FROM residente_departamento WHERE id_residente = %s AND id_departamento IN ({','.join(['%s'] * len(deptos_to_remove))})", (resident_id,) + deptos_to_remove)
         
-        for depto_id in deptos_to_add:
-            cursor.execute("INSERT INTO residente_departamento (id_residente, id_departamento) VALUES (%s, %s)", (resident_id, depto_id))
+        if deptos_to_add:
+            cursor.execute(f"INSERT INTO residente_departamento (id_residente, id_departamento) VALUES {', '.join(['(%s, %s)'] * len(deptos_to_add))}",
+                           tuple(value for depto_id in deptos_to_add for value in (resident_id, depto_id)))
             if resident_status == 'Activo':
-                cursor.execute("UPDATE departamentos SET estado = 'OCUPADO' WHERE id = %s", (depto_id,))
+                cursor.execute(f"UPDATE departamentos SET estado = 'OCUPADO' WHERE id IN ({','.join(['%s'] * len(deptos_to_add))})", deptos_to_add)
 
         cursor.execute("DELETE FROM pagadores_secundarios WHERE id_residente = %s", (resident_id,))
-        for pagador in data.get("pagadores_secundarios", []):
-            if pagador.get('nombre_completo') and pagador.get('rut'):
-                cursor.execute("INSERT INTO pagadores_secundarios (id_residente, nombre_completo, rut) VALUES (%s, %s, %s)",
-                               (resident_id, pagador["nombre_completo"], pagador["rut"]))
+        pagadores = [(resident_id, p["nombre_completo"], p["rut"]) for p in data.get("pagadores_secundarios", [])
+                     if p.get('nombre_completo') and p.get('rut')]
+        if pagadores:
+            cursor.execute(f"INSERT INTO pagadores_secundarios (id_residente, nombre_completo, rut) VALUES {', '.join(['(%s, %s, %s)'] * len(pagadores))}",
+                           tuple(value for pagador in pagadores for value in pagador))
 
         cursor.execute("SELECT v.id FROM vehiculos v JOIN residente_vehiculo rv ON v.id = rv.id_vehiculo WHERE rv.id_residente = %s", (resident_id,))
         old_vehicle_ids = {row['id'] for row in cursor.fetchall()}
         current_vehicle_ids = set()
+        vehicles_to_update = []
+        vehicles_to_insert = []
 
         for vehiculo in data.get("vehiculos", []):
             veh_id = vehiculo.get('id')
             if veh_id and veh_id in old_vehicle_ids:
-                cursor.execute("UPDATE vehiculos SET patente=%s, marca=%s, modelo=%s, tag=%s, tipo=%s WHERE id=%s",
-                               (vehiculo["patente"], vehiculo["marca"], vehiculo["modelo"], vehiculo["tag"], vehiculo["tipo"], veh_id))
+                vehicles_to_update.append((veh_id, vehiculo["patente"], vehiculo["marca"], vehiculo["modelo"], vehiculo["tag"], vehiculo["tipo"]))
                 current_vehicle_ids.add(veh_id)
             elif vehiculo.get("patente"):
-                cursor.execute("INSERT INTO vehiculos (patente, marca, modelo, tag, tipo) VALUES (%s, %s, %s, %s, %s)",
-                               (vehiculo["patente"], vehiculo["marca"], vehiculo["modelo"], vehiculo["tag"], vehiculo["tipo"]))
-                new_veh_id = cursor.lastrowid
-                cursor.execute("INSERT INTO residente_vehiculo (id_residente, id_vehiculo) VALUES (%s, %s)", (resident_id, new_veh_id))
-                current_vehicle_ids.add(new_veh_id)
+                vehicles_to_insert.append((vehiculo["patente"], vehiculo["marca"], vehiculo["modelo"], vehiculo["tag"], vehiculo["tipo"]))
+
+        if vehicles_to_update:
+            rows_sql = " UNION ALL ".join(
+                ["SELECT %s AS id, %s AS patente, %s AS marca, %s AS modelo, %s AS tag, %s AS tipo"] +
+                ["SELECT %s, %s, %s, %s, %s, %s"] * (len(vehicles_to_update) - 1)
+            )
+            cursor.execute(f"""
+                UPDATE vehiculos v
+                JOIN ({rows_sql}) AS datos ON v.id = datos.id
+                SET v.patente = datos.patente, v.marca = datos.marca, v.modelo = datos.modelo, v.tag = datos.tag, v.tipo = datos.tipo
+            """, tuple(value for vehiculo in vehicles_to_update for value in vehiculo))
+
+        if vehicles_to_insert:
+            cursor.execute(f"INSERT INTO vehiculos (patente, marca, modelo, tag, tipo) VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(vehicles_to_insert))}",
+                           tuple(value for vehiculo in vehicles_to_insert for value in vehiculo))
+            # Los id autoincrementales de un INSERT múltiple no son necesariamente consecutivos; se recuperan por patente (única).
+            patentes = tuple(vehiculo[0] for vehiculo in vehicles_to_insert)
+            cursor.execute(f"SELECT id FROM vehiculos WHERE patente IN ({','.join(['%s'] * len(patentes))})", patentes)
+            new_vehicle_ids = [row['id'] for row in cursor.fetchall()]
+            cursor.execute(f"INSERT INTO residente_vehiculo (id_residente, id_vehiculo) VALUES {', '.join(['(%s, %s)'] * len(new_vehicle_ids))}",
+                           tuple(value for veh_id in new_vehicle_ids for value in (resident_id, veh_id)))
+            current_vehicle_ids.update(new_vehicle_ids)
         
         vehicles_to_delete = old_vehicle_ids - current_vehicle_ids
         if vehicles_to_delete:
@@ -403,38 +864,83 @@ class DBManager:
         new_estacionamientos_ids = {e['id'] for e in new_estacionamientos_data}
 
         if contrato_actual:
-            cursor.execute("SELECT id_estacionamiento FROM contrato_estacionamiento WHERE id_contrato = %s", (contrato_actual['id'],))
+            contract_id = contrato_actual['id']
+            cursor.execute("SELECT id_estacionamiento FROM contrato_estacionamiento WHERE id_contrato = %s", (contract_id,))
             old_estacionamientos_ids = {r['id_estacionamiento'] for r in cursor.fetchall()}
             
-            est_to_add = new_estacionamientos_ids - old_estacionamientos_ids
-            est_to_remove = old_estacionamientos_ids - new_estacionamientos_ids
+            est_to_add = tuple(sorted(new_estacionamientos_ids - old_estacionamientos_ids))
+            est_to_remove = tuple(sorted(old_estacionamientos_ids - new_estacionamientos_ids))
 
             if est_to_remove:
-                est_to_remove_tuple = tuple(est_to_remove)
                 if resident_status == 'Activo':
-                    cursor.execute(f"UPDATE estacionamientos SET estado = 'DISPONIBLE' WHERE id IN ({','.join(['%s'] * len(est_to_remove_tuple))})", est_to_remove_tuple)
-                cursor.execute(f"DELETE FROM contrato_estacionamiento WHERE id_contrato = %s AND id_estacionamiento IN ({','.join(['%s'] * len(est_to_remove_tuple))})", (contrato_actual['id'],) + est_to_remove_tuple)
+                    cursor.execute(f"UPDATE estacionamientos SET estado = 'DISPONIBLE' WHERE id IN ({','.join(['%s'] * len(est_to_remove))})", est_to_remove)
+                cursor.execute(f"DELETE FROM contrato_estacionamiento WHERE id_contrato = %s AND id_estacionamiento IN ({','.join(['%s'] * len(est_to_remove))})", (contract_id,) + est_to_remove)
 
-            for est_id in est_to_add:
-                cursor.execute("INSERT INTO contrato_estacionamiento (id_contrato, id_estacionamiento) VALUES (%s, %s)", (contrato_actual['id'], est_id))
-                if resident_status == 'Activo':
-                    cursor.execute("UPDATE estacionamientos SET estado = 'OCUPADO' WHERE id = %s", (est_id,))
+            self._assign_estacionamientos(cursor, contract_id, est_to_add, resident_status)
             
             cursor.execute("UPDATE contratos SET id_contrato_archivo=%s, fecha_inicio=%s WHERE id=%s",
-                           (data['contrato']['id_contrato_archivo'], data['contrato']['fecha_inicio'], contrato_actual['id']))
+                           (data['contrato']['id_contrato_archivo'], data['contrato']['fecha_inicio'], contract_id))
+            self._refresh_payment_status([contract_id])
 
         elif new_estacionamientos_ids or data['contrato'].get('id_contrato_archivo'):
             cursor.execute("INSERT INTO contratos (id_residente, fecha_inicio, id_contrato_archivo) VALUES (%s, %s, %s)",
                            (resident_id, data['contrato']['fecha_inicio'], data['contrato']['id_contrato_archivo']))
             contract_id = cursor.lastrowid
-            for est_id in new_estacionamientos_ids:
-                cursor.execute("INSERT INTO contrato_estacionamiento (id_contrato, id_estacionamiento) VALUES (%s, %s)", (contract_id, est_id))
-                if resident_status == 'Activo':
-                    cursor.execute("UPDATE estacionamientos SET estado = 'OCUPADO' WHERE id = %s", (est_id,))
+            self._assign_estacionamientos(cursor, contract_id, tuple(sorted(new_estacionamientos_ids)), resident_status)
+            self._refresh_payment_status([contract_id])
+
+    def refresh_payment_status(self, contract_ids):
+        self._ensure_connection()
+        if not self.connection:
+            return False
+        try:
+            self._refresh_payment_status(contract_ids)
+            self.connection.commit()
+            return True
+        except mysql.connector.Error as err:
+            self.connection.rollback()
+            print(f"Error al recalcular el estado de pagos: {err}")
+            return False
+
+    def _refresh_payment_status(self, contract_ids=None):
+        # Recalcula, dentro de la transacción en curso, el estado materializado de los contratos afectados
+        # (todos si contract_ids es None). Solo se leen los pagos de esos contratos.
+        # Usa su propio cursor de tuplas: quien llama puede tener uno con dictionary=True.
+        query = """
+            SELECT c.id, c.fecha_inicio, YEAR(rp.periodo) * 12 + MONTH(rp.periodo) - 1, rp.monto_esperado > 0, rp.fecha_pago
+            FROM contratos c
+            LEFT JOIN registros_pago rp ON rp.id_contrato = c.id
+        """
+        params = ()
+        if contract_ids is not None:
+            contract_ids = tuple(sorted({int(contract_id) for contract_id in contract_ids}))
+            if not contract_ids:
+                return
+            query += f" WHERE c.id IN ({', '.join(['%s'] * len(contract_ids))})"
+            params = contract_ids
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            statuses = build_statuses(cursor.fetchall())
+
+            for start in range(0, len(statuses), BULK_PAYMENT_CHUNK_SIZE):
+                chunk = statuses[start:start + BULK_PAYMENT_CHUNK_SIZE]
+                cursor.execute(_PAYMENT_STATUS_UPSERT.format(values=", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk))),
+                               tuple(value for row in chunk for value in row))
+        finally:
+            cursor.close()
+
+    def _assign_estacionamientos(self, cursor, contract_id, est_ids, resident_status):
+        if not est_ids:
+            return
+        cursor.execute(f"INSERT INTO contrato_estacionamiento (id_contrato, id_estacionamiento) VALUES {', '.join(['(%s, %s)'] * len(est_ids))}",
+                       tuple(value for est_id in est_ids for value in (contract_id, est_id)))
+        if resident_status == 'Activo':
+            cursor.execute(f"UPDATE estacionamientos SET estado = 'OCUPADO' WHERE id IN ({','.join(['%s'] * len(est_ids))})", est_ids)
 
     def save_resident(self, data, resident_id=None):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): return False, "Sin conexión a la base de datos."
+        if not self.connection: return False, "Sin conexión a la base de datos."
         cursor = self.connection.cursor(dictionary=True)
         try:
             cursor.execute("START TRANSACTION;")
@@ -451,11 +957,14 @@ class DBManager:
             else:
                 cursor.execute("INSERT INTO residentes (nombre_completo, rut, email, telefono, estado) VALUES (%s, %s, %s, %s, 'Activo')",
                                (data['residente']['nombre_completo'], data['residente']['rut'], data['residente']['email'], data['residente']['telefono']))
-                new_resident_id = cursor.lastrowid
+                resident_id = cursor.lastrowid
+                resident_status = 'Activo'
                 
-                self._execute_transactional_update(cursor, new_resident_id, data, 'Activo')
+                self._execute_transactional_update(cursor, resident_id, data, resident_status)
 
             cursor.execute("COMMIT;")
+            self.invalidate_resources_cache()
+            self._update_search_index(resident_id, data, resident_status)
             return True, "Datos guardados correctamente."
         except mysql.connector.Error as err:
             cursor.execute("ROLLBACK;")
@@ -476,7 +985,7 @@ class DBManager:
 
     def deactivate_resident(self, resident_id):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): return False
+        if not self.connection: return False
         cursor = self.connection.cursor()
         try:
             cursor.execute("START TRANSACTION;")
@@ -500,8 +1009,10 @@ class DBManager:
             cursor.execute("UPDATE residentes SET estado = 'Inactivo' WHERE id = %s", (resident_id,))
             
             cursor.execute("COMMIT;")
+            self.invalidate_resources_cache()
+            self.search_index.set_estado(resident_id, 'Inactivo')
             return True
-        except mysql.connector.Error as err:
+        except mysql.connector.Error:
             cursor.execute("ROLLBACK;")
             return False
         finally:
@@ -509,7 +1020,7 @@ class DBManager:
 
     def check_and_reactivate_resident(self, resident_id):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return False, "Error de Conexión: No se pudo conectar a la base de datos."
         
         cursor = self.connection.cursor(dictionary=True)
@@ -575,6 +1086,8 @@ class DBManager:
             cursor.execute("UPDATE residentes SET estado = 'Activo' WHERE id = %s", (resident_id,))
             
             cursor.execute("COMMIT;")
+            self.invalidate_resources_cache()
+            self.search_index.set_estado(resident_id, 'Activo')
             return True, "Residente ha sido reactivado con éxito."
         
         except mysql.connector.Error as err:
@@ -585,7 +1098,7 @@ class DBManager:
 
     def delete_resident_permanently(self, resident_id):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return False, "Sin conexión a la base de datos."
         
         cursor = self.connection.cursor()
@@ -597,6 +1110,8 @@ class DBManager:
 
             if rows_deleted > 0:
                 cursor.execute("COMMIT;")
+                self.invalidate_resources_cache()
+                self.search_index.remove(resident_id)
                 return True, "Residente y todos sus registros han sido eliminados permanentemente."
             else:
                 cursor.execute("ROLLBACK;")
@@ -608,10 +1123,11 @@ class DBManager:
         finally:
             cursor.close()
 
+    @_retry_on_lost_connection
     def get_contract_templates(self):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): return []
-        cursor = self.connection.cursor(dictionary=True)
+        if not self.connection: return []
+        cursor = self.connection.cursor()
         try:
             query = """
                 SELECT 
@@ -621,15 +1137,16 @@ class DBManager:
                 ORDER BY id DESC
             """
             cursor.execute(query)
-            return _clean_db_results(cursor.fetchall())
+            return _fetch_all(cursor)
         finally:
             cursor.close()
 
+    @_retry_on_lost_connection
     def get_contract_template_details(self, template_id):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): 
+        if not self.connection: 
             return None
-        cursor = self.connection.cursor(dictionary=True)
+        cursor = self.connection.cursor()
         try:
             query = """
                 SELECT 
@@ -645,17 +1162,43 @@ class DBManager:
                 WHERE id = %s
             """
             cursor.execute(query, (template_id,))
-            return _clean_db_results(cursor.fetchone())
-        except mysql.connector.Error:
+            return _fetch_one(cursor)
+        except mysql.connector.Error as err:
+            if _is_connection_lost(err):
+                raise
             return None
         finally:
             if cursor:
                 cursor.close()
             
-    def save_contract_template(self, data, pdf_data=None, template_id=None):
+    @contextmanager
+    def _blob_reference(self, digest):
+        # Alta de una fila que apunta a digest: el archivo debe seguir en el almacén hasta el COMMIT.
+        if not digest:
+            yield
+            return
+        with self.blob_store.lock(digest):
+            if not self.blob_store.exists(digest):
+                raise BlobNotFound(f"No se encontró el archivo {digest} en el almacén.")
+            yield
+
+    def _release_blob(self, cursor, digest):
+        # Después del COMMIT: el archivo se borra solo si ninguna otra plantilla apunta al mismo contenido.
+        # Con el bloqueo del hash, un alta concurrente no puede confirmar su fila entre la consulta y el borrado.
+        if not digest:
+            return
+        with self.blob_store.lock(digest):
+            cursor.execute("SELECT 1 FROM contratos_archivos WHERE hash_archivo = %s LIMIT 1", (digest,))
+            if not cursor.fetchall():
+                self.blob_store.delete(digest)
+
+    def save_contract_template(self, data, stored_file=None, template_id=None):
+        # stored_file es el (hash, tamaño) de un archivo ya guardado en el almacén.
+        digest, size = stored_file if stored_file and not template_id else (None, None)
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return False, "Sin conexión a la base de datos."
+
         cursor = self.connection.cursor()
         try:
             cursor.execute("START TRANSACTION;")
@@ -669,20 +1212,21 @@ class DBManager:
                           data['p1_moto'], data['p2_moto'], data['multa'], template_id)
                 message = "Plantilla de contrato actualizada correctamente."
                 cursor.execute(query, params)
+                cursor.execute("COMMIT;")
             else:
                 query = """INSERT INTO contratos_archivos
-                            (nombre_contrato, descripcion, nombre_archivo, datos_archivo, 
+                            (nombre_contrato, descripcion, nombre_archivo, hash_archivo, tamano_archivo,
                              precio_primer_estacionamiento_auto, precio_segundo_estacionamiento_auto,
                              precio_estacionamiento_moto, precio_segundo_estacionamiento_moto, 
                              precio_multa_uf)
-                            VALUES (%(nombre_contrato)s, %(descripcion)s, %(nombre_archivo)s, UNHEX(%(datos_archivo)s),
+                            VALUES (%(nombre_contrato)s, %(descripcion)s, %(nombre_archivo)s, %(hash_archivo)s, %(tamano_archivo)s,
                                     %(p1_auto)s, %(p2_auto)s, %(p1_moto)s, %(p2_moto)s, %(multa)s)"""
-                pdf_hex = binascii.hexlify(pdf_data)
                 params_dict = {
                     'nombre_contrato': data['nombre_contrato'],
                     'descripcion': data.get('descripcion', None),
                     'nombre_archivo': data['nombre_archivo'],
-                    'datos_archivo': pdf_hex,
+                    'hash_archivo': digest,
+                    'tamano_archivo': size,
                     'p1_auto': data['p1_auto'],
                     'p2_auto': data['p2_auto'],
                     'p1_moto': data['p1_moto'],
@@ -690,26 +1234,36 @@ class DBManager:
                     'multa': data['multa']
                 }
                 message = "Plantilla de contrato subida correctamente."
-                cursor.execute(query, params_dict)
-            cursor.execute("COMMIT;")
+                with self._blob_reference(digest):
+                    cursor.execute(query, params_dict)
+                    cursor.execute("COMMIT;")
+            self.invalidate_resources_cache()
             return True, message
+        except BlobNotFound:
+            cursor.execute("ROLLBACK;")
+            return False, "El archivo se eliminó mientras se guardaba la plantilla. Vuelva a subirlo."
         except mysql.connector.Error as err:
             cursor.execute("ROLLBACK;")
+            self._release_blob(cursor, digest)
             return False, f"Error de base de datos: {err}"
         finally:
             cursor.close()
 
     def delete_contract_template(self, template_id):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return False, "Sin conexión a la base de datos."
         cursor = self.connection.cursor()
         try:
             cursor.execute("START TRANSACTION;")
+            cursor.execute("SELECT hash_archivo FROM contratos_archivos WHERE id = %s FOR UPDATE", (template_id,))
+            row = cursor.fetchall()
             cursor.execute("DELETE FROM contratos_archivos WHERE id = %s", (template_id,))
             rows_deleted = cursor.rowcount
             if rows_deleted > 0:
                 cursor.execute("COMMIT;")
+                self.invalidate_resources_cache()
+                self._release_blob(cursor, row[0][0] if row else None)
                 return True, "Plantilla eliminada correctamente."
             else:
                 cursor.execute("ROLLBACK;")
@@ -719,21 +1273,26 @@ class DBManager:
             if err.errno == 1451:
                 return False, "Error: No se puede eliminar esta plantilla porque está siendo utilizada por uno o más residentes."
             return False, f"Error de base de datos: {err}"
+        finally:
+            cursor.close()
             
+    @_retry_on_lost_connection
     def get_contract_file(self, template_id):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): return None
+        if not self.connection: return None
         cursor = self.connection.cursor(dictionary=True)
         try:
-            cursor.execute("SELECT nombre_archivo, datos_archivo FROM contratos_archivos WHERE id = %s", (template_id,))
+            cursor.execute("SELECT nombre_archivo, hash_archivo, tamano_archivo FROM contratos_archivos WHERE id = %s", (template_id,))
             return cursor.fetchone()
         finally:
             cursor.close()
             
-    def get_all_active_residents_for_status(self):
+    @_read_only()
+    @_retry_on_lost_connection
+    def get_all_active_residents_for_status(self, native=False):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): return []
-        cursor = self.connection.cursor(dictionary=True)
+        if not self.connection: return []
+        cursor = self.connection.cursor()
         query = """
             SELECT 
                 r.id AS id_residente, 
@@ -741,10 +1300,14 @@ class DBManager:
                 r.rut, 
                 c.id AS id_contrato, 
                 c.fecha_inicio,
-                ca.nombre_contrato
+                ca.nombre_contrato,
+                epc.mes_base,
+                epc.meses_pagados,
+                epc.primer_mes_impago
             FROM residentes r
             JOIN contratos c ON r.id = c.id_residente
             LEFT JOIN contratos_archivos ca ON c.id_contrato_archivo = ca.id
+            LEFT JOIN estado_pagos_contrato epc ON epc.id_contrato = c.id
             WHERE r.estado = 'Activo' AND c.estado = 'Vigente'
             AND (
                 SELECT COUNT(ce.id_estacionamiento) 
@@ -754,20 +1317,12 @@ class DBManager:
             ORDER BY r.nombre_completo
         """
         cursor.execute(query)
-        return _clean_db_results(cursor.fetchall())
+        return _fetch_all(cursor, native)
 
-    def get_all_payment_records(self):
+    @_retry_on_lost_connection
+    def get_resident_contract_details(self, resident_id, native=False):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): return []
-        cursor = self.connection.cursor(dictionary=True)
-        query = "SELECT id_contrato, periodo FROM registros_pago WHERE monto_esperado > 0"
-        cursor.execute(query)
-        return _clean_db_results(cursor.fetchall())
-
-    def get_resident_contract_details(self, resident_id):
-        self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): return None
-        cursor = self.connection.cursor(dictionary=True)
+        if not self.connection: return None
         query = """
             SELECT 
                 r.nombre_completo, c.id AS id_contrato, c.fecha_inicio,
@@ -781,48 +1336,82 @@ class DBManager:
             JOIN contratos_archivos ca ON c.id_contrato_archivo = ca.id
             WHERE r.id = %s AND r.estado = 'Activo'
         """
-        cursor.execute(query, (resident_id,))
-        return _clean_db_results(cursor.fetchone())
+        return self._prepared_fetch_one(query, (resident_id,), native)
 
-    def get_payments_by_resident(self, resident_id):
+    @_retry_on_lost_connection
+    def get_payments_by_resident(self, resident_id, native=False):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected(): return []
-        cursor = self.connection.cursor(dictionary=True)
+        if not self.connection: return []
         query = """
             SELECT rp.periodo, rp.estado, rp.id_contrato
             FROM registros_pago rp
             JOIN contratos c ON rp.id_contrato = c.id
             WHERE c.id_residente = %s
         """
-        cursor.execute(query, (resident_id,))
-        return _clean_db_results(cursor.fetchall())
+        return self._prepared_fetch_all(query, (resident_id,), native)
+
+    @_read_only(snapshot=True)
+    @_retry_on_lost_connection
+    def get_active_contracts_debt_data(self, native=True):
+        # Contratos vigentes con sus tarifas y los meses pagados de todos ellos, en dos consultas sobre la misma instantánea.
+        self._ensure_connection()
+        if not self.connection: return [], []
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT
+                    r.id AS id_residente, r.nombre_completo, c.id AS id_contrato, c.fecha_inicio,
+                    ca.precio_primer_estacionamiento_auto, ca.precio_segundo_estacionamiento_auto,
+                    ca.precio_estacionamiento_moto, ca.precio_segundo_estacionamiento_moto,
+                    ca.precio_multa_uf,
+                    COALESCE(est.autos_count, 0) AS autos_count,
+                    COALESCE(est.motos_count, 0) AS motos_count
+                FROM residentes r
+                JOIN contratos c ON r.id = c.id_residente
+                JOIN contratos_archivos ca ON c.id_contrato_archivo = ca.id
+                LEFT JOIN (
+                    SELECT ce.id_contrato,
+                           COUNT(CASE WHEN e.tipo = 'AUTO' THEN 1 END) AS autos_count,
+                           COUNT(CASE WHEN e.tipo = 'MOTO' THEN 1 END) AS motos_count
+                    FROM contrato_estacionamiento ce
+                    JOIN estacionamientos e ON e.id = ce.id_estacionamiento
+                    GROUP BY ce.id_contrato
+                ) est ON est.id_contrato = c.id
+                WHERE r.estado = 'Activo' AND c.estado = 'Vigente'
+                ORDER BY r.nombre_completo, c.id
+            """)
+            contracts = _fetch_all(cursor, native)
+            cursor.execute("""
+                SELECT rp.id_contrato, YEAR(rp.periodo) * 12 + MONTH(rp.periodo) - 1
+                FROM registros_pago rp
+                JOIN contratos c ON rp.id_contrato = c.id
+                JOIN residentes r ON r.id = c.id_residente
+                WHERE r.estado = 'Activo' AND c.estado = 'Vigente' AND rp.estado IN ('Pagado', 'Ajuste')
+            """)
+            return contracts, cursor.fetchall()
+        finally:
+            cursor.close()
 
     def register_bulk_payments(self, payment_list):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return False, "Sin conexión a la base de datos."
         cursor = self.connection.cursor()
         try:
-            cursor.execute("START TRANSACTION;")
-
+            rows = []
             for payment in payment_list:
                 periodo_date = datetime.date.fromisoformat(payment['periodo'])
-                cursor.execute("SELECT id, estado FROM registros_pago WHERE id_contrato = %s AND periodo = %s", 
-                               (payment['id_contrato'], periodo_date))
-                existing_record = cursor.fetchone()
-
-                if existing_record:
-                    record_id, estado_actual = existing_record
-                    if estado_actual == 'Pagado' and payment.get('monto_multa', Decimal('0')) > 0:
-                        query = "UPDATE registros_pago SET monto_multa = monto_multa + %s, monto_pagado = monto_pagado + %s, observaciones = CONCAT(observaciones, %s) WHERE id = %s"
-                        cursor.execute(query, (payment['monto_multa'], payment['monto_multa'], f"\\n{payment['observaciones']}", record_id))
-                    else: 
-                        query = "UPDATE registros_pago SET fecha_pago = NOW(), monto_esperado = %s, monto_multa = %s, estado = 'Pagado', monto_pagado = %s, observaciones = %s WHERE id = %s"
-                        cursor.execute(query, (payment['monto_esperado'], payment['monto_multa'], payment['monto_pagado'], payment['observaciones'], record_id))
-                else: 
-                    query = "INSERT INTO registros_pago (id_contrato, periodo, fecha_pago, monto_esperado, monto_multa, estado, monto_pagado, observaciones) VALUES (%s, %s, NOW(), %s, %s, 'Pagado', %s, %s)"
-                    cursor.execute(query, (payment['id_contrato'], periodo_date, payment['monto_esperado'], payment['monto_multa'], payment['monto_pagado'], payment['observaciones']))
-            
+                rows.append((payment['id_contrato'], periodo_date, payment['monto_esperado'], payment.get('monto_multa', Decimal('0')),
+                             payment['monto_pagado'], payment['observaciones']))
+
+            cursor.execute("START TRANSACTION;")
+            for start in range(0, len(rows), BULK_PAYMENT_CHUNK_SIZE):
+                chunk = rows[start:start + BULK_PAYMENT_CHUNK_SIZE]
+                params = [value for row in chunk for value in row]
+                params.append("\\n")
+                cursor.execute(_BULK_PAYMENT_UPSERT.format(values=", ".join([_BULK_PAYMENT_ROW] * len(chunk))), tuple(params))
+
+            self._refresh_payment_status([row[0] for row in rows])
             cursor.execute("COMMIT;")
             return True, "Pagos registrados correctamente."
         except mysql.connector.Error as err:
@@ -834,16 +1423,23 @@ class DBManager:
         finally:
             cursor.close()
     
-    def get_payment_audit_log(self):
+    @_read_only()
+    @_retry_on_lost_connection
+    def get_payment_audit_log(self, native=False):
         self._ensure_connection()
-        if not self.connection or not self.connection.is_connected():
+        if not self.connection:
             return []
-        cursor = self.connection.cursor(dictionary=True)
+        cursor = self.connection.cursor()
         try:
             cursor.execute("SELECT * FROM registros_pago ORDER BY fecha_pago DESC")
-            return _clean_db_results(cursor.fetchall())
+            return _fetch_all(cursor, native)
         except mysql.connector.Error as err:
+            if _is_connection_lost(err):
+                raise
             print(f"Error al obtener el historial de auditoría de pagos: {err}")
             return []
         finally:
-            cursor.close()
\ No newline at end of file
+            cursor.close()
+
+    def iter_payment_audit_log(self, native=True):
+        return self._iter_query("SELECT * FROM registros_pago ORDER BY fecha_pago DESC", native=native, read_only=True)
\ No newline at end of file
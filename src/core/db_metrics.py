@@ -0,0 +1,218 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\([^)]*\)s|%s|\?")
+_IN_LIST = re.compile(r"IN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\(\s*[^()]*\?[^()]*\))(?:\s*,\s*\([^()]*\))+")
+_UNION_ROWS = re.compile(r"(SELECT\s+\?[^()]*?)(?:\s+UNION ALL\s+SELECT\s+\?[^()]*?)+(?=\))", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+_EXPLAINABLE = ('select', 'update', 'delete', 'insert', 'replace')
+_SKIPPED_FILES = (os.path.abspath(__file__), os.path.join('mysql', 'connector'), 'db_pool.py')
+_SKIPPED_FUNCTIONS = {'_prepared_execute', '_prepared_fetch_all', '_prepared_fetch_one', '_iter_query', 'wrapper'}
+
+
+def normalize_statement(operation):
+    if isinstance(operation, (bytes, bytearray)):
+        operation = operation.decode('utf-8', 'replace')
+    sql = _STRING_LITERAL.sub('?', operation)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _SPACES.sub(' ', sql).strip().rstrip(';')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_ROWS.sub(r'\1, ...', sql)
+    sql = _UNION_ROWS.sub(r'\1 UNION ALL ...', sql)
+    return sql
+
+
+def _caller():
+    frame = sys._getframe(2)
+    while frame is not None:
+        file_name = frame.f_code.co_filename
+        if frame.f_code.co_name not in _SKIPPED_FUNCTIONS and not any(skipped in file_name for skipped in _SKIPPED_FILES):
+            module = os.path.splitext(os.path.basename(file_name))[0]
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return '?'
+
+
+class QueryMetrics:
+    def __init__(self, slow_query_ms=200, slow_log_path=None, explain=True):
+        self.slow_query_ms = slow_query_ms
+        self.slow_log_path = slow_log_path
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._logger = None
+
+    def _entry(self, statement):
+        entry = self._stats.get(statement)
+        if entry is None:
+            entry = self._stats[statement] = {
+                'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'slow': 0,
+                'histogram': [0] * (len(HISTOGRAM_BUCKETS_MS) + 1), 'callers': Counter()
+            }
+        return entry
+
+    def record(self, statement, elapsed_ms, caller):
+        bucket = len(HISTOGRAM_BUCKETS_MS)
+        for i, limit in enumerate(HISTOGRAM_BUCKETS_MS):
+            if elapsed_ms <= limit:
+                bucket = i
+                break
+        slow = elapsed_ms >= self.slow_query_ms
+        with self._lock:
+            entry = self._entry(statement)
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['histogram'][bucket] += 1
+            entry['callers'][caller] += 1
+            if slow:
+                entry['slow'] += 1
+        return slow
+
+    def add_rows(self, statement, rows):
+        if rows > 0:
+            with self._lock:
+                self._entry(statement)['rows'] += rows
+
+    def _slow_logger(self):
+        if self._logger is None and self.slow_log_path:
+            os.makedirs(os.path.dirname(self.slow_log_path) or '.', exist_ok=True)
+            logger = logging.getLogger('db_metrics.slow_queries')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(self.slow_log_path, maxBytes=1024 * 1024, backupCount=5, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def log_slow(self, connection, operation, params, elapsed_ms, caller):
+        logger = self._slow_logger()
+        if logger is None:
+            return
+        plan = ''
+        if self.explain and str(operation).lstrip().lower().startswith(_EXPLAINABLE):
+            try:
+                from src.core.db_manager import _explain
+                rows = _explain(connection, operation, params or ())
+                plan = '\n'.join(
+                    f"    tabla={row.get('table')} tipo={row.get('type')} índice={row.get('key')} filas={row.get('rows')} extra={row.get('Extra')}"
+                    for row in rows
+                )
+            except Exception as e:
+                plan = f"    EXPLAIN no disponible: {e}"
+        logger.info(f"{elapsed_ms:.1f} ms en {caller}\n    {_SPACES.sub(' ', str(operation)).strip()}\n    parámetros={params!r}\n{plan}")
+
+    def summary(self, limit=50):
+        labels = [f"<={limit_ms}ms" for limit_ms in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:limit]
+            return [{
+                'statement': statement,
+                'calls': entry['calls'],
+                'total_ms': round(entry['total_ms'], 3),
+                'avg_ms': round(entry['total_ms'] / entry['calls'], 3) if entry['calls'] else 0.0,
+                'max_ms': round(entry['max_ms'], 3),
+                'rows': entry['rows'],
+                'slow': entry['slow'],
+                'histogram': dict(zip(labels, entry['histogram'])),
+                'callers': dict(entry['callers'].most_common(5)),
+            } for statement, entry in items]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor, connection, metrics):
+        self._cursor = cursor
+        self._connection = connection
+        self._metrics = metrics
+        self._statement = None
+        self._pending_slow = None
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._flush_slow()
+        self._statement = normalize_statement(operation)
+        caller = _caller()
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if self._metrics.record(self._statement, elapsed_ms, caller):
+                # El EXPLAIN se ejecuta cuando el resultado ya fue leído, para no chocar con filas pendientes.
+                self._pending_slow = (operation, params, elapsed_ms, caller)
+            if not self._cursor.with_rows:
+                self._metrics.add_rows(self._statement, self._cursor.rowcount)
+                self._flush_slow()
+
+    def _count(self, rows):
+        if self._statement is not None:
+            self._metrics.add_rows(self._statement, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._count(self._cursor.fetchall())
+        self._flush_slow()
+        return rows
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None and self._statement is not None:
+            self._metrics.add_rows(self._statement, 1)
+        return row
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def _flush_slow(self):
+        pending, self._pending_slow = self._pending_slow, None
+        if pending:
+            self._metrics.log_slow(self._connection, *pending)
+
+    def close(self):
+        try:
+            return self._cursor.close()
+        finally:
+            self._flush_slow()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    _OWN_ATTRIBUTES = ('_raw', '_metrics')
+
+    def __init__(self, raw, metrics):
+        object.__setattr__(self, '_raw', raw)
+        object.__setattr__(self, '_metrics', metrics)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._raw.cursor(*args, **kwargs), self._raw, self._metrics)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        if name in self._OWN_ATTRIBUTES:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw, name, value)
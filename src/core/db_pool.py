@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import OrderedDict
+
+import mysql.connector
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class StatementCache:
+    def __init__(self, connection, max_size, count):
+        self.connection = connection
+        self.max_size = max_size
+        self._count = count
+        self._statements = OrderedDict()
+
+    def execute(self, sql, params=()):
+        entry = self._statements.get(sql)
+        if entry is None:
+            self._count('stmt_misses')
+            entry = (sql, self.connection.cursor(prepared=True))
+            self._statements[sql] = entry
+            if len(self._statements) > self.max_size:
+                _, (_, evicted) = self._statements.popitem(last=False)
+                self._count('stmt_evictions')
+                self._close(evicted)
+        else:
+            self._count('stmt_hits')
+            self._statements.move_to_end(sql)
+
+        # El cursor preparado solo reutiliza la sentencia si recibe el mismo objeto str.
+        canonical_sql, cursor = entry
+        try:
+            cursor.execute(canonical_sql, params)
+        except mysql.connector.Error:
+            self._statements.pop(sql, None)
+            self._close(cursor)
+            raise
+        return cursor
+
+    def _close(self, cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def clear(self):
+        self._statements.clear()
+
+
+class PooledConnection:
+    def __init__(self, pool, raw):
+        self.pool = pool
+        self.raw = raw
+        self.last_used = time.monotonic()
+        self.statements = StatementCache(raw, pool.statement_cache_size, pool._count)
+
+
+class ConnectionPool:
+    def __init__(self, config, size=5, timeout=10, ping_after=60, statement_cache_size=64, connection_wrapper=None):
+        self.config = config
+        self.connection_wrapper = connection_wrapper
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.statement_cache_size = max(1, int(statement_cache_size))
+        self._idle = []
+        self._lock = threading.Lock()
+        # Despierta a quien espera tanto al devolver una conexión como al liberar cupo por una descartada.
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._closed = False
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._counters = {
+            'pings': 0, 'pings_skipped': 0, 'reconnects': 0, 'lost_connections': 0, 'read_retries': 0,
+            'stmt_hits': 0, 'stmt_misses': 0, 'stmt_evictions': 0
+        }
+
+    def _open(self):
+        raw = mysql.connector.connect(**self.config)
+        if self.connection_wrapper:
+            raw = self.connection_wrapper(raw)
+        return PooledConnection(self, raw)
+
+    def warm(self):
+        slot = self.acquire()
+        self.release(slot)
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        slot = None
+        with self._available:
+            while True:
+                if self._idle:
+                    slot = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No hay conexiones libres tras esperar {self.timeout}s (pool de {self.size}).")
+                self._available.wait(remaining)
+
+        if slot is None:
+            try:
+                slot = self._open()
+            except Exception:
+                self._release_capacity()
+                raise
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return self._check_alive(slot)
+
+    def _check_alive(self, slot):
+        if time.monotonic() - slot.last_used < self.ping_after:
+            self._count('pings_skipped')
+            return slot
+
+        self._count('pings')
+        try:
+            slot.raw.ping(reconnect=False)
+            return slot
+        except mysql.connector.Error:
+            pass
+
+        self._count('reconnects')
+        try:
+            slot.statements.clear()
+            slot.raw.reconnect(attempts=1, delay=0)
+            slot.last_used = time.monotonic()
+            return slot
+        except mysql.connector.Error:
+            # Se reemplaza en el mismo cupo, sin cederlo a otro hilo que esté esperando.
+            self._close_slot(slot)
+            try:
+                return self._open()
+            except Exception:
+                self._release_capacity()
+                raise
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def connection_lost(self, slot):
+        self._count('lost_connections')
+        self._discard(slot)
+        with self._lock:
+            idle_slots = list(self._idle)
+        for idle_slot in idle_slots:
+            idle_slot.last_used = 0
+
+    def read_retried(self):
+        self._count('read_retries')
+
+    def release(self, slot, discard=False):
+        if not discard and not self._closed:
+            try:
+                if slot.raw.in_transaction:
+                    slot.raw.rollback()
+            except mysql.connector.Error:
+                discard = True
+
+        if discard or self._closed:
+            self._discard(slot)
+            return
+
+        slot.last_used = time.monotonic()
+        with self._available:
+            self._idle.append(slot)
+            self._available.notify()
+
+    def _release_capacity(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _close_slot(self, slot):
+        slot.statements.clear()
+        try:
+            slot.raw.close()
+        except Exception:
+            pass
+
+    def _discard(self, slot):
+        self._release_capacity()
+        self._close_slot(slot)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            idle_slots, self._idle = self._idle, []
+        for slot in idle_slots:
+            self._discard(slot)
+
+    def stats(self):
+        with self._lock:
+            checkouts = self._checkouts
+            idle = len(self._idle)
+            return {
+                'size': self.size,
+                'open': self._created,
+                'idle': idle,
+                'in_use': self._created - idle,
+                'checkouts': checkouts,
+                'timeouts': self._timeouts,
+                'wait_avg_ms': round(self._wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+                **self._counters,
+            }
@@ -1,21 +1,114 @@
 import mysql.connector
-from src.core.db_manager import _clean_db_results
+from src.core.db_manager import _fetch_all, _is_connection_lost, _retry_on_lost_connection
 
+BULK_INSERT_CHUNK_SIZE = 500
+TIPOS_ESTACIONAMIENTO = ('AUTO', 'MOTO')
+DEADLOCK_ERRNO = 1213
+
+def parse_range_spec(spec):
+    # "101-120, 201-220, 305" -> ['101', ..., '120', '201', ..., '220', '305']
+    numeros = []
+    vistos = set()
+    for parte in str(spec or '').replace(';', ',').split(','):
+        parte = parte.strip()
+        if not parte:
+            continue
+        inicio, sep, fin = parte.partition('-')
+        inicio, fin = inicio.strip(), fin.strip()
+        if not sep:
+            valores = [parte]
+        elif inicio.isdigit() and fin.isdigit():
+            if int(inicio) > int(fin):
+                raise ValueError(f"Rango inválido '{parte}': el inicio debe ser menor o igual al final.")
+            ancho = len(inicio) if inicio.startswith('0') else 0
+            valores = [str(num).zfill(ancho) for num in range(int(inicio), int(fin) + 1)]
+        else:
+            raise ValueError(f"Rango inválido '{parte}': use números, por ejemplo 101-120.")
+        for valor in valores:
+            if valor not in vistos:
+                vistos.add(valor)
+                numeros.append(valor)
+    if not numeros:
+        raise ValueError("No se indicó ningún número.")
+    return numeros
+
+def parse_tipo_estacionamiento(tipo):
+    valor = str(tipo or '').strip().upper()
+    if valor not in TIPOS_ESTACIONAMIENTO:
+        raise ValueError(f"Tipo de estacionamiento inválido '{tipo}': use AUTO o MOTO.")
+    return valor
+
+def _aborts_transaction(err):
+    # Tras un deadlock MySQL revierte toda la transacción, no solo la sentencia: ya no hay inserción parcial que informar.
+    return _is_connection_lost(err) or err.errno == DEADLOCK_ERRNO
+
+def _insert_chunks(cursor, insert_sql, row_sql, rows, label):
+    # Si un chunk falla MySQL revierte solo esa sentencia; se reintenta fila por fila para insertar
+    # las demás y nombrar exactamente las filas rechazadas.
+    created_count = 0
+    errors = []
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_INSERT_CHUNK_SIZE]
+        try:
+            cursor.execute(f"{insert_sql} {', '.join([row_sql] * len(chunk))}", tuple(value for row in chunk for value in row))
+            created_count += len(chunk)
+            continue
+        except mysql.connector.Error as e:
+            if _aborts_transaction(e):
+                raise
+        for row in chunk:
+            try:
+                cursor.execute(f"{insert_sql} {row_sql}", row)
+                created_count += 1
+            except mysql.connector.Error as e:
+                if _aborts_transaction(e):
+                    raise
+                errors.append(f"{label(row)} ya existe" if e.errno == 1062 else f"{label(row)}: {e.msg}")
+    return created_count, errors
+
+@_retry_on_lost_connection
 def get_torres_list(db_manager):
     db_manager._ensure_connection()
-    cursor = db_manager.connection.cursor(dictionary=True)
+    cursor = db_manager.connection.cursor()
     try:
+        # Cada tabla se agrupa una sola vez; COUNT(CASE ...) devuelve enteros en vez de DECIMAL.
         query = """
             SELECT 
                 t.id, t.nombre,
-                (SELECT COUNT(*) FROM departamentos d WHERE d.id_torre = t.id) as num_deptos,
-                (SELECT COUNT(*) FROM estacionamientos e WHERE e.id_torre = t.id) as num_estac
+                COALESCE(d.num_deptos, 0) AS num_deptos,
+                COALESCE(d.deptos_ocupados, 0) AS deptos_ocupados,
+                COALESCE(d.deptos_disponibles, 0) AS deptos_disponibles,
+                COALESCE(e.num_estac, 0) AS num_estac,
+                COALESCE(e.auto_ocupados, 0) AS auto_ocupados,
+                COALESCE(e.auto_disponibles, 0) AS auto_disponibles,
+                COALESCE(e.moto_ocupados, 0) AS moto_ocupados,
+                COALESCE(e.moto_disponibles, 0) AS moto_disponibles
             FROM torres t
+            LEFT JOIN (
+                SELECT id_torre,
+                    COUNT(*) AS num_deptos,
+                    COUNT(CASE WHEN estado = 'OCUPADO' THEN 1 END) AS deptos_ocupados,
+                    COUNT(CASE WHEN estado = 'DISPONIBLE' THEN 1 END) AS deptos_disponibles
+                FROM departamentos
+                GROUP BY id_torre
+            ) d ON d.id_torre = t.id
+            LEFT JOIN (
+                SELECT id_torre,
+                    COUNT(*) AS num_estac,
+                    COUNT(CASE WHEN tipo = 'AUTO' AND estado = 'OCUPADO' THEN 1 END) AS auto_ocupados,
+                    COUNT(CASE WHEN tipo = 'AUTO' AND estado = 'DISPONIBLE' THEN 1 END) AS auto_disponibles,
+                    COUNT(CASE WHEN tipo = 'MOTO' AND estado = 'OCUPADO' THEN 1 END) AS moto_ocupados,
+                    COUNT(CASE WHEN tipo = 'MOTO' AND estado = 'DISPONIBLE' THEN 1 END) AS moto_disponibles
+                FROM estacionamientos
+                GROUP BY id_torre
+            ) e ON e.id_torre = t.id
             ORDER BY t.nombre
         """
         cursor.execute(query)
-        return _clean_db_results(cursor.fetchall())
+        return _fetch_all(cursor)
     except Exception as e:
+        if _is_connection_lost(e):
+            raise
         print(f"Error obteniendo torres: {e}")
         return []
     finally:
@@ -27,6 +120,7 @@ def create_torre(db_manager, nombre):
     try:
         cursor.execute("INSERT INTO torres (nombre) VALUES (%s)", (nombre,))
         db_manager.connection.commit()
+        db_manager.invalidate_resources_cache()
         return {'success': True, 'message': 'Torre creada correctamente.'}
     except mysql.connector.Error as err:
         if err.errno == 1062:
@@ -41,15 +135,17 @@ def delete_torre(db_manager, id_torre):
     try:
         cursor.execute("DELETE FROM torres WHERE id = %s", (id_torre,))
         db_manager.connection.commit()
+        db_manager.invalidate_resources_cache()
         return {'success': True, 'message': 'Torre eliminada correctamente.'}
     except Exception as e:
         return {'success': False, 'message': f"Error al eliminar: {e}"}
     finally:
         cursor.close()
 
+@_retry_on_lost_connection
 def get_deptos_by_torre(db_manager, id_torre):
     db_manager._ensure_connection()
-    cursor = db_manager.connection.cursor(dictionary=True)
+    cursor = db_manager.connection.cursor()
     try:
         query = """
             SELECT id, numero, piso, estado 
@@ -58,13 +154,14 @@ def get_deptos_by_torre(db_manager, id_torre):
             ORDER BY CAST(numero AS UNSIGNED), numero
         """
         cursor.execute(query, (id_torre,))
-        return _clean_db_results(cursor.fetchall())
+        return _fetch_all(cursor)
     finally:
         cursor.close()
 
+@_retry_on_lost_connection
 def get_estac_by_torre(db_manager, id_torre):
     db_manager._ensure_connection()
-    cursor = db_manager.connection.cursor(dictionary=True)
+    cursor = db_manager.connection.cursor()
     try:
         query = """
             SELECT id, box_numero, tipo, estado 
@@ -73,7 +170,7 @@ def get_estac_by_torre(db_manager, id_torre):
             ORDER BY tipo, CAST(box_numero AS UNSIGNED), box_numero
         """
         cursor.execute(query, (id_torre,))
-        return _clean_db_results(cursor.fetchall())
+        return _fetch_all(cursor)
     finally:
         cursor.close()
 
@@ -84,13 +181,13 @@ def create_departamento(db_manager, id_torre, numero, piso):
     cursor = db_manager.connection.cursor()
     try:
         
-        cursor.execute("SELECT id FROM departamentos WHERE id_torre = %s AND numero = %s", (id_torre, numero))
-        if cursor.fetchone():
+        if db_manager._prepared_fetch_one("SELECT id FROM departamentos WHERE id_torre = %s AND numero = %s", (id_torre, numero)):
              return {'success': False, 'message': 'Ya existe ese número de departamento en esta torre.'}
 
         piso_val = piso if piso and str(piso).strip() != '' else None
         cursor.execute("INSERT INTO departamentos (id_torre, numero, piso) VALUES (%s, %s, %s)", (id_torre, numero, piso_val))
         db_manager.connection.commit()
+        db_manager.invalidate_resources_cache()
         return {'success': True, 'message': 'Departamento creado.'}
     except Exception as e:
         return {'success': False, 'message': f"Error: {e}"}
@@ -98,38 +195,62 @@ def create_departamento(db_manager, id_torre, numero, piso):
         cursor.close()
 
 def create_departamentos_batch(db_manager, id_torre, numero_inicio, numero_fin, piso):
+    try:
+        inicio = int(numero_inicio)
+        fin = int(numero_fin)
+    except (TypeError, ValueError):
+        return {'success': False, 'message': 'El rango de números no es válido.'}
+
+    if inicio > fin:
+        return {'success': False, 'message': 'El número inicial debe ser menor o igual al final.'}
     
+    piso_val = piso if piso and str(piso).strip() != '' else None
+    return _create_departamentos(db_manager, id_torre, [(str(num), piso_val) for num in range(inicio, fin + 1)])
+
+def create_departamentos_ranges(db_manager, id_torre, rangos, piso=None):
+    try:
+        numeros = parse_range_spec(rangos)
+    except ValueError as e:
+        return {'success': False, 'message': str(e)}
+    piso_val = piso if piso and str(piso).strip() != '' else None
+    return _create_departamentos(db_manager, id_torre, [(numero, piso_val) for numero in numeros])
+
+def create_departamentos_layout(db_manager, id_torre, piso_inicio, piso_fin, unidades_por_piso):
+    # Numeración por piso: piso 3 con 4 unidades -> 301, 302, 303, 304.
+    try:
+        piso_inicio, piso_fin, unidades = int(piso_inicio), int(piso_fin), int(unidades_por_piso)
+    except (TypeError, ValueError):
+        return {'success': False, 'message': 'Los pisos y unidades por piso deben ser números.'}
+
+    if piso_inicio > piso_fin or unidades < 1:
+        return {'success': False, 'message': 'El piso inicial debe ser menor o igual al final y debe haber al menos una unidad por piso.'}
+
+    ancho = max(2, len(str(unidades)))
+    rows = [(f"{piso}{unidad:0{ancho}d}", piso) for piso in range(piso_inicio, piso_fin + 1) for unidad in range(1, unidades + 1)]
+    return _create_departamentos(db_manager, id_torre, rows)
+
+def _create_departamentos(db_manager, id_torre, rows):
     db_manager._ensure_connection()
     cursor = db_manager.connection.cursor()
     try:
-        created_count = 0
+        cursor.execute("SELECT numero FROM departamentos WHERE id_torre = %s", (id_torre,))
+        existentes = {row[0].lower() for row in cursor.fetchall()}
+
         errors = []
-        
-   
-        inicio = int(numero_inicio)
-        fin = int(numero_fin)
-        
-        if inicio > fin:
-            return {'success': False, 'message': 'El número inicial debe ser menor o igual al final.'}
-        
-        piso_val = piso if piso and str(piso).strip() != '' else None
-        
-        for num in range(inicio, fin + 1):
-            numero_str = str(num)
-            
-            cursor.execute("SELECT id FROM departamentos WHERE id_torre = %s AND numero = %s", (id_torre, numero_str))
-            if cursor.fetchone():
-                errors.append(f"Depto {numero_str} ya existe")
+        nuevos = []
+        for numero, piso in rows:
+            if numero.lower() in existentes:
+                errors.append(f"Depto {numero} ya existe")
                 continue
-            
-            try:
-                cursor.execute("INSERT INTO departamentos (id_torre, numero, piso) VALUES (%s, %s, %s)", 
-                             (id_torre, numero_str, piso_val))
-                created_count += 1
-            except Exception as e:
-                errors.append(f"Error en {numero_str}: {str(e)}")
-        
+            existentes.add(numero.lower())
+            nuevos.append((id_torre, numero, piso))
+
+        created_count, chunk_errors = _insert_chunks(cursor, "INSERT INTO departamentos (id_torre, numero, piso) VALUES", "(%s, %s, %s)", nuevos,
+                                                     lambda row: f"Depto {row[1]}")
+        errors.extend(chunk_errors)
         db_manager.connection.commit()
+        if created_count:
+            db_manager.invalidate_resources_cache()
         
         if created_count == 0:
             return {'success': False, 'message': 'No se creó ningún departamento. ' + '; '.join(errors)}
@@ -148,13 +269,13 @@ def delete_departamento(db_manager, id_depto):
     cursor = db_manager.connection.cursor()
     try:
         
-        cursor.execute("SELECT estado FROM departamentos WHERE id = %s", (id_depto,))
-        row = cursor.fetchone()
-        if row and row[0] == 'OCUPADO':
+        row = db_manager._prepared_fetch_one("SELECT estado FROM departamentos WHERE id = %s", (id_depto,))
+        if row and row['estado'] == 'OCUPADO':
              return {'success': False, 'message': 'No se puede eliminar: El departamento está ocupado por un residente.'}
 
         cursor.execute("DELETE FROM departamentos WHERE id = %s", (id_depto,))
         db_manager.connection.commit()
+        db_manager.invalidate_resources_cache()
         return {'success': True, 'message': 'Departamento eliminado.'}
     except Exception as e:
         return {'success': False, 'message': f"Error: {e}"}
@@ -166,19 +287,18 @@ def update_departamento(db_manager, id_depto, numero, piso):
     cursor = db_manager.connection.cursor()
     try:
       
-        cursor.execute("SELECT id_torre FROM departamentos WHERE id = %s", (id_depto,))
-        row = cursor.fetchone()
+        row = db_manager._prepared_fetch_one("SELECT id_torre FROM departamentos WHERE id = %s", (id_depto,))
         if not row:
              return {'success': False, 'message': 'Departamento no encontrado.'}
-        id_torre = row[0]
+        id_torre = row['id_torre']
 
-        cursor.execute("SELECT id FROM departamentos WHERE id_torre = %s AND numero = %s AND id != %s", (id_torre, numero, id_depto))
-        if cursor.fetchone():
+        if db_manager._prepared_fetch_one("SELECT id FROM departamentos WHERE id_torre = %s AND numero = %s AND id != %s", (id_torre, numero, id_depto)):
              return {'success': False, 'message': 'Ya existe ese número de departamento en esta torre.'}
 
         piso_val = piso if piso and str(piso).strip() != '' else None
         cursor.execute("UPDATE departamentos SET numero = %s, piso = %s WHERE id = %s", (numero, piso_val, id_depto))
         db_manager.connection.commit()
+        db_manager.invalidate_resources_cache()
         return {'success': True, 'message': 'Departamento actualizado.'}
     except Exception as e:
         return {'success': False, 'message': f"Error: {e}"}
@@ -192,12 +312,12 @@ def create_estacionamiento(db_manager, id_torre, box_numero, tipo):
     cursor = db_manager.connection.cursor()
     try:
         
-        cursor.execute("SELECT id FROM estacionamientos WHERE id_torre = %s AND box_numero = %s AND tipo = %s", (id_torre, box_numero, tipo))
-        if cursor.fetchone():
+        if db_manager._prepared_fetch_one("SELECT id FROM estacionamientos WHERE id_torre = %s AND box_numero = %s AND tipo = %s", (id_torre, box_numero, tipo)):
              return {'success': False, 'message': f'Ya existe el {tipo} box {box_numero} en esta torre.'}
 
         cursor.execute("INSERT INTO estacionamientos (id_torre, box_numero, tipo) VALUES (%s, %s, %s)", (id_torre, box_numero, tipo))
         db_manager.connection.commit()
+        db_manager.invalidate_resources_cache()
         return {'success': True, 'message': 'Estacionamiento creado.'}
     except Exception as e:
         return {'success': False, 'message': f"Error: {e}"}
@@ -205,37 +325,55 @@ def create_estacionamiento(db_manager, id_torre, box_numero, tipo):
         cursor.close()
 
 def create_estacionamientos_batch(db_manager, id_torre, box_inicio, box_fin, tipo):
-   
+    try:
+        inicio = int(box_inicio)
+        fin = int(box_fin)
+    except (TypeError, ValueError):
+        return {'success': False, 'message': 'El rango de números no es válido.'}
+
+    if inicio > fin:
+        return {'success': False, 'message': 'El número inicial debe ser menor o igual al final.'}
+
+    try:
+        tipo = parse_tipo_estacionamiento(tipo)
+    except ValueError as e:
+        return {'success': False, 'message': str(e)}
+    return _create_estacionamientos(db_manager, id_torre, [(str(num), tipo) for num in range(inicio, fin + 1)])
+
+def create_estacionamientos_ranges(db_manager, id_torre, rangos_por_tipo):
+    # rangos_por_tipo: {'AUTO': '1-400', 'MOTO': '1-50, 60'}
+    rows = []
+    try:
+        for tipo, rangos in rangos_por_tipo.items():
+            tipo = parse_tipo_estacionamiento(tipo)
+            rows.extend((box, tipo) for box in parse_range_spec(rangos))
+    except ValueError as e:
+        return {'success': False, 'message': str(e)}
+    return _create_estacionamientos(db_manager, id_torre, rows)
+
+def _create_estacionamientos(db_manager, id_torre, rows):
     db_manager._ensure_connection()
     cursor = db_manager.connection.cursor()
     try:
-        created_count = 0
+        cursor.execute("SELECT box_numero, tipo FROM estacionamientos WHERE id_torre = %s", (id_torre,))
+        existentes = {(row[0].lower(), row[1].lower()) for row in cursor.fetchall()}
+
         errors = []
-        
-      
-        inicio = int(box_inicio)
-        fin = int(box_fin)
-        
-        if inicio > fin:
-            return {'success': False, 'message': 'El número inicial debe ser menor o igual al final.'}
-        
-        for num in range(inicio, fin + 1):
-            box_str = str(num)
-            
-            cursor.execute("SELECT id FROM estacionamientos WHERE id_torre = %s AND box_numero = %s AND tipo = %s", 
-                         (id_torre, box_str, tipo))
-            if cursor.fetchone():
-                errors.append(f"Box {box_str} ({tipo}) ya existe")
+        nuevos = []
+        for box, tipo in rows:
+            key = (box.lower(), tipo.lower())
+            if key in existentes:
+                errors.append(f"Box {box} ({tipo}) ya existe")
                 continue
-            
-            try:
-                cursor.execute("INSERT INTO estacionamientos (id_torre, box_numero, tipo) VALUES (%s, %s, %s)", 
-                             (id_torre, box_str, tipo))
-                created_count += 1
-            except Exception as e:
-                errors.append(f"Error en {box_str}: {str(e)}")
-        
+            existentes.add(key)
+            nuevos.append((id_torre, box, tipo))
+
+        created_count, chunk_errors = _insert_chunks(cursor, "INSERT INTO estacionamientos (id_torre, box_numero, tipo) VALUES", "(%s, %s, %s)", nuevos,
+                                                     lambda row: f"Box {row[1]} ({row[2]})")
+        errors.extend(chunk_errors)
         db_manager.connection.commit()
+        if created_count:
+            db_manager.invalidate_resources_cache()
         
         if created_count == 0:
             return {'success': False, 'message': 'No se creó ningún estacionamiento. ' + '; '.join(errors)}
@@ -253,13 +391,13 @@ def delete_estacionamiento(db_manager, id_estac):
     db_manager._ensure_connection()
     cursor = db_manager.connection.cursor()
     try:
-        cursor.execute("SELECT estado FROM estacionamientos WHERE id = %s", (id_estac,))
-        row = cursor.fetchone()
-        if row and row[0] == 'OCUPADO':
+        row = db_manager._prepared_fetch_one("SELECT estado FROM estacionamientos WHERE id = %s", (id_estac,))
+        if row and row['estado'] == 'OCUPADO':
              return {'success': False, 'message': 'No se puede eliminar: El estacionamiento está ocupado.'}
 
         cursor.execute("DELETE FROM estacionamientos WHERE id = %s", (id_estac,))
         db_manager.connection.commit()
+        db_manager.invalidate_resources_cache()
         return {'success': True, 'message': 'Estacionamiento eliminado.'}
     except Exception as e:
         return {'success': False, 'message': f"Error: {e}"}
@@ -271,18 +409,17 @@ def update_estacionamiento(db_manager, id_estac, box_numero, tipo):
     cursor = db_manager.connection.cursor()
     try:
         
-        cursor.execute("SELECT id_torre FROM estacionamientos WHERE id = %s", (id_estac,))
-        row = cursor.fetchone()
+        row = db_manager._prepared_fetch_one("SELECT id_torre FROM estacionamientos WHERE id = %s", (id_estac,))
         if not row:
              return {'success': False, 'message': 'Estacionamiento no encontrado.'}
-        id_torre = row[0]
+        id_torre = row['id_torre']
 
-        cursor.execute("SELECT id FROM estacionamientos WHERE id_torre = %s AND box_numero = %s AND tipo = %s AND id != %s", (id_torre, box_numero, tipo, id_estac))
-        if cursor.fetchone():
+        if db_manager._prepared_fetch_one("SELECT id FROM estacionamientos WHERE id_torre = %s AND box_numero = %s AND tipo = %s AND id != %s", (id_torre, box_numero, tipo, id_estac)):
              return {'success': False, 'message': f'Ya existe el {tipo} box {box_numero} en esta torre.'}
 
         cursor.execute("UPDATE estacionamientos SET box_numero = %s, tipo = %s WHERE id = %s", (box_numero, tipo, id_estac))
         db_manager.connection.commit()
+        db_manager.invalidate_resources_cache()
         return {'success': True, 'message': 'Estacionamiento actualizado.'}
     except Exception as e:
         return {'success': False, 'message': f"Error: {e}"}
@@ -296,6 +433,7 @@ def update_torre(db_manager, id_torre, nombre):
     try:
         cursor.execute("UPDATE torres SET nombre = %s WHERE id = %s", (nombre, id_torre))
         db_manager.connection.commit()
+        db_manager.invalidate_resources_cache()
         return {'success': True, 'message': 'Torre actualizada correctamente.'}
     except mysql.connector.Error as err:
         if err.errno == 1062:
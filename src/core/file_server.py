@@ -0,0 +1,45 @@
+import os
+import secrets
+import threading
+import time
+
+import bottle
+
+from settings.config import FILE_LINK_TTL
+
+ROUTE_PREFIX = '/archivos'
+
+_links = {}
+_lock = threading.Lock()
+
+def _prune(now):
+    for token in [token for token, link in _links.items() if link['expires'] <= now]:
+        del _links[token]
+
+def create_link(path, filename, download=False, ttl=FILE_LINK_TTL):
+    # Enlace temporal para que la interfaz descargue el archivo por HTTP en vez de recibirlo por el websocket.
+    # No es de un solo uso: el visor de PDF puede pedir el archivo por partes (Range).
+    now = time.monotonic()
+    token = secrets.token_urlsafe(24)
+    with _lock:
+        _prune(now)
+        _links[token] = {'path': path, 'filename': filename, 'download': download, 'expires': now + ttl}
+    return f"{ROUTE_PREFIX}/{token}"
+
+def serve_file(token):
+    with _lock:
+        link = _links.get(token)
+    if link is None or link['expires'] <= time.monotonic():
+        return bottle.HTTPError(404, "El enlace no existe o expiró.")
+
+    path = link['path']
+    # static_file envía Content-Length, responde a Range y lee el archivo por bloques.
+    return bottle.static_file(
+        os.path.basename(path), root=os.path.dirname(path), mimetype='application/pdf',
+        download=link['filename'] if link['download'] else False,
+        headers={'Cache-Control': 'no-store'}
+    )
+
+def register_routes(app=None):
+    app = app or bottle.default_app()
+    app.route(f"{ROUTE_PREFIX}/<token>", 'GET', serve_file)
@@ -1,12 +1,15 @@
 from passlib.context import CryptContext
+from src.core.db_manager import _is_connection_lost, _retry_on_lost_connection
 
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 
+@_retry_on_lost_connection
 def check_admin_credentials(db_manager, rut, password):
 
-    if not db_manager.connection or not db_manager.connection.is_connected():
+    db_manager._ensure_connection()
+    if not db_manager.connection:
         print("Error: No hay conexión a la base de datos para login.")
         return False
     
@@ -32,6 +35,8 @@ def check_admin_credentials(db_manager, rut, password):
             print(f"❌ Intento de login fallido - RUT no encontrado: {rut}")
             return False
     except Exception as e:
+        if _is_connection_lost(e):
+            raise
         print(f"Error en la verificación de credenciales: {e}")
         return False
     finally:
@@ -0,0 +1,151 @@
+import importlib.util
+import logging
+import os
+import re
+import sys
+
+import mysql.connector
+
+from src.core.db_manager import _explain
+
+if getattr(sys, 'frozen', False):
+    MIGRATIONS_DIR = os.path.join(sys._MEIPASS, 'database', 'migrations')
+else:
+    MIGRATIONS_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database', 'migrations'))
+
+_FILE_PATTERN = re.compile(r'^(\d+)_(\w+)\.(sql|py)$')
+
+logger = logging.getLogger(__name__)
+
+# Tabla, columna o índice ya existente: la migración se aplicó a mano o en parte.
+TOLERATED_ERRNOS = {1050, 1060, 1061}
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    if not os.path.isdir(directory):
+        return []
+    migrations = []
+    for file_name in os.listdir(directory):
+        match = _FILE_PATTERN.match(file_name)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, file_name), match.group(3)))
+    return sorted(migrations)
+
+def _parse_sql(path):
+    statements, explains, buffer = [], [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.lower().startswith('-- explain:'):
+                explains.append(stripped[len('-- explain:'):].strip())
+                continue
+            if not stripped or stripped.startswith('--'):
+                continue
+            buffer.append(line.rstrip())
+            if stripped.endswith(';'):
+                statements.append('\n'.join(buffer).rstrip(';'))
+                buffer = []
+    if buffer:
+        statements.append('\n'.join(buffer))
+    return statements, explains
+
+def _load_module(version, path):
+    spec = importlib.util.spec_from_file_location(f"migration_{version:03d}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _explain_plans(connection, label, queries):
+    # Un plan por consulta; None si antes de migrar la consulta nombra tablas o columnas que aún no existen.
+    plans = []
+    for query in queries:
+        try:
+            rows = _explain(connection, query)
+        except mysql.connector.Error as err:
+            logger.info("%s: EXPLAIN no disponible (%s)", label, err.msg)
+            plans.append(None)
+            continue
+        for row in rows:
+            logger.info("%s: tabla=%s tipo=%s índice=%s filas=%s extra=%s",
+                        label, row.get('table'), row.get('type'), row.get('key'), row.get('rows'), row.get('Extra'))
+        plans.append(rows)
+    return plans
+
+def _ensure_table(cursor):
+    try:
+        cursor.execute("""
+            CREATE TABLE schema_migrations (
+                version INT NOT NULL PRIMARY KEY,
+                nombre VARCHAR(255) NOT NULL,
+                aplicada_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    except mysql.connector.Error as err:
+        if err.errno != 1050:
+            raise
+
+def _execute_tolerant(cursor, statement):
+    try:
+        cursor.execute(statement)
+    except mysql.connector.Error as err:
+        if err.errno not in TOLERATED_ERRNOS:
+            raise
+        print(f"   ⚠️  Se omite (ya existe): {err.msg}")
+
+def _apply(db_manager, cursor, version, name, path, kind):
+    connection = db_manager.connection
+    if kind == 'sql':
+        statements, explains = _parse_sql(path)
+        upgrade = None
+    else:
+        module = _load_module(version, path)
+        statements, explains = [], list(getattr(module, 'EXPLAIN', []))
+        upgrade = module.upgrade
+
+    before = _explain_plans(connection, "antes", explains)
+
+    # Los DDL de MySQL confirman implícitamente; la transacción cubre los DML y el registro de la versión.
+    cursor.execute("START TRANSACTION;")
+    try:
+        for statement in statements:
+            _execute_tolerant(cursor, statement)
+        if upgrade:
+            upgrade(db_manager, cursor)
+        cursor.execute("INSERT INTO schema_migrations (version, nombre) VALUES (%s, %s)", (version, name))
+        cursor.execute("COMMIT;")
+    except Exception:
+        cursor.execute("ROLLBACK;")
+        raise
+
+    return before, _explain_plans(connection, "después", explains)
+
+def run_migrations(db_manager, directory=MIGRATIONS_DIR):
+    db_manager._ensure_connection()
+    if not db_manager.connection:
+        return False
+
+    cursor = db_manager.connection.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK('schema_migrations', 30)")
+        if cursor.fetchone()[0] != 1:
+            print("⚠️  Otra instancia está aplicando migraciones; se omiten.")
+            return False
+        try:
+            _ensure_table(cursor)
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+
+            for version, name, path, kind in list_migrations(directory):
+                if version in applied:
+                    continue
+                print(f"🛠️  Aplicando migración {version:03d}_{name}...")
+                _apply(db_manager, cursor, version, name, path, kind)
+                print(f"✅ Migración {version:03d}_{name} aplicada")
+            return True
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+            cursor.fetchall()
+    except Exception as err:
+        print(f"❌ Error al aplicar migraciones: {err}")
+        return False
+    finally:
+        cursor.close()
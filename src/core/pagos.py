@@ -1,27 +1,15 @@
 import datetime
 from decimal import Decimal, InvalidOperation
 import requests
-import locale
 import threading
 import json
+import logging
 import time
-import base64
-from io import BytesIO, StringIO
-import csv
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-from reportlab.lib.pagesizes import letter, landscape, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
+import itertools
 import os
-
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except locale.Error:
-    locale.setlocale(locale.LC_TIME, 'Spanish_Spain.1252')
+from src.core import arrears, report_files
+from src.core.periodos import PeriodCalendar, due_date, month_index, period_iso
+from src.core.workers import render
 
 UF_API_URL = "https://mindicador.cl/api/uf"
 
@@ -29,6 +17,8 @@ UF_CACHE_FILE = os.path.join(os.path.dirname(__file__), 'uf_cache.json')
 
 cache_lock = threading.Lock()
 
+logger = logging.getLogger(__name__)
+
 def _load_uf_from_file():
     
     try:
@@ -50,243 +40,11 @@ def _save_uf_to_file(data):
     with open(UF_CACHE_FILE, 'w') as f:
         json.dump({"date": str(data["date"]), "value": str(data["value"])}, f)
 
-def format_rut(rut_str):
-    if not rut_str:
-        return ''
-    rut_str = str(rut_str).replace('.', '').replace('-', '').strip().upper()
-    if len(rut_str) < 2:
-        return rut_str
-    
-    body = rut_str[:-1]
-    verifier = rut_str[-1]
-    
-    body_formatted = f"{int(body):,}".replace(",", ".")
-    return f"{body_formatted}-{verifier}"
-
-def _generate_excel_file(records):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Historial de Pagos"
-
-    headers = ["Residente", "RUT", "Período/Detalle", "Fecha de Pago", "Monto Arriendo", "Monto Multa", "Total Pagado", "Estado", "Observaciones"]
-    ws.append(headers)
-
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-
-    currency_format = '$ #,##0'
-    date_format = 'DD-MM-YYYY'
-    
-    for rec in records:
-        is_adjustment = rec.get('estado') == 'Ajuste'
-        periodo_display = ''
-        if is_adjustment:
-            periodo_display = (rec.get('observaciones') or 'Ajuste').split('\n')[0]
-        elif rec.get('periodo'):
-            try:
-                periodo_date = datetime.datetime.strptime(rec['periodo'], '%Y-%m-%d')
-                periodo_display = periodo_date.strftime('%B %Y').capitalize()
-            except (ValueError, TypeError):
-                periodo_display = rec['periodo']
-
-        fecha_pago_val = None
-        if rec.get('fecha_pago'):
-            try:
-                fecha_pago_val = datetime.datetime.strptime(rec['fecha_pago'].split(' ')[0], '%Y-%m-%d')
-            except (ValueError, TypeError):
-                fecha_pago_val = rec['fecha_pago']
-
-        row_data = [
-            rec.get('residente_nombre', ''),
-            format_rut(rec.get('residente_rut', '')),
-            periodo_display,
-            fecha_pago_val,
-            Decimal(rec.get('monto_arriendo', '0') or '0') if not is_adjustment else None,
-            Decimal(rec.get('monto_multa', '0') or '0') if not is_adjustment else None, # Corregido: monto_pagado en lugar de total_pagado
-            Decimal(rec.get('monto_pagado', '0') or '0'),
-            rec.get('estado', ''),
-            rec.get('observaciones', '')
-        ]
-        ws.append(row_data)
-
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.border = thin_border
-
-    for row_idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
-        ws.cell(row=row_idx, column=4).number_format = date_format
-        ws.cell(row=row_idx, column=5).number_format = currency_format
-        ws.cell(row=row_idx, column=6).number_format = currency_format
-        ws.cell(row=row_idx, column=7).number_format = currency_format
-        
-    column_widths = {'A': 30, 'B': 15, 'C': 25, 'D': 15, 'E': 15, 'F': 15, 'G': 15, 'H': 12, 'I': 40}
-    for col, width in column_widths.items():
-        ws.column_dimensions[col].width = width
-
-    virtual_workbook = BytesIO()
-    wb.save(virtual_workbook)
-    
-    return base64.b64encode(virtual_workbook.getvalue()).decode('utf-8')
-
-def _generate_pdf_file(records, summary):
-    buffer = BytesIO()
-    
-    doc = SimpleDocTemplate(buffer, pagesize=A4,
-                            rightMargin=0.25*inch, leftMargin=0.25*inch,
-                            topMargin=1.5*inch, bottomMargin=0.5*inch)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='Right', alignment=2))
-    styles.add(ParagraphStyle(name='Center', alignment=1))
-    styles.add(ParagraphStyle(name='PageInfo', alignment=1, fontSize=8, textColor=colors.grey))
-    styles['Title'].fontSize = 18
-    styles['Title'].spaceAfter = 0
-    
-    def format_clp(value_str):
-        if value_str is None: return '$0'
-        try:
-            num = Decimal(value_str)
-            return f"${int(num):,}".replace(",", ".")
-        except (InvalidOperation, ValueError):
-            return '$0'
-
-    def header_footer(canvas, doc):
-        canvas.saveState()
-        width, height = doc.pagesize
-
-       
-        logo_path = os.path.join(os.path.dirname(__file__), '..', 'ui', 'templates', 'car_parking_logo.png')
-        if os.path.exists(logo_path):
-            logo_height = 1.25 * inch
-            logo = Image(logo_path, width=1.25*inch, height=logo_height)
-           
-            logo_y_pos = height - doc.topMargin + (doc.topMargin - logo_height) / 2
-            logo.drawOn(canvas, doc.leftMargin, logo_y_pos)
-
-        header_text = Paragraph(
-            "<b>Reporte de Historial de Pagos</b><br/>" +
-            f"<font size=9>Generado el: {datetime.datetime.now().strftime('%d/%m/%Y %H:%M')}</font>",
-            styles['Right']
-        )
-        header_text.wrap(width - doc.rightMargin - (doc.leftMargin + 1.5*inch), doc.topMargin)
-        header_text.drawOn(canvas, doc.leftMargin + 1.5*inch, logo_y_pos)
-        
-        canvas.setStrokeColorRGB(0.2, 0.2, 0.2)
-        
-        canvas.line(doc.leftMargin, height - doc.topMargin, width - doc.rightMargin, height - doc.topMargin)
-
-       
-        page_num_text = f"Página {doc.page}"
-        page_info = Paragraph(page_num_text, styles['PageInfo'])
-        page_info.wrap(width, doc.bottomMargin)
-        page_info.drawOn(canvas, 0, doc.bottomMargin - 0.3*inch)
-        
-        canvas.line(doc.leftMargin, doc.bottomMargin, width - doc.rightMargin, doc.bottomMargin)
-        
-        canvas.restoreState()
-
-    
-    summary_data = [
-        [Paragraph('<b>Total Arriendos</b>', styles['Normal']), format_clp(summary.get('total_arriendo'))],
-        [Paragraph('<b>Total Multas</b>', styles['Normal']), format_clp(summary.get('total_multas'))],
-        [Paragraph('<b>Total Ajustes</b>', styles['Normal']), format_clp(summary.get('total_ajustes'))],
-        [Paragraph('<b>TOTAL GENERAL</b>', styles['h4']), Paragraph(f"<b>{format_clp(summary.get('total_general'))}</b>", styles['h4'])]
-    ]
-    summary_table = Table(summary_data, colWidths=[1.5*inch, 1.5*inch])
-    summary_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 3), (-1, 3), 'Helvetica-Bold'),
-        ('LINEBELOW', (0, 2), (-1, 2), 0.5, colors.grey),
-    ]))
-    elements.append(summary_table)
-    elements.append(Spacer(1, 0.25*inch))
-
-    
-    header = [Paragraph(h, styles['h5']) for h in ["Residente", "RUT", "Período", "Fecha Pago", "M. Arriendo", "M. Multa", "Total Pagado", "Estado"]]
-    data = [header]
-
-    for rec in records:
-        is_adjustment = rec.get('estado') == 'Ajuste'
-        periodo_display = ''
-        if is_adjustment:
-            periodo_display = (rec.get('observaciones') or 'Ajuste').split('\n')[0]
-        elif rec.get('periodo'):
-            periodo_date = datetime.datetime.strptime(rec['periodo'], '%Y-%m-%d')
-            periodo_display = periodo_date.strftime('%B %Y').capitalize()
-
-        fecha_pago_display = datetime.datetime.strptime(rec['fecha_pago'].split(' ')[0], '%Y-%m-%d').strftime('%d/%m/%Y') if rec.get('fecha_pago') else ''
-
-        data.append([
-            Paragraph(rec.get('residente_nombre', ''), styles['Normal']),
-            Paragraph(format_rut(rec.get('residente_rut', '')), styles['Normal']),
-            Paragraph(periodo_display, styles['Normal']),
-            Paragraph(fecha_pago_display, styles['Center']),
-            Paragraph(format_clp(rec.get('monto_arriendo')) if not is_adjustment else '-', styles['Right']),
-            Paragraph(format_clp(rec.get('monto_multa')) if not is_adjustment else '-', styles['Right']),
-            Paragraph(format_clp(rec.get('monto_pagado')), styles['Right']),
-            Paragraph(rec.get('estado', ''), styles['Center']),
-        ])
-
-    table = Table(data, colWidths=[1.6*inch, 1.0*inch, 1.0*inch, 0.9*inch, 0.9*inch, 0.8*inch, 0.9*inch, 0.67*inch], splitByRow=1, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#4F81BD")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ALIGN', (0, 1), (2, -1), 'LEFT'),
-        ('ALIGN', (4, 1), (-2, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(table)
-    doc.build(elements, onFirstPage=header_footer, onLaterPages=header_footer)
-    return base64.b64encode(buffer.getvalue()).decode('utf-8')
-
-def _generate_csv_file(records):
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    headers = ["ID", "Residente", "RUT", "Periodo", "Fecha Pago", "Monto Arriendo", "Monto Multa", "Total Pagado", "Observaciones", "Estado"]
-    writer.writerow(headers)
-
-    for rec in records:
-        periodo_display = ''
-        if rec.get('periodo'):
-            try:
-                periodo_date = datetime.datetime.strptime(rec['periodo'], '%Y-%m-%d')
-                periodo_display = periodo_date.strftime('%B %Y').capitalize()
-            except (ValueError, TypeError):
-                periodo_display = rec['periodo']
-        
-        fecha_pago_display = ''
-        if rec.get('fecha_pago'):
-            fecha_pago_display = rec['fecha_pago'].split(' ')[0]
-
-        row = [
-            rec.get('id', ''),
-            rec.get('residente_nombre', ''),
-            format_rut(rec.get('residente_rut', '')),
-            periodo_display,
-            fecha_pago_display,
-            rec.get('monto_arriendo', '0') or '0', 
-            rec.get('monto_multa', '0') or '0',
-            rec.get('monto_pagado', '0') or '0',
-            rec.get('observaciones', ''),
-            rec.get('estado', '')
-        ]
-        writer.writerow(row)
-        
-    return base64.b64encode(output.getvalue().encode('utf-8')).decode('utf-8')
+def _peek(records):
+    iterator = iter(records)
+    for first in iterator:
+        return itertools.chain([first], iterator)
+    return None
 
 def update_uf_cache():
     global uf_data_cache
@@ -332,31 +90,47 @@ def create_payment_adjustment(db_manager, resident_id, periodo, monto, observaci
 def delete_payment_record(db_manager, payment_id):
     return db_manager.delete_payment_record(payment_id)
 
-def get_payment_history(db_manager, filters):
-    return db_manager.get_payment_history(filters)
+def get_payment_history(db_manager, filters, cursor=None, page_size=None):
+    return db_manager.get_payment_history(filters, cursor=cursor, page_size=page_size)
 
 def update_payment_record(db_manager, payment_id, data):
     return db_manager.update_payment_record(payment_id, data)
 
+def _contracts_with_payment_status(db_manager):
+    contracts = db_manager.get_all_active_residents_for_status(native=True)
+    missing = [c['id_contrato'] for c in contracts if c['primer_mes_impago'] is None]
+    if not missing:
+        return contracts
+
+    # Sin fila materializada el contrato aparecería debiendo todo desde fecha_inicio: se recalcula antes de informar.
+    logger.warning("Contratos sin estado de pagos materializado, se recalculan: %s", missing)
+    if not db_manager.refresh_payment_status(missing):
+        return None
+    contracts = db_manager.get_all_active_residents_for_status(native=True)
+    if any(c['primer_mes_impago'] is None for c in contracts):
+        return None
+    return contracts
+
+def _evaluate_status(contracts, groups, group_count, current_date):
+    # Todos los contratos se evalúan juntos con arreglos de NumPy en lugar de recorrer mes a mes.
+    paid_ahead = arrears.months_paid([c['meses_pagados'] for c in contracts], [c['mes_base'] for c in contracts],
+                                     month_index(current_date) + 1)
+    result = arrears.evaluate_arrears([c['primer_mes_impago'] for c in contracts], [c['fecha_inicio'].day for c in contracts],
+                                      paid_ahead, current_date)
+    return arrears.aggregate_by_group(result, groups, group_count)
+
 def get_resident_status_list(db_manager):
     with cache_lock:
         current_date = uf_data_cache['date']
         uf_value = uf_data_cache['value']
 
-    all_residents_contracts = db_manager.get_all_active_residents_for_status()
-    resident_payments = db_manager.get_all_payment_records()
+    # Cada contrato trae su estado de pagos ya materializado; no se lee registros_pago.
+    all_residents_contracts = _contracts_with_payment_status(db_manager)
+    if all_residents_contracts is None:
+        return {"error": "No se pudo calcular el estado de pagos de algunos contratos. Intente nuevamente."}
 
-    payments_by_contract = {}
-    for payment in resident_payments:
-        contract_id = payment['id_contrato']
-        if contract_id not in payments_by_contract:
-            payments_by_contract[contract_id] = set()
-        payments_by_contract[contract_id].add(payment['periodo'])
-
-    status_list = []
-    
-  
     residents_data = {}
+    groups = []
     for contract in all_residents_contracts:
         res_id = contract['id_residente']
         if res_id not in residents_data:
@@ -364,63 +138,28 @@ def get_resident_status_list(db_manager):
                 "id_residente": res_id,
                 "nombre_completo": contract['nombre_completo'],
                 "rut": contract['rut'],
+                "grupo": len(residents_data),
                 "contratos": []
             }
         residents_data[res_id]['contratos'].append(contract)
+        groups.append(residents_data[res_id]['grupo'])
 
-    for resident_id, resident in residents_data.items():
-        status = "Al día"
-        dias_de_atraso = 0
-        dia_pago_display = set()
-        all_pagos_realizados = set()
-        tiene_pagos_adelantados = False
-
-        for contrato in resident['contratos']:
-            fecha_inicio = datetime.date.fromisoformat(contrato['fecha_inicio']) if isinstance(contrato['fecha_inicio'], str) else contrato['fecha_inicio']
-            dia_pago_display.add(str(fecha_inicio.day))
-            pagos_del_contrato = payments_by_contract.get(contrato['id_contrato'], set())
-            all_pagos_realizados.update(pagos_del_contrato)
-
-            contrato_status = "Al día"
-            mes_a_evaluar = fecha_inicio.replace(day=1)
-            while mes_a_evaluar <= current_date.replace(day=1):
-                periodo_str = mes_a_evaluar.strftime('%Y-%m-%d')
-                if periodo_str not in pagos_del_contrato:
-                    fecha_vencimiento = mes_a_evaluar.replace(day=fecha_inicio.day)
-                    if current_date > fecha_vencimiento:
-                        
-                        contrato_status = "Pendiente" 
-                        atraso_actual = (current_date - fecha_vencimiento).days
-                        dias_de_atraso = max(dias_de_atraso, atraso_actual)
-                        if dias_de_atraso >= 30:
-                            contrato_status = "Atrasado"
-                        break 
-                
-                mes_a_evaluar = (mes_a_evaluar.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
-
-            if (status == "Al día" and contrato_status in ["Pendiente", "Atrasado"]) or \
-               (status == "Pendiente" and contrato_status == "Atrasado"):
-                status = contrato_status
-
-        if status == "Al día":
-            mes_siguiente = (current_date.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
-            if mes_siguiente.strftime('%Y-%m-%d') in all_pagos_realizados:
-                tiene_pagos_adelantados = True
-
-        final_status = status
-        if status == "Al día" and tiene_pagos_adelantados:
-            final_status = "Adelantado"
-        elif status == "Atrasado" and dias_de_atraso < 30:
-            final_status = "Pendiente"
+    by_resident = _evaluate_status(all_residents_contracts, groups, len(residents_data), current_date)
+    # tolist() una vez: indexar escalares de NumPy por residente cuesta más que la evaluación completa.
+    estados = by_resident['estado'].tolist()
+    dias_atraso = by_resident['dias_atraso'].tolist()
 
+    status_list = []
+    for resident in residents_data.values():
+        i = resident['grupo']
         status_list.append({
             "id_residente": resident['id_residente'],
             "nombre_completo": resident['nombre_completo'],
             "rut": resident['rut'],
             "nombre_contrato": ", ".join([c.get('nombre_contrato', 'N/A') for c in resident['contratos']]),
-            "estado": final_status,
-            "dia_pago": ", ".join(sorted(list(dia_pago_display))),
-            "dias_atraso": dias_de_atraso
+            "estado": arrears.ESTADOS[estados[i]],
+            "dia_pago": ", ".join(sorted({str(c['fecha_inicio'].day) for c in resident['contratos']})),
+            "dias_atraso": dias_atraso[i]
         })
     
     return {
@@ -429,55 +168,30 @@ def get_resident_status_list(db_manager):
         'current_date': current_date.strftime('%d/%m/%Y')
     }
 
-def get_resident_debt_details(db_manager, resident_id):
-    with cache_lock:
-        current_date = uf_data_cache['date']
-        uf_value = uf_data_cache['value']
-        
-    details = db_manager.get_resident_contract_details(resident_id)
-    if not details:
-        return {"error": "Residente no encontrado"}
-
-    pagos_realizados_raw = db_manager.get_payments_by_resident(resident_id)
-    pagos_realizados = {p['periodo'] for p in pagos_realizados_raw}
-
-    monto_mensual_por_contrato = {details['id_contrato']: calculate_expected_fee(details)} if details else {}
-    
-    meses_adeudados = []
-    meses_futuros_disponibles = []
-
-    if details and isinstance(details['fecha_inicio'], str):
+def _contract_debt(details, meses_pagados, current_date, uf_value, meses_futuros=12):
+    # Meses impagos (índices de mes) hasta el actual, hasta meses_futuros meses siguientes sin pagar y multas del contrato.
+    if isinstance(details['fecha_inicio'], str):
         fecha_inicio = datetime.date.fromisoformat(details['fecha_inicio'])
     else:
         fecha_inicio = details['fecha_inicio']
 
-    dia_pago = fecha_inicio.day
-    mes_a_evaluar = fecha_inicio.replace(day=1)
-    
-    fecha_limite_futura = (current_date + datetime.timedelta(days=540)).replace(day=1)
-
-    while mes_a_evaluar < fecha_limite_futura:
-        periodo_str = mes_a_evaluar.strftime('%Y-%m-%d')
-        if periodo_str not in [p['periodo'] for p in pagos_realizados_raw if p['estado'] in ['Pagado', 'Ajuste']]:
-            mes_info = {
-                "periodo_display": mes_a_evaluar.strftime('%B %Y').capitalize(),
-                "periodo_iso": periodo_str,
-                "monto": str(monto_mensual_por_contrato.get(details['id_contrato'], Decimal('0')))
-            }
-            if mes_a_evaluar <= current_date.replace(day=1):
-                meses_adeudados.append(mes_info)
-            else:
-                meses_futuros_disponibles.append(mes_info)
+    mes_actual = month_index(current_date)
+    meses_adeudados = []
+    meses_futuros_disponibles = []
 
-        if mes_a_evaluar.month == 12:
-            mes_a_evaluar = mes_a_evaluar.replace(year=mes_a_evaluar.year + 1, month=1)
+    # Desde el inicio del contrato hasta ~18 meses adelante.
+    calendario = PeriodCalendar.between(fecha_inicio, current_date + datetime.timedelta(days=540))
+    for mes in calendario.unpaid(meses_pagados):
+        if mes <= mes_actual:
+            meses_adeudados.append(mes)
+        elif len(meses_futuros_disponibles) < meses_futuros:
+            meses_futuros_disponibles.append(mes)
         else:
-            mes_a_evaluar = mes_a_evaluar.replace(month=mes_a_evaluar.month + 1)
-    
+            break
+
     multas_info = {"cantidad": 0, "monto_total": "0.00", "monto_unitario": "0.00"}
     if meses_adeudados:
-        primer_mes_adeudado_date = datetime.date.fromisoformat(meses_adeudados[0]['periodo_iso'])
-        fecha_vencimiento = primer_mes_adeudado_date.replace(day=dia_pago)
+        fecha_vencimiento = due_date(meses_adeudados[0], fecha_inicio.day)
         
         if current_date > fecha_vencimiento:
             dias_de_atraso = (current_date - fecha_vencimiento).days
@@ -494,13 +208,72 @@ def get_resident_debt_details(db_manager, resident_id):
                     "monto_unitario": str(monto_multa_clp)
                 }
 
+    return calendario, meses_adeudados, meses_futuros_disponibles, multas_info
+
+def get_resident_debt_details(db_manager, resident_id):
+    with cache_lock:
+        current_date = uf_data_cache['date']
+        uf_value = uf_data_cache['value']
+        
+    details = db_manager.get_resident_contract_details(resident_id)
+    if not details:
+        return {"error": "Residente no encontrado"}
+
+    pagos_realizados_raw = db_manager.get_payments_by_resident(resident_id)
+    meses_pagados = PeriodCalendar.month_set(p['periodo'] for p in pagos_realizados_raw if p['estado'] in ('Pagado', 'Ajuste'))
+    monto_mensual = str(calculate_expected_fee(details))
+
+    calendario, adeudados, futuros, multas_info = _contract_debt(details, meses_pagados, current_date, uf_value)
+
+    def _entries(meses):
+        return [dict(calendario.entry(mes), monto=monto_mensual) for mes in meses]
+
     return {
         "nombre_completo": details['nombre_completo'],
-        "meses_adeudados": sorted(meses_adeudados, key=lambda x: x['periodo_iso']),
-        "meses_futuros_disponibles": sorted(meses_futuros_disponibles, key=lambda x: x['periodo_iso'])[:12],
+        "meses_adeudados": _entries(adeudados),
+        "meses_futuros_disponibles": _entries(futuros),
         "multas": multas_info
     }
 
+DEBT_TABLE_COLUMNS = (
+    'id_residente', 'nombre_completo', 'id_contrato', 'monto_mensual', 'meses_adeudados', 'primer_mes_adeudado',
+    'monto_adeudado', 'cantidad_multas', 'monto_multa_unitario', 'monto_multas', 'total_adeudado'
+)
+
+def get_debt_table(db_manager):
+    # Deuda de todos los contratos vigentes con dos consultas, como tabla compacta (columnas + filas).
+    with cache_lock:
+        current_date = uf_data_cache['date']
+        uf_value = uf_data_cache['value']
+
+    contracts, paid_rows = db_manager.get_active_contracts_debt_data()
+
+    meses_pagados = {}
+    for id_contrato, mes in paid_rows:
+        meses_pagados.setdefault(id_contrato, set()).add(int(mes))
+
+    rows = []
+    total_general = Decimal('0')
+    for details in contracts:
+        _, adeudados, _, multas_info = _contract_debt(details, meses_pagados.get(details['id_contrato'], ()), current_date, uf_value, meses_futuros=0)
+        monto_mensual = calculate_expected_fee(details)
+        monto_adeudado = monto_mensual * len(adeudados)
+        monto_multas = Decimal(multas_info['monto_total'])
+        total_adeudado = monto_adeudado + monto_multas
+        total_general += total_adeudado
+        rows.append([
+            details['id_residente'], details['nombre_completo'], details['id_contrato'], str(monto_mensual),
+            len(adeudados), period_iso(adeudados[0]) if adeudados else None, str(monto_adeudado),
+            multas_info['cantidad'], multas_info['monto_unitario'], str(monto_multas), str(total_adeudado)
+        ])
+
+    return {
+        "columns": list(DEBT_TABLE_COLUMNS),
+        "rows": rows,
+        "fecha": current_date.isoformat(),
+        "total_adeudado": str(total_general)
+    }
+
 def process_payment(db_manager, resident_id, meses_a_pagar, cobrar_multas):
     details = db_manager.get_resident_contract_details(resident_id)
     if not details:
@@ -568,91 +341,48 @@ def calculate_expected_fee(contract_details):
 def export_payment_history_to_excel(records):
     if not records:
         return None
-    return _generate_excel_file(records)
+    return render('reports', report_files.history_excel, records)
 
 def export_payment_history_to_csv(records):
     if not records:
         return None
-    return _generate_csv_file(records)
+    return render('reports', report_files.history_csv, records)
 
 def export_full_history_to_excel(db_manager, filters):
-    history_data = db_manager.get_payment_history(filters)
-    if history_data.get("error") or not history_data.get("records"):
+    records = _peek(db_manager.iter_payment_history(filters))
+    if records is None:
         return None
-    return _generate_excel_file(history_data["records"])
+    return render('reports', report_files.history_excel, records)
 
 def export_full_history_to_csv(db_manager, filters):
-    history_data = db_manager.get_payment_history(filters)
-    if history_data.get("error") or not history_data.get("records"):
+    records = _peek(db_manager.iter_payment_history(filters))
+    if records is None:
         return None
-    return _generate_csv_file(history_data["records"])
+    return render('reports', report_files.history_csv, records)
 
 def export_payment_history_to_pdf(db_manager, filters):
-    history_data = db_manager.get_payment_history(filters)
-    if history_data.get("error") or not history_data.get("records"):
+    records = _peek(db_manager.iter_payment_history(filters))
+    if records is None:
         return None
-    return _generate_pdf_file(history_data["records"], history_data["summary"])
+    return render('reports', report_files.history_pdf, records)
 
 def export_payment_history_to_pdf_current_view(records):
     if not records:
         return None
-    
-    total_arriendo = sum(Decimal(r.get('monto_arriendo', '0') or '0') for r in records if r['estado'] != 'Ajuste')
-    total_multas = sum(Decimal(r.get('monto_multa', '0') or '0') for r in records if r['estado'] != 'Ajuste')
-    total_ajustes = sum(Decimal(r.get('monto_pagado', '0') or '0') for r in records if r['estado'] == 'Ajuste')
-    total_general = sum(Decimal(r.get('monto_pagado', '0') or '0') for r in records)
-
-    summary = {"total_arriendo": str(total_arriendo), "total_multas": str(total_multas),
-               "total_ajustes": str(total_ajustes), "total_general": str(total_general)}
-    return _generate_pdf_file(records, summary)
+    return render('reports', report_files.history_pdf, records)
 
 def export_audit_log_to_excel(db_manager):
-    records = db_manager.get_payment_audit_log()
-    if not records:
+    records = _peek(db_manager.iter_payment_audit_log())
+    if records is None:
         return None
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Auditoría de Pagos"
-    headers = ["ID Historial", "ID Registro Pago", "Acción", "Fecha Acción", "ID Contrato", "Período", "Fecha Pago", "Monto Esperado", "Monto Multa", "Estado", "Monto Pagado", "Observaciones"]
-    ws.append(headers) # type: ignore
-
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="2F75B5", end_color="2F75B5", fill_type="solid")
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-
-    for rec in records:
-        ws.append([ # type: ignore
-            rec.get('id_historial'), rec.get('id_registro_pago'), rec.get('accion'),
-            rec.get('fecha_accion'), rec.get('id_contrato'), rec.get('periodo'),
-            rec.get('fecha_pago'), rec.get('monto_esperado'), rec.get('monto_multa'),
-            rec.get('estado'), rec.get('monto_pagado'), rec.get('observaciones')
-        ])
-        
-    for i, col in enumerate(ws.columns, 1):
-        ws.column_dimensions[get_column_letter(i)].best_fit = True # type: ignore
-
-    virtual_workbook = BytesIO()
-    wb.save(virtual_workbook)
-    return base64.b64encode(virtual_workbook.getvalue()).decode('utf-8')
+    return render('reports', report_files.audit_log_excel, records)
 
 def export_audit_log_to_csv(db_manager):
-    records = db_manager.get_payment_audit_log()
-    if not records:
+    records = _peek(db_manager.iter_payment_audit_log())
+    if records is None:
         return None
-        
-    output = StringIO()
-    writer = csv.writer(output)
-    headers = ["id_historial", "id_registro_pago", "accion", "fecha_accion", "id_contrato", "periodo", "fecha_pago", "monto_esperado", "monto_multa", "estado", "monto_pagado", "observaciones"]
-    writer.writerow(headers)
-    
-    for rec in records:
-        writer.writerow([rec.get(h) for h in headers])
-        
-    return base64.b64encode(output.getvalue().encode('utf-8')).decode('utf-8')
+    return render('reports', report_files.audit_log_csv, records)
+
 
 
 uf_data_cache = _load_uf_from_file()
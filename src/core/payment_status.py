@@ -0,0 +1,42 @@
+from src.core.periodos import month_index
+
+# Estado de pagos materializado por contrato: un mapa de bits de meses pagados (bit i = mes_base + i),
+# el primer mes impago desde el inicio del contrato y la fecha del último pago.
+
+def encode_bitmap(bitmap):
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+
+def decode_bitmap(value):
+    return int.from_bytes(value or b'', 'little')
+
+def has_month(bitmap, mes_base, month):
+    return month >= mes_base and bool((bitmap >> (month - mes_base)) & 1)
+
+def first_unpaid(bitmap, mes_base, start):
+    # Primer bit en cero desde el mes de inicio.
+    offset = start - mes_base
+    if offset < 0:
+        return start
+    free = ~(bitmap >> offset)
+    return start + (free & -free).bit_length() - 1
+
+def build_statuses(rows):
+    # rows: (id_contrato, fecha_inicio, índice de mes o None, cuenta_como_pagado, fecha_pago o None)
+    contracts = {}
+    for contract_id, fecha_inicio, month, counts, fecha_pago in rows:
+        entry = contracts.get(contract_id)
+        if entry is None:
+            entry = contracts[contract_id] = {'start': month_index(fecha_inicio), 'months': set(), 'last': None}
+        if month is not None and counts:
+            entry['months'].add(int(month))
+        if fecha_pago is not None and (entry['last'] is None or fecha_pago > entry['last']):
+            entry['last'] = fecha_pago
+
+    statuses = []
+    for contract_id, entry in contracts.items():
+        mes_base = min([entry['start'], *entry['months']])
+        bitmap = 0
+        for month in entry['months']:
+            bitmap |= 1 << (month - mes_base)
+        statuses.append((contract_id, mes_base, encode_bitmap(bitmap), first_unpaid(bitmap, mes_base, entry['start']), entry['last']))
+    return statuses
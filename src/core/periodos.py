@@ -0,0 +1,59 @@
+import datetime
+import functools
+
+# Un período es el primer día de un mes; como índice entero es año * 12 + (mes - 1).
+
+def month_index(value):
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value.strip()[:10])
+    return value.year * 12 + value.month - 1
+
+def month_start(index):
+    year, month = divmod(int(index), 12)
+    return datetime.date(year, month + 1, 1)
+
+def days_in_month(index):
+    return (month_start(index + 1) - month_start(index)).days
+
+def due_date(index, day):
+    # Un día de pago 31 vence el último día de los meses más cortos.
+    return month_start(index).replace(day=min(day, days_in_month(index)))
+
+@functools.lru_cache(maxsize=2048)
+def period_iso(index):
+    return month_start(index).isoformat()
+
+@functools.lru_cache(maxsize=2048)
+def period_label(index):
+    # Depende del locale de LC_TIME, que report_files fija al importarse.
+    return month_start(index).strftime('%B %Y').capitalize()
+
+
+class PeriodCalendar:
+    # Meses consecutivos [first, end) como índices enteros; la pertenencia se prueba contra un set de índices.
+    def __init__(self, first, end):
+        self.first = first
+        self.end = max(first, end)
+
+    @classmethod
+    def between(cls, start, end):
+        return cls(month_index(start), month_index(end))
+
+    def __len__(self):
+        return self.end - self.first
+
+    def __iter__(self):
+        return iter(range(self.first, self.end))
+
+    def __contains__(self, index):
+        return self.first <= index < self.end
+
+    @staticmethod
+    def month_set(periods):
+        return {month_index(period) for period in periods}
+
+    def unpaid(self, paid):
+        return (index for index in range(self.first, self.end) if index not in paid)
+
+    def entry(self, index):
+        return {"periodo_display": period_label(index), "periodo_iso": period_iso(index)}
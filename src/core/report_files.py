@@ -0,0 +1,327 @@
+# Generación de los archivos de exportación a partir de filas ya leídas. No importa app ni la base de datos
+# y no tiene efectos al importarse salvo el locale: los workers de proceso la cargan sin abrir conexiones.
+import datetime
+from decimal import Decimal, InvalidOperation
+import locale
+import base64
+from io import BytesIO, StringIO
+import csv
+import os
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.utils import get_column_letter
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+
+try:
+    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
+except locale.Error:
+    locale.setlocale(locale.LC_TIME, 'Spanish_Spain.1252')
+
+def format_rut(rut_str):
+    if not rut_str:
+        return ''
+    rut_str = str(rut_str).replace('.', '').replace('-', '').strip().upper()
+    if len(rut_str) < 2:
+        return rut_str
+    
+    body = rut_str[:-1]
+    verifier = rut_str[-1]
+    
+    body_formatted = f"{int(body):,}".replace(",", ".")
+    return f"{body_formatted}-{verifier}"
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(value.split(' ')[0], '%Y-%m-%d').date()
+
+def _as_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(value or '0')
+
+def history_excel(records):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Historial de Pagos")
+
+    column_widths = {'A': 30, 'B': 15, 'C': 25, 'D': 15, 'E': 15, 'F': 15, 'G': 15, 'H': 12, 'I': 40}
+    for col, width in column_widths.items():
+        ws.column_dimensions[col].width = width
+
+    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    header_alignment = Alignment(horizontal='center', vertical='center')
+
+    headers = ["Residente", "RUT", "Período/Detalle", "Fecha de Pago", "Monto Arriendo", "Monto Multa", "Total Pagado", "Estado", "Observaciones"]
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        cell.border = thin_border
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    currency_format = '$ #,##0'
+    date_format = 'DD-MM-YYYY'
+    column_formats = {3: date_format, 4: currency_format, 5: currency_format, 6: currency_format}
+    
+    for rec in records:
+        is_adjustment = rec.get('estado') == 'Ajuste'
+        periodo_display = ''
+        if is_adjustment:
+            periodo_display = (rec.get('observaciones') or 'Ajuste').split('\n')[0]
+        elif rec.get('periodo'):
+            try:
+                periodo_display = _as_date(rec['periodo']).strftime('%B %Y').capitalize()
+            except (ValueError, TypeError, AttributeError):
+                periodo_display = rec['periodo']
+
+        fecha_pago_val = None
+        if rec.get('fecha_pago'):
+            try:
+                fecha_pago_val = _as_date(rec['fecha_pago'])
+            except (ValueError, TypeError, AttributeError):
+                fecha_pago_val = rec['fecha_pago']
+
+        row_data = [
+            rec.get('residente_nombre', ''),
+            format_rut(rec.get('residente_rut', '')),
+            periodo_display,
+            fecha_pago_val,
+            _as_decimal(rec.get('monto_arriendo')) if not is_adjustment else None,
+            _as_decimal(rec.get('monto_multa')) if not is_adjustment else None, # Corregido: monto_pagado en lugar de total_pagado
+            _as_decimal(rec.get('monto_pagado')),
+            rec.get('estado', ''),
+            rec.get('observaciones', '')
+        ]
+        row_cells = []
+        for col_idx, value in enumerate(row_data):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.border = thin_border
+            if col_idx in column_formats:
+                cell.number_format = column_formats[col_idx]
+            row_cells.append(cell)
+        ws.append(row_cells)
+
+    virtual_workbook = BytesIO()
+    wb.save(virtual_workbook)
+    
+    return base64.b64encode(virtual_workbook.getvalue()).decode('utf-8')
+
+def history_pdf(records, summary=None):
+    buffer = BytesIO()
+    
+    doc = SimpleDocTemplate(buffer, pagesize=A4,
+                            rightMargin=0.25*inch, leftMargin=0.25*inch,
+                            topMargin=1.5*inch, bottomMargin=0.5*inch)
+    elements = []
+
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='Right', alignment=2))
+    styles.add(ParagraphStyle(name='Center', alignment=1))
+    styles.add(ParagraphStyle(name='PageInfo', alignment=1, fontSize=8, textColor=colors.grey))
+    styles['Title'].fontSize = 18
+    styles['Title'].spaceAfter = 0
+    
+    def format_clp(value_str):
+        if value_str is None: return '$0'
+        try:
+            num = Decimal(value_str)
+            return f"${int(num):,}".replace(",", ".")
+        except (InvalidOperation, ValueError):
+            return '$0'
+
+    def header_footer(canvas, doc):
+        canvas.saveState()
+        width, height = doc.pagesize
+
+       
+        logo_path = os.path.join(os.path.dirname(__file__), '..', 'ui', 'templates', 'car_parking_logo.png')
+        if os.path.exists(logo_path):
+            logo_height = 1.25 * inch
+            logo = Image(logo_path, width=1.25*inch, height=logo_height)
+           
+            logo_y_pos = height - doc.topMargin + (doc.topMargin - logo_height) / 2
+            logo.drawOn(canvas, doc.leftMargin, logo_y_pos)
+
+        header_text = Paragraph(
+            "<b>Reporte de Historial de Pagos</b><br/>" +
+            f"<font size=9>Generado el: {datetime.datetime.now().strftime('%d/%m/%Y %H:%M')}</font>",
+            styles['Right']
+        )
+        header_text.wrap(width - doc.rightMargin - (doc.leftMargin + 1.5*inch), doc.topMargin)
+        header_text.drawOn(canvas, doc.leftMargin + 1.5*inch, logo_y_pos)
+        
+        canvas.setStrokeColorRGB(0.2, 0.2, 0.2)
+        
+        canvas.line(doc.leftMargin, height - doc.topMargin, width - doc.rightMargin, height - doc.topMargin)
+
+       
+        page_num_text = f"Página {doc.page}"
+        page_info = Paragraph(page_num_text, styles['PageInfo'])
+        page_info.wrap(width, doc.bottomMargin)
+        page_info.drawOn(canvas, 0, doc.bottomMargin - 0.3*inch)
+        
+        canvas.line(doc.leftMargin, doc.bottomMargin, width - doc.rightMargin, doc.bottomMargin)
+        
+        canvas.restoreState()
+
+    
+    header = [Paragraph(h, styles['h5']) for h in ["Residente", "RUT", "Período", "Fecha Pago", "M. Arriendo", "M. Multa", "Total Pagado", "Estado"]]
+    data = [header]
+    total_arriendo = total_multas = total_ajustes = total_general = Decimal(0)
+
+    for rec in records:
+        is_adjustment = rec.get('estado') == 'Ajuste'
+        if summary is None:
+            monto_pagado = _as_decimal(rec.get('monto_pagado'))
+            if is_adjustment:
+                total_ajustes += monto_pagado
+            else:
+                total_arriendo += _as_decimal(rec.get('monto_arriendo'))
+                total_multas += _as_decimal(rec.get('monto_multa'))
+            total_general += monto_pagado
+        periodo_display = ''
+        if is_adjustment:
+            periodo_display = (rec.get('observaciones') or 'Ajuste').split('\n')[0]
+        elif rec.get('periodo'):
+            periodo_display = _as_date(rec['periodo']).strftime('%B %Y').capitalize()
+
+        fecha_pago_display = _as_date(rec['fecha_pago']).strftime('%d/%m/%Y') if rec.get('fecha_pago') else ''
+
+        data.append([
+            Paragraph(rec.get('residente_nombre', ''), styles['Normal']),
+            Paragraph(format_rut(rec.get('residente_rut', '')), styles['Normal']),
+            Paragraph(periodo_display, styles['Normal']),
+            Paragraph(fecha_pago_display, styles['Center']),
+            Paragraph(format_clp(rec.get('monto_arriendo')) if not is_adjustment else '-', styles['Right']),
+            Paragraph(format_clp(rec.get('monto_multa')) if not is_adjustment else '-', styles['Right']),
+            Paragraph(format_clp(rec.get('monto_pagado')), styles['Right']),
+            Paragraph(rec.get('estado', ''), styles['Center']),
+        ])
+
+    if summary is None:
+        summary = {"total_arriendo": str(total_arriendo), "total_multas": str(total_multas),
+                   "total_ajustes": str(total_ajustes), "total_general": str(total_general)}
+
+    summary_data = [
+        [Paragraph('<b>Total Arriendos</b>', styles['Normal']), format_clp(summary.get('total_arriendo'))],
+        [Paragraph('<b>Total Multas</b>', styles['Normal']), format_clp(summary.get('total_multas'))],
+        [Paragraph('<b>Total Ajustes</b>', styles['Normal']), format_clp(summary.get('total_ajustes'))],
+        [Paragraph('<b>TOTAL GENERAL</b>', styles['h4']), Paragraph(f"<b>{format_clp(summary.get('total_general'))}</b>", styles['h4'])]
+    ]
+    summary_table = Table(summary_data, colWidths=[1.5*inch, 1.5*inch])
+    summary_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 3), (-1, 3), 'Helvetica-Bold'),
+        ('LINEBELOW', (0, 2), (-1, 2), 0.5, colors.grey),
+    ]))
+    elements.append(summary_table)
+    elements.append(Spacer(1, 0.25*inch))
+
+    
+    table = Table(data, colWidths=[1.6*inch, 1.0*inch, 1.0*inch, 0.9*inch, 0.9*inch, 0.8*inch, 0.9*inch, 0.67*inch], splitByRow=1, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#4F81BD")),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (0, 1), (2, -1), 'LEFT'),
+        ('ALIGN', (4, 1), (-2, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(table)
+    doc.build(elements, onFirstPage=header_footer, onLaterPages=header_footer)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+def history_csv(records):
+    output = StringIO()
+    writer = csv.writer(output)
+    
+    headers = ["ID", "Residente", "RUT", "Periodo", "Fecha Pago", "Monto Arriendo", "Monto Multa", "Total Pagado", "Observaciones", "Estado"]
+    writer.writerow(headers)
+
+    for rec in records:
+        periodo_display = ''
+        if rec.get('periodo'):
+            try:
+                periodo_display = _as_date(rec['periodo']).strftime('%B %Y').capitalize()
+            except (ValueError, TypeError, AttributeError):
+                periodo_display = rec['periodo']
+        
+        fecha_pago_display = ''
+        if rec.get('fecha_pago'):
+            fecha_pago_display = str(rec['fecha_pago']).split(' ')[0]
+
+        row = [
+            rec.get('id', ''),
+            rec.get('residente_nombre', ''),
+            format_rut(rec.get('residente_rut', '')),
+            periodo_display,
+            fecha_pago_display,
+            _as_decimal(rec.get('monto_arriendo')), 
+            _as_decimal(rec.get('monto_multa')),
+            _as_decimal(rec.get('monto_pagado')),
+            rec.get('observaciones', ''),
+            rec.get('estado', '')
+        ]
+        writer.writerow(row)
+        
+    return base64.b64encode(output.getvalue().encode('utf-8')).decode('utf-8')
+
+def audit_log_excel(records):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Auditoría de Pagos")
+    headers = ["ID Historial", "ID Registro Pago", "Acción", "Fecha Acción", "ID Contrato", "Período", "Fecha Pago", "Monto Esperado", "Monto Multa", "Estado", "Monto Pagado", "Observaciones"]
+
+    for i in range(1, len(headers) + 1):
+        ws.column_dimensions[get_column_letter(i)].best_fit = True # type: ignore
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="2F75B5", end_color="2F75B5", fill_type="solid")
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for rec in records:
+        ws.append([ # type: ignore
+            rec.get('id_historial'), rec.get('id_registro_pago'), rec.get('accion'),
+            rec.get('fecha_accion'), rec.get('id_contrato'), rec.get('periodo'),
+            rec.get('fecha_pago'), rec.get('monto_esperado'), rec.get('monto_multa'),
+            rec.get('estado'), rec.get('monto_pagado'), rec.get('observaciones')
+        ])
+
+    virtual_workbook = BytesIO()
+    wb.save(virtual_workbook)
+    return base64.b64encode(virtual_workbook.getvalue()).decode('utf-8')
+
+def audit_log_csv(records):
+    output = StringIO()
+    writer = csv.writer(output)
+    headers = ["id_historial", "id_registro_pago", "accion", "fecha_accion", "id_contrato", "periodo", "fecha_pago", "monto_esperado", "monto_multa", "estado", "monto_pagado", "observaciones"]
+    writer.writerow(headers)
+    
+    for rec in records:
+        writer.writerow([rec.get(h) for h in headers])
+        
+    return base64.b64encode(output.getvalue().encode('utf-8')).decode('utf-8')
@@ -0,0 +1,134 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]')
+_SPACES = re.compile(r'\s+')
+
+# Términos más cortos coinciden con casi todo el índice; igual que con demasiados resultados,
+# search() devuelve None y el llamador usa LIKE en vez de un IN (...) con miles de ids.
+MIN_TERM_LENGTH = 3
+MAX_RESULTS = 1000
+# Los campos de cada residente se guardan unidos por un separador que ningún término normalizado contiene,
+# así la verificación final es un solo 'in' por candidato.
+_FIELD_SEP = '\x00'
+
+
+def normalize_text(value):
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return _SPACES.sub(' ', value.lower()).strip()
+
+
+def normalize_code(value):
+    # RUT y patentes se comparan sin puntos, guiones ni espacios.
+    return _NON_ALNUM.sub('', normalize_text(value))
+
+
+def _grams(value, size=MIN_TERM_LENGTH):
+    return {value[i:i + size] for i in range(len(value) - size + 1)}
+
+
+class ResidentSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._version = 0
+        self._docs = {}
+        self._estados = {}
+        self._postings = defaultdict(set)
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    @property
+    def version(self):
+        return self._version
+
+    def load(self, rows, version=None):
+        with self._lock:
+            if version is not None and version != self._version:
+                return False
+            self._docs.clear()
+            self._estados.clear()
+            self._postings.clear()
+            for resident_id, nombre, rut, estado, patentes in rows:
+                self._add(resident_id, nombre, rut, estado, patentes)
+            self._loaded = True
+            return True
+
+    def _add(self, resident_id, nombre, rut, estado, patentes):
+        fields = [normalize_text(nombre), normalize_code(rut)]
+        fields.extend(normalize_code(patente) for patente in patentes or () if patente)
+        fields = [field for field in fields if field]
+        self._docs[resident_id] = _FIELD_SEP.join(fields)
+        self._estados[resident_id] = estado
+        for field in fields:
+            for gram in _grams(field):
+                self._postings[gram].add(resident_id)
+
+    def _remove(self, resident_id):
+        doc = self._docs.pop(resident_id, '')
+        self._estados.pop(resident_id, None)
+        for field in doc.split(_FIELD_SEP):
+            for gram in _grams(field):
+                ids = self._postings.get(gram)
+                if ids is not None:
+                    ids.discard(resident_id)
+                    if not ids:
+                        del self._postings[gram]
+
+    def upsert(self, resident_id, nombre, rut, estado, patentes=()):
+        with self._lock:
+            self._version += 1
+            if not self._loaded:
+                return
+            self._remove(resident_id)
+            self._add(resident_id, nombre, rut, estado, patentes)
+
+    def set_estado(self, resident_id, estado):
+        with self._lock:
+            self._version += 1
+            if self._loaded and resident_id in self._estados:
+                self._estados[resident_id] = estado
+
+    def remove(self, resident_id):
+        with self._lock:
+            self._version += 1
+            if self._loaded:
+                self._remove(resident_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._loaded = False
+
+    def _candidates(self, term):
+        if len(term) == MIN_TERM_LENGTH:
+            return set(self._postings.get(term, ()))
+        grams = sorted((self._postings.get(gram, ()) for gram in _grams(term)), key=len)
+        if not grams[0]:
+            return set()
+        candidates = set(grams[0])
+        for ids in grams[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return {rid for rid in candidates if term in self._docs[rid]}
+
+    def search(self, term, estado=None):
+        text_term = normalize_text(term)
+        code_term = normalize_code(term)
+        if len(text_term) < MIN_TERM_LENGTH or (code_term and code_term != text_term and len(code_term) < MIN_TERM_LENGTH):
+            return None
+        with self._lock:
+            result = set()
+            if text_term:
+                result |= self._candidates(text_term)
+            if code_term and code_term != text_term:
+                result |= self._candidates(code_term)
+            if estado is not None:
+                result = {rid for rid in result if self._estados.get(rid) == estado}
+            return result if len(result) <= MAX_RESULTS else None
@@ -0,0 +1,98 @@
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from gevent.lock import Semaphore
+from gevent.threadpool import ThreadPool
+
+from settings.config import WORKER_POOLS_CONFIG
+
+
+class WorkerQueueFull(Exception):
+    pass
+
+
+class WorkerPool:
+    def __init__(self, name, kind='thread', workers=4, queue_size=16, queue_timeout=30):
+        self.name = name
+        self.kind = kind
+        self.workers = max(1, int(workers))
+        self.queue_timeout = queue_timeout
+        # Tareas en ejecución más tareas en espera; por encima de eso se rechaza la llamada.
+        self._slots = Semaphore(self.workers + max(0, int(queue_size)))
+        self._threads = ThreadPool(self.workers)
+        self._processes = None
+        self.active = 0
+        self.submitted = 0
+        self.rejected = 0
+
+    def _executor(self):
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._processes
+
+    def run(self, func, args=(), kwargs=None):
+        kwargs = kwargs or {}
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise WorkerQueueFull(f"El servidor está ocupado (cola '{self.name}' llena). Intente nuevamente.")
+        self.submitted += 1
+        self.active += 1
+        try:
+            # El endpoint siempre corre en un hilo: usa db_manager y la sesión del proceso principal.
+            return self._threads.apply(func._offload_target, args, kwargs)
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    def render(self, func, records, *args):
+        # Genera un archivo con filas ya leídas; se llama desde un endpoint que ya corre en un hilo del pool.
+        # En pools de proceso el hijo solo recibe una función de report_files y las filas como lista, así que
+        # nunca importa app ni abre conexiones. Con hilos las filas se siguen consumiendo en streaming.
+        if self.kind != 'process':
+            return func(records, *args)
+        return self._executor().submit(func, list(records), *args).result()
+
+    def stats(self):
+        return {
+            'kind': self.kind,
+            'workers': self.workers,
+            'active': self.active,
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+        }
+
+    def shutdown(self):
+        self._threads.kill()
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+
+_pools = {}
+
+def get_pool(name):
+    pool = _pools.get(name)
+    if pool is None:
+        pool = _pools[name] = WorkerPool(name, **WORKER_POOLS_CONFIG[name])
+    return pool
+
+def offload(pool_name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_pool(pool_name).run(wrapper, args, kwargs)
+        wrapper._offload_target = func
+        return wrapper
+    return decorator
+
+def render(pool_name, func, records, *args):
+    return get_pool(pool_name).render(func, records, *args)
+
+def get_worker_stats():
+    return {name: pool.stats() for name, pool in _pools.items()}
+
+def shutdown_workers():
+    for pool in list(_pools.values()):
+        pool.shutdown()
+    _pools.clear()
@@ -1,5 +1,5 @@
 let currentContractId = null;
-let selectedFileContentB64 = null;
+let selectedFilePath = null;
 
 const contractFormFieldsHTML = `
     <div class="overflow-y-auto flex-grow pr-2 rounded-lg space-y-4">
@@ -121,14 +121,14 @@ function initContratosView() {
 
 async function showAddView() {
     currentContractId = null;
+    selectedFilePath = null;
     updateContractRowSelection(null);
 
     document.getElementById('form-title').textContent = 'Añadir Nueva Plantilla';
     // Agregamos el input file oculto y cambiamos el onclick del botón
     document.getElementById('form-content-area').innerHTML = contractFormFieldsHTML + `
         <div class="form-group p-4 space-y-3 mt-4">
-            <input type="file" id="pdf-upload-input" accept=".pdf" style="display: none;" onchange="handleFileSelect(this)">
-            <button onclick="document.getElementById('pdf-upload-input').click()" class="btn-login w-full text-center cursor-pointer">📁 Seleccionar Archivo PDF</button>
+            <button onclick="handleFileSelect()" class="btn-login w-full text-center cursor-pointer">📁 Seleccionar Archivo PDF</button>
             <p id="file-name-label" class="text-center text-gray-400 italic">Ningún archivo seleccionado</p>
         </div>`;
     document.getElementById('form-actions').innerHTML = `
@@ -146,40 +146,25 @@ async function showAddView() {
     };
 }
 
-async function handleFileSelect(input) {
-    if (input.files && input.files[0]) {
-        const file = input.files[0];
+async function handleFileSelect() {
+    // El diálogo nativo entrega la ruta; el servidor lee el archivo directamente al subir la plantilla.
+    const filePath = await eel.select_contract_pdf()();
+    if (!filePath) return;
 
-        // Validar que sea PDF
-        if (file.type !== 'application/pdf' && !file.name.toLowerCase().endsWith('.pdf')) {
-            showCustomAlert('Archivo Inválido', 'Por favor seleccione un archivo PDF.');
-            input.value = ''; // Limpiar selección
-            return;
-        }
+    // Validar que sea PDF
+    if (!filePath.toLowerCase().endsWith('.pdf')) {
+        showCustomAlert('Archivo Inválido', 'Por favor seleccione un archivo PDF.');
+        return;
+    }
 
-        const fileName = file.name;
-        document.getElementById('file-name-label').textContent = fileName;
+    selectedFilePath = filePath;
+    const fileName = filePath.split(/[\\/]/).pop();
+    document.getElementById('file-name-label').textContent = fileName;
 
-        // Auto-llenar nombre si está vacío
-        let contractNameInput = document.getElementById('nombre_contrato');
-        if (!contractNameInput.value) {
-            contractNameInput.value = fileName.replace(/\.pdf$/i, '');
-        }
-
-        // Leer el archivo a Base64 usando FileReader
-        const reader = new FileReader();
-        reader.onload = function (e) {
-            // El resultado viene como "data:application/pdf;base64,....."
-            // Necesitamos extraer solo la parte base64 después de la coma
-            const base64String = e.target.result.split(',')[1];
-            selectedFileContentB64 = base64String;
-        };
-        reader.onerror = function (error) {
-            console.error('Error al leer el archivo:', error);
-            showCustomAlert('Error', 'No se pudo leer el archivo seleccionado.');
-            selectedFileContentB64 = null;
-        };
-        reader.readAsDataURL(file);
+    // Auto-llenar nombre si está vacío
+    let contractNameInput = document.getElementById('nombre_contrato');
+    if (!contractNameInput.value) {
+        contractNameInput.value = fileName.replace(/\.pdf$/i, '');
     }
 }
 
@@ -317,9 +302,8 @@ async function loadContractTemplates() {
 
 // Función triggerFileSelect antigua eliminada/reemplazada por handleFileSelect
 function triggerFileSelect() {
-    // Mantener por compatibilidad si algo lo llama, pero redirigir al input
-    const input = document.getElementById('pdf-upload-input');
-    if (input) input.click();
+    // Mantener por compatibilidad si algo lo llama
+    handleFileSelect();
 }
 
 async function handleUpload() {
@@ -336,10 +320,10 @@ async function handleUpload() {
         p1_moto: cleanCLP(inputP1Moto.value),
         p2_moto: cleanCLP(inputP2Moto.value),
         multa: inputMulta.value.replace(',', '.'),
-        file_content_b64: selectedFileContentB64,
+        file_path: selectedFilePath,
         nombre_archivo: document.getElementById('file-name-label').textContent
     };
-    if (!data.nombre_contrato || !data.file_content_b64) {
+    if (!data.nombre_contrato || !data.file_path) {
         showCustomAlert('Datos Incompletos', 'Debe proporcionar un nombre y seleccionar un archivo PDF.');
         return;
     }
@@ -402,16 +386,8 @@ async function handleView(templateId) {
         showCustomAlert('Error', 'No se pudo obtener el archivo del contrato.');
         return;
     }
-    const byteCharacters = atob(fileData.datos_archivo);
-    const byteNumbers = new Array(byteCharacters.length);
-    for (let i = 0; i < byteCharacters.length; i++) {
-        byteNumbers[i] = byteCharacters.charCodeAt(i);
-    }
-    const byteArray = new Uint8Array(byteNumbers);
-    const blob = new Blob([byteArray], { type: 'application/pdf' });
-    const url = URL.createObjectURL(blob);
-    window.open(url, '_blank');
-    setTimeout(() => URL.revokeObjectURL(url), 100);
+    // El PDF se descarga por HTTP desde un enlace temporal, no por el websocket de Eel.
+    window.open(fileData.url, '_blank');
 }
 
 async function handleDownload(templateId) {
@@ -421,7 +397,7 @@ async function handleDownload(templateId) {
 
         if (response.success) {
             const link = document.createElement('a');
-            link.href = `data:application/pdf;base64,${response.content_b64}`;
+            link.href = response.url;
             link.download = response.filename;
             document.body.appendChild(link);
             link.click();
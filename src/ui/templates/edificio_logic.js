@@ -147,6 +147,11 @@ async function cargarTorres() {
                         <span><i class="fas fa-building"></i> ${t.num_deptos} Deptos</span>
                         <span><i class="fas fa-car"></i> ${t.num_estac} Estac</span>
                     </div>
+                    <div class="flex gap-3 text-xs text-gray-500">
+                        <span title="Departamentos ocupados / libres">${t.deptos_ocupados}/${t.deptos_disponibles} Deptos</span>
+                        <span title="Autos ocupados / libres"><i class="fas fa-car"></i> ${t.auto_ocupados}/${t.auto_disponibles}</span>
+                        <span title="Motos ocupadas / libres"><i class="fas fa-motorcycle"></i> ${t.moto_ocupados}/${t.moto_disponibles}</span>
+                    </div>
                 </div>
                 <div class="flex gap-2 opacity-60 hover:opacity-100 transition-opacity">
                     <button onclick="editarTorre(event, ${t.id}, '${t.nombre}')" class="bg-transparent border-none text-gray-400 p-1 rounded cursor-pointer transition-all hover:bg-blue-500 hover:bg-opacity-10 hover:text-blue-400" title="Editar">
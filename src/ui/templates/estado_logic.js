@@ -48,7 +48,7 @@ async function loadResidentsList() {
             if (data.uf_info) updateUfDisplay(data.uf_info);
             sortResidents(currentSortColumn, true);
         } else {
-             if (currentViewName === 'estado') tableBody.innerHTML = '<tr><td colspan="5" class="text-center py-4 text-red-400">Error al cargar la lista.</td></tr>';
+             if (currentViewName === 'estado') tableBody.innerHTML = `<tr><td colspan="5" class="text-center py-4 text-red-400">${(data && data.error) || 'Error al cargar la lista.'}</td></tr>`;
         }
     } catch (e) {
         if (currentViewName === 'estado') tableBody.innerHTML = '<tr><td colspan="5" class="text-center py-4 text-red-400">Error de conexión.</td></tr>';
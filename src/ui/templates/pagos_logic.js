@@ -1,7 +1,11 @@
 let allPaymentRecords = [];
+let paymentHistoryFilters = {};
+let paymentHistoryCursor = null;
+let paymentHistoryTotal = 0;
 
 function initPagosView() {
     document.getElementById('pago-btn-filtrar').addEventListener('click', loadPaymentHistory);
+    document.getElementById('pago-btn-cargar-mas').addEventListener('click', loadMorePaymentHistory);
     document.getElementById('pago-btn-limpiar').addEventListener('click', clearFiltersAndLoad);
     document.getElementById('btn-show-export-modal').addEventListener('click', showExportOptionsModal);
     document.getElementById('btn-create-adjustment').addEventListener('click', showCreateAdjustmentModal);
@@ -78,6 +82,10 @@ async function loadPaymentHistory() {
         tipo: document.getElementById('pago-tipo').value,
     };
 
+    paymentHistoryFilters = filters;
+    paymentHistoryCursor = null;
+    updateLoadMore();
+
     const historyData = await eel.get_payment_history(filters)();
 
     if (currentViewName !== 'pagos') return;
@@ -88,8 +96,41 @@ async function loadPaymentHistory() {
     }
 
     allPaymentRecords = historyData.records;
+    paymentHistoryCursor = historyData.next_cursor;
+    paymentHistoryTotal = historyData.summary.total_registros;
     renderPaymentTable(allPaymentRecords);
     updateSummary(historyData.summary);
+    updateLoadMore();
+}
+
+async function loadMorePaymentHistory() {
+    if (!paymentHistoryCursor) return;
+    const btn = document.getElementById('pago-btn-cargar-mas');
+    btn.disabled = true;
+    btn.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i>Cargando...';
+
+    const historyData = await eel.get_payment_history(paymentHistoryFilters, paymentHistoryCursor)();
+
+    btn.disabled = false;
+    btn.innerHTML = '<i class="fas fa-chevron-down mr-2"></i>Cargar más';
+    if (currentViewName !== 'pagos') return;
+
+    if (historyData.error) {
+        showToast(historyData.error, false);
+        return;
+    }
+
+    allPaymentRecords = allPaymentRecords.concat(historyData.records);
+    paymentHistoryCursor = historyData.next_cursor;
+    renderPaymentTable(allPaymentRecords);
+    updateLoadMore();
+}
+
+function updateLoadMore() {
+    const container = document.getElementById('pagos-historial-more');
+    if (!container) return;
+    container.classList.toggle('hidden', !paymentHistoryCursor);
+    document.getElementById('pagos-historial-count').textContent = `Mostrando ${allPaymentRecords.length} de ${paymentHistoryTotal} registros`;
 }
 
 function renderPaymentTable(records) {
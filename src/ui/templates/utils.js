@@ -29,4 +29,32 @@ function formatRutString(rutString) {
     body = new Intl.NumberFormat('de-DE').format(body);
 
     return `${body}-${dv}`;
+}
+
+// Pool de conexiones o cola de workers llenos: el servidor lanza la excepción y aquí se avisa una sola vez
+// para todas las llamadas. La promesa sigue rechazada para que cada vista mantenga su manejo de errores.
+const SERVER_BUSY_ERRORS = ['PoolTimeout', 'WorkerQueueFull'];
+
+function isServerBusyError(error) {
+    const text = (error && error.errorText) || '';
+    return SERVER_BUSY_ERRORS.some(name => text.startsWith(name + '('));
+}
+
+if (typeof eel !== 'undefined' && eel._call_return) {
+    const callReturn = eel._call_return;
+    eel._call_return = function (call) {
+        const invoke = callReturn(call);
+        return function (callback = null) {
+            const result = invoke(callback);
+            if (result && typeof result.catch === 'function') {
+                result.catch(error => {
+                    if (!isServerBusyError(error)) return;
+                    const message = 'El servidor está ocupado. Intente nuevamente en unos segundos.';
+                    if (typeof showToast === 'function') showToast(message, false);
+                    else alert(message);
+                });
+            }
+            return result;
+        };
+    };
 }
\ No newline at end of file
@@ -0,0 +1,21 @@
+import statistics
+import time
+
+import pytest
+
+
+@pytest.fixture
+def bench(request):
+    # Mide func varias veces e informa la mediana; devuelve la mediana en segundos.
+    def run(func, rounds=20, warmup=1, label=None):
+        for _ in range(warmup):
+            func()
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        median = statistics.median(times)
+        print(f"\n{label or request.node.name}: mediana {median * 1000:.2f} ms, mínimo {min(times) * 1000:.2f} ms ({rounds} rondas)")
+        return median
+    return run
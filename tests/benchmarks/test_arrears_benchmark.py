@@ -0,0 +1,67 @@
+import datetime
+import random
+
+import pytest
+
+from src.core.payment_status import build_statuses
+from src.core.periodos import month_index, month_start
+
+pytestmark = pytest.mark.benchmark
+
+CONTRACTS = 10000
+MONTHS = 120
+RESIDENTS = 6000
+TODAY = datetime.date(2025, 12, 20)
+
+
+class _StatusRows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_all_active_residents_for_status(self, native=False):
+        return self.rows
+
+
+@pytest.fixture(scope='module')
+def status_rows():
+    # 10.000 contratos con 10 años de pagos, materializados como en estado_pagos_contrato.
+    rng = random.Random(22)
+    first = month_index(TODAY) - MONTHS + 1
+    starts = {i: month_start(first).replace(day=rng.randint(1, 28)) for i in range(CONTRACTS)}
+    payments = []
+    for contract_id, fecha_inicio in starts.items():
+        missing = {rng.randrange(MONTHS) for _ in range(rng.choice((0, 0, 1, 3)))}
+        payments += [(contract_id, fecha_inicio, first + m, True, None) for m in range(MONTHS + 1) if m not in missing]
+
+    rows = []
+    for contract_id, mes_base, meses_pagados, primer_mes_impago, _ in build_statuses(payments):
+        resident = contract_id % RESIDENTS
+        rows.append({
+            'id_residente': resident, 'nombre_completo': f"Residente {resident:05d}", 'rut': f"{resident}-K",
+            'id_contrato': contract_id, 'fecha_inicio': starts[contract_id], 'nombre_contrato': f"Contrato {contract_id}",
+            'mes_base': mes_base, 'meses_pagados': meses_pagados, 'primer_mes_impago': primer_mes_impago,
+        })
+    rows.sort(key=lambda row: row['nombre_completo'])
+    return _StatusRows(rows)
+
+
+def test_arrears_for_ten_thousand_contracts(pagos, status_rows, bench):
+    # El recorrido mes a mes visitaba hasta 1,2 millones de meses; ahora se leen columnas materializadas.
+    groups = [row['id_residente'] for row in status_rows.rows]
+    by_resident = pagos._evaluate_status(status_rows.rows, groups, RESIDENTS, TODAY)
+    median = bench(lambda: pagos._evaluate_status(status_rows.rows, groups, RESIDENTS, TODAY))
+
+    assert len(by_resident['estado']) == RESIDENTS
+    assert median < 0.02
+
+
+def test_status_list_for_ten_thousand_contracts(pagos, monkeypatch, status_rows, bench):
+    # Incluye agrupar por residente y armar las filas de la pantalla, que es trabajo por residente en Python.
+    monkeypatch.setitem(pagos.uf_data_cache, 'date', TODAY)
+    result = pagos.get_resident_status_list(status_rows)
+    median = bench(lambda: pagos.get_resident_status_list(status_rows))
+
+    estados = {row['estado'] for row in result['status_list']}
+    assert len(result['status_list']) == RESIDENTS
+    assert {'Atrasado', 'Adelantado'} <= estados
+    assert median < 0.1
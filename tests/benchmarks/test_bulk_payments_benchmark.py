@@ -0,0 +1,36 @@
+import datetime
+import itertools
+from decimal import Decimal
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+ROUNDS = 10
+
+
+@pytest.fixture(scope='module')
+def fresh_contracts(seeded_database):
+    # Cada ronda paga meses nuevos de un contrato distinto, para medir inserciones y no sobrescrituras.
+    return itertools.count(1)
+
+
+def _batch(contract_id, periods):
+    first = datetime.date(2026, 1, 1)
+    return [{
+        'id_contrato': contract_id,
+        'periodo': datetime.date(first.year + month // 12, month % 12 + 1, 1).isoformat(),
+        'monto_esperado': Decimal('30000'), 'monto_multa': Decimal('0'),
+        'monto_pagado': Decimal('30000'), 'observaciones': 'Pago de prueba'
+    } for month in range(periods)]
+
+
+@pytest.mark.parametrize('periods', [1, 12, 120])
+def test_register_bulk_payments(seeded_database, fresh_contracts, bench, periods):
+    def pay():
+        ok, message = seeded_database.register_bulk_payments(_batch(next(fresh_contracts), periods))
+        assert ok, message
+
+    with seeded_database.session():
+        median = bench(pay, rounds=ROUNDS, label=f"register_bulk_payments ({periods} períodos)")
+    assert median < 0.5
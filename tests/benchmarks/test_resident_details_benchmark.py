@@ -0,0 +1,53 @@
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+VEHICLES = 40
+BOXES = 40
+APARTMENTS = 4
+PAYERS = 4
+
+
+@pytest.fixture(scope='module')
+def large_resident(db_manager):
+    with db_manager.session():
+        db_manager._ensure_connection()
+        cursor = db_manager.connection.cursor()
+        try:
+            cursor.execute(f"SELECT id FROM estacionamientos WHERE estado = 'DISPONIBLE' ORDER BY id LIMIT {BOXES}")
+            box_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f"SELECT id FROM departamentos WHERE estado = 'DISPONIBLE' ORDER BY id LIMIT {APARTMENTS}")
+            apartment_ids = [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+        data = {
+            'residente': {'nombre_completo': 'Residente Con Muchos Vehículos', 'rut': '22222222-2', 'email': '', 'telefono': ''},
+            'departamentos': apartment_ids,
+            'pagadores_secundarios': [{'nombre_completo': f"Pagador {i}", 'rut': f"3000000{i}-K"} for i in range(PAYERS)],
+            'vehiculos': [{'patente': f"BN{i:04d}", 'marca': 'Marca', 'modelo': 'Modelo', 'tag': f"TAGBN{i:04d}",
+                           'tipo': 'AUTO' if i % 2 else 'MOTO'} for i in range(VEHICLES)],
+            'estacionamientos': [{'id': box_id} for box_id in box_ids],
+            'contrato': {'id_contrato_archivo': 36, 'fecha_inicio': '2024-01-10'},
+        }
+        ok, message = db_manager.save_resident(data)
+        assert ok, message
+        cursor = db_manager.connection.cursor()
+        try:
+            cursor.execute("SELECT id FROM residentes WHERE rut = %s", ('22222222-2',))
+            return cursor.fetchall()[0][0]
+        finally:
+            cursor.close()
+
+
+def test_resident_details_with_many_vehicles_and_boxes(db_manager, large_resident, bench):
+    with db_manager.session():
+        details = db_manager.get_resident_details(large_resident)
+        # El JOIN anterior devolvía PAYERS × APARTMENTS × VEHICLES × BOXES filas (25.600); ahora es una sola.
+        median = bench(lambda: db_manager.get_resident_details(large_resident), rounds=50)
+
+    assert len(details['vehiculos']) == VEHICLES
+    assert len(details['estacionamientos']) == BOXES
+    assert len(details['departamentos']) == APARTMENTS
+    assert len(details['pagadores_secundarios']) == PAYERS
+    assert median < 0.05
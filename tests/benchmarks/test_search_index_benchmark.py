@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from src.core.search_index import MAX_RESULTS, ResidentSearchIndex
+
+pytestmark = pytest.mark.benchmark
+
+RESIDENTS = 20000
+NOMBRES = ['José', 'María', 'Ana', 'Pedro', 'Camila', 'Javier', 'Valentina', 'Diego', 'Sofía', 'Matías']
+APELLIDOS = ['Núñez', 'González', 'Pérez', 'Muñoz', 'Rojas', 'Díaz', 'Soto', 'Contreras', 'Silva', 'Martínez',
+             'Sepúlveda', 'Morales', 'Rodríguez', 'López', 'Fuentes', 'Hernández', 'Torres', 'Araya', 'Flores', 'Espinoza']
+
+
+@pytest.fixture(scope='module')
+def index():
+    # 20.000 residentes con uno o dos vehículos, como la carga completa de _load_search_index.
+    rng = random.Random(8)
+    rows = []
+    for rid in range(1, RESIDENTS + 1):
+        nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+        rut = f"{5_000_000 + rid * 997:,}".replace(',', '.') + f"-{rng.choice('0123456789K')}"
+        patentes = [f"{rng.choice('BCDFGHJKLP')}{rng.choice('BCDFGHJKLP')}{rng.choice('RSTVWXYZ')}{rng.randint(1000, 9999)}"
+                    for _ in range(rng.randint(1, 2))]
+        rows.append((rid, nombre, rut, 'Activo' if rid % 4 else 'Inactivo', patentes))
+    index = ResidentSearchIndex()
+    index.load(rows)
+    return index
+
+
+@pytest.mark.parametrize('term', ['14.970.997', 'gonzalez munoz', 'BCR'])
+def test_selective_lookup_is_sub_millisecond(index, term, bench):
+    result = index.search(term, 'Activo')
+    median = bench(lambda: index.search(term, 'Activo'), rounds=200)
+
+    assert result and len(result) <= MAX_RESULTS
+    assert median < 0.001
+
+
+@pytest.mark.parametrize('term', ['ez', 'gonzalez', 'ana'])
+def test_broad_terms_fall_back_to_like(index, term, bench):
+    # Términos cortos o muy amplios devuelven None: la consulta usa LIKE en vez de un IN (...) con miles de ids.
+    assert index.search(term) is None
+    median = bench(lambda: index.search(term), rounds=200)
+
+    assert median < 0.005
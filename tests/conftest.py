@@ -0,0 +1,169 @@
+import datetime
+import locale
+import os
+import sys
+import tempfile
+
+import mysql.connector
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Las pruebas nunca tocan la base de datos ni el almacén de archivos reales.
+TEST_DATABASE = os.environ.get('TEST_DB_DATABASE', 'estacionamiento_test')
+os.environ['DB_DATABASE'] = TEST_DATABASE
+os.environ['BLOB_STORE_DIR'] = tempfile.mkdtemp(prefix='blobs_test_')
+
+DUMPS_DIR = os.path.join(ROOT_DIR, 'database', 'tablas_database_sql')
+
+
+def pytest_addoption(parser):
+    parser.addoption('--benchmarks', action='store_true', default=False,
+                     help="Ejecuta también las pruebas de rendimiento de tests/benchmarks.")
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', "benchmark: prueba de rendimiento; solo se ejecuta con --benchmarks")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmarks'):
+        return
+    skip = pytest.mark.skip(reason="Prueba de rendimiento: ejecute con --benchmarks")
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
+class FakeConnection:
+    in_transaction = False
+
+    def __init__(self, **config):
+        self.closed = False
+
+    def cursor(self, *args, **kwargs):
+        raise AssertionError("no se esperaban consultas")
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    # Conexiones sin servidor, para probar pools y enrutamiento.
+    monkeypatch.setattr(mysql.connector, 'connect', FakeConnection)
+    return FakeConnection
+
+
+@pytest.fixture
+def pagos():
+    # src.core.pagos fija el locale español al importarse.
+    try:
+        from src.core import pagos
+    except locale.Error as err:
+        pytest.skip(f"Locale español no disponible: {err}")
+    return pagos
+
+
+SEED_CONTRACTS = 80
+SEED_MONTHS = 120
+SEED_FIRST_PERIOD = datetime.date(2016, 1, 1)
+
+
+def _dump_statements(path):
+    # Solo CREATE TABLE e INSERT: el resto del volcado (GTID, variables de sesión) no hace falta y puede exigir privilegios.
+    statements, buffer = [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stripped = line.strip()
+            if not buffer and not stripped.startswith(('CREATE TABLE', 'INSERT INTO')):
+                continue
+            buffer.append(line.rstrip('\r\n'))
+            if stripped.endswith(';'):
+                statements.append('\n'.join(buffer).rstrip(';'))
+                buffer = []
+    return statements
+
+
+@pytest.fixture(scope='session')
+def test_database():
+    from settings.config import DB_CONFIG
+    config = {k: v for k, v in DB_CONFIG.items() if k not in ('database', 'raise_on_warnings')}
+    try:
+        connection = mysql.connector.connect(connection_timeout=3, **config)
+    except mysql.connector.Error as err:
+        pytest.skip(f"Servidor MySQL no disponible: {err}")
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{TEST_DATABASE}`")
+        cursor.execute(f"CREATE DATABASE `{TEST_DATABASE}`")
+        cursor.execute(f"USE `{TEST_DATABASE}`")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for file_name in sorted(os.listdir(DUMPS_DIR)):
+            for statement in _dump_statements(os.path.join(DUMPS_DIR, file_name)):
+                cursor.execute(statement)
+        connection.commit()
+        yield TEST_DATABASE
+    finally:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{TEST_DATABASE}`")
+        cursor.close()
+        connection.close()
+
+
+@pytest.fixture(scope='session')
+def db_manager(test_database):
+    from src.core.db_manager import DBManager
+    from src.core.migrations import run_migrations
+
+    manager = DBManager()
+    assert manager.connect()
+    with manager.session():
+        assert run_migrations(manager)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture(scope='session')
+def seeded_database(db_manager):
+    # Volumen suficiente para que el optimizador elija índices como en producción: 80 contratos con 10 años de pagos.
+    with db_manager.session():
+        db_manager._ensure_connection()
+        connection = db_manager.connection
+        cursor = connection.cursor()
+        try:
+            ids = range(1, SEED_CONTRACTS + 1)
+            cursor.executemany(
+                "INSERT INTO residentes (id, nombre_completo, rut, estado) VALUES (%s, %s, %s, %s)",
+                [(i, f"Residente Prueba {i:03d}", f"{i}-T", 'Inactivo' if i % 3 == 0 else 'Activo') for i in ids]
+            )
+            cursor.executemany(
+                "INSERT INTO contratos (id, id_residente, id_contrato_archivo, fecha_inicio, estado) VALUES (%s, %s, 36, %s, 'Vigente')",
+                [(i, i, SEED_FIRST_PERIOD) for i in ids]
+            )
+            payments = []
+            for i in ids:
+                for month in range(SEED_MONTHS):
+                    periodo = datetime.date(SEED_FIRST_PERIOD.year + month // 12, month % 12 + 1, 1)
+                    fecha_pago = datetime.datetime.combine(periodo, datetime.time(12)) + datetime.timedelta(days=(i + month) % 20)
+                    estado = 'Ajuste' if (i + month) % 50 == 0 else 'Pagado'
+                    multa = 5000 if (i + month) % 20 == 0 else 0
+                    payments.append((i, periodo, fecha_pago, 30000, multa, estado, 30000 + multa, 'Pago de prueba'))
+            cursor.executemany(
+                "INSERT INTO registros_pago (id_contrato, periodo, fecha_pago, monto_esperado, monto_multa, estado, monto_pagado, observaciones) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                payments
+            )
+            db_manager._refresh_payment_status(ids)
+            connection.commit()
+            for table in ('residentes', 'contratos', 'registros_pago', 'estado_pagos_contrato'):
+                cursor.execute(f"ANALYZE TABLE {table}")
+                cursor.fetchall()
+        finally:
+            cursor.close()
+    return db_manager
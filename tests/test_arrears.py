@@ -0,0 +1,140 @@
+import datetime
+import random
+
+import pytest
+
+from src.core import arrears
+from src.core.payment_status import build_statuses, encode_bitmap, has_month
+from src.core.periodos import days_in_month, due_date, month_index, month_start
+
+
+def _reference_status(contracts, payments, current_date):
+    # Recorrido mes a mes de la versión anterior de get_resident_status_list, con el vencimiento acotado al largo del mes.
+    status = "Al día"
+    dias_de_atraso = 0
+    all_pagos_realizados = set()
+    for contract_id, fecha_inicio in contracts:
+        pagos_del_contrato = payments.get(contract_id, set())
+        all_pagos_realizados.update(pagos_del_contrato)
+        mes_a_evaluar = fecha_inicio.replace(day=1)
+        while mes_a_evaluar <= current_date.replace(day=1):
+            if mes_a_evaluar not in pagos_del_contrato:
+                fecha_vencimiento = due_date(month_index(mes_a_evaluar), fecha_inicio.day)
+                if current_date > fecha_vencimiento:
+                    dias_de_atraso = max(dias_de_atraso, (current_date - fecha_vencimiento).days)
+                    status = "Atrasado" if dias_de_atraso >= 30 else "Pendiente"
+                    break
+            mes_a_evaluar = (mes_a_evaluar.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+    if status == "Al día":
+        mes_siguiente = (current_date.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        if mes_siguiente in all_pagos_realizados:
+            status = "Adelantado"
+    return status, dias_de_atraso
+
+
+class _StatusRows:
+    # Filas de get_all_active_residents_for_status(native=True), materializadas como en _refresh_payment_status.
+    def __init__(self, residents, payments):
+        contracts = {contract_id: (group, fecha_inicio)
+                     for group, resident in enumerate(residents) for contract_id, fecha_inicio in resident}
+        # Como el LEFT JOIN con registros_pago: un contrato sin pagos llega con una fila de nulos.
+        payment_rows = []
+        for contract_id, (_, fecha_inicio) in contracts.items():
+            months = [month_index(periodo) for periodo in payments.get(contract_id, ())] or [None]
+            payment_rows += [(contract_id, fecha_inicio, month, month is not None, None) for month in months]
+        self.rows = []
+        for contract_id, mes_base, meses_pagados, primer_mes_impago, _ in build_statuses(payment_rows):
+            group, fecha_inicio = contracts[contract_id]
+            self.rows.append({
+                'id_residente': group, 'nombre_completo': f"Residente {group:04d}", 'rut': f"{group}-K",
+                'id_contrato': contract_id, 'fecha_inicio': fecha_inicio, 'nombre_contrato': f"Contrato {contract_id}",
+                'mes_base': mes_base, 'meses_pagados': meses_pagados, 'primer_mes_impago': primer_mes_impago,
+            })
+        self.rows.sort(key=lambda row: (row['id_residente'], row['id_contrato']))
+
+    def get_all_active_residents_for_status(self, native=False):
+        return self.rows
+
+
+@pytest.fixture
+def status_list(pagos, monkeypatch):
+    def run(residents, payments, current_date):
+        monkeypatch.setitem(pagos.uf_data_cache, 'date', current_date)
+        result = pagos.get_resident_status_list(_StatusRows(residents, payments))
+        return [(row['estado'], row['dias_atraso']) for row in result['status_list']]
+    return run
+
+
+def _random_residents(rng, count, current_date):
+    residents, payments, contract_id = [], {}, 0
+    current = month_index(current_date)
+    for _ in range(count):
+        contracts = []
+        for _ in range(rng.randint(1, 3)):
+            contract_id += 1
+            start = current - rng.randint(0, 36)
+            fecha_inicio = month_start(start).replace(day=rng.randint(1, days_in_month(start)))
+            paid_ratio = rng.choice((1.0, 0.97, 0.8))
+            payments[contract_id] = {month_start(m) for m in range(start, current + 3) if rng.random() < paid_ratio}
+            contracts.append((contract_id, fecha_inicio))
+        residents.append(contracts)
+    return residents, payments
+
+
+@pytest.mark.parametrize('current_date', [
+    datetime.date(2025, 1, 15),
+    datetime.date(2024, 2, 29),
+    datetime.date(2025, 3, 1),
+    datetime.date(2025, 4, 30),
+    datetime.date(2025, 12, 31),
+])
+def test_matches_month_by_month_loop(status_list, current_date):
+    rng = random.Random(current_date.toordinal())
+    residents, payments = _random_residents(rng, 300, current_date)
+    expected = [_reference_status(contracts, payments, current_date) for contracts in residents]
+    assert status_list(residents, payments, current_date) == expected
+
+
+@pytest.mark.parametrize('fecha_inicio, unpaid, current_date, expected', [
+    # Día de pago 31: vence el último día de febrero (bisiesto y no bisiesto) y de los meses de 30 días.
+    (datetime.date(2024, 1, 31), datetime.date(2024, 2, 1), datetime.date(2024, 2, 29), ("Al día", 0)),
+    (datetime.date(2024, 1, 31), datetime.date(2024, 2, 1), datetime.date(2024, 3, 1), ("Pendiente", 1)),
+    (datetime.date(2025, 1, 31), datetime.date(2025, 2, 1), datetime.date(2025, 3, 1), ("Pendiente", 1)),
+    (datetime.date(2025, 1, 31), datetime.date(2025, 4, 1), datetime.date(2025, 4, 30), ("Al día", 0)),
+    (datetime.date(2025, 1, 31), datetime.date(2025, 4, 1), datetime.date(2025, 5, 30), ("Atrasado", 30)),
+    (datetime.date(2025, 1, 30), datetime.date(2025, 2, 1), datetime.date(2025, 3, 30), ("Atrasado", 30)),
+])
+def test_payment_day_is_clamped_to_month_length(status_list, fecha_inicio, unpaid, current_date, expected):
+    start = month_index(fecha_inicio)
+    paid = {month_start(m) for m in range(start, month_index(current_date) + 1)} - {unpaid}
+    residents, payments = [[(1, fecha_inicio)]], {1: paid}
+    assert _reference_status(residents[0], payments, current_date) == expected
+    assert status_list(residents, payments, current_date) == [expected]
+
+
+def test_resident_takes_worst_contract_and_any_paid_ahead(status_list):
+    current_date = datetime.date(2025, 6, 20)
+    residents = [
+        [(1, datetime.date(2025, 1, 5)), (2, datetime.date(2025, 1, 10))],
+        [(3, datetime.date(2025, 1, 5)), (4, datetime.date(2025, 1, 5))],
+    ]
+    months = [datetime.date(2025, m, 1) for m in range(1, 7)]
+    payments = {
+        1: set(months) - {datetime.date(2025, 6, 1)},
+        2: set(months) - {datetime.date(2025, 5, 1)},
+        3: set(months),
+        4: set(months) | {datetime.date(2025, 7, 1)},
+    }
+    assert status_list(residents, payments, current_date) == [("Atrasado", 41), ("Adelantado", 0)]
+
+
+def test_months_paid_matches_bitmap_lookup():
+    rng = random.Random(22)
+    bitmaps = [rng.getrandbits(rng.randint(0, 40)) for _ in range(500)]
+    bases = [rng.randint(100, 140) for _ in bitmaps]
+    for month in (95, 120, 135, 185):
+        expected = [has_month(bitmap, base, month) for bitmap, base in zip(bitmaps, bases)]
+        result = arrears.months_paid([encode_bitmap(bitmap) for bitmap in bitmaps], bases, month)
+        assert result.tolist() == expected
+    assert arrears.months_paid([encode_bitmap(0)], [120], 120).tolist() == [False]
@@ -0,0 +1,104 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+CONTRACT = 95
+
+
+def _payment(periodo, monto_esperado='30000', monto_multa='0', monto_pagado='30000', observaciones='Arriendo'):
+    return {
+        'id_contrato': CONTRACT, 'periodo': periodo, 'monto_esperado': Decimal(monto_esperado),
+        'monto_multa': Decimal(monto_multa), 'monto_pagado': Decimal(monto_pagado), 'observaciones': observaciones
+    }
+
+
+def _record(db_manager, periodo):
+    db_manager._ensure_connection()
+    cursor = db_manager.connection.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT fecha_pago, monto_esperado, monto_multa, estado, monto_pagado, observaciones
+            FROM registros_pago WHERE id_contrato = %s AND periodo = %s
+        """, (CONTRACT, datetime.date.fromisoformat(periodo)))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    assert len(rows) == 1
+    return rows[0]
+
+
+def _pay(db_manager, *payments):
+    ok, message = db_manager.register_bulk_payments(list(payments))
+    assert ok, message
+
+
+@pytest.fixture
+def session(db_manager):
+    with db_manager.session():
+        yield db_manager
+
+
+def test_new_period_is_inserted_as_pagado(session):
+    _pay(session, _payment('2031-01-01'))
+    record = _record(session, '2031-01-01')
+    assert record['estado'] == 'Pagado'
+    assert (record['monto_esperado'], record['monto_multa'], record['monto_pagado']) == (Decimal('30000'), 0, Decimal('30000'))
+    assert record['fecha_pago'] is not None
+
+
+def test_fine_on_pagado_period_is_added(session):
+    _pay(session, _payment('2031-02-01'))
+    fecha_pago = _record(session, '2031-02-01')['fecha_pago']
+
+    _pay(session, _payment('2031-02-01', monto_multa='5000', monto_pagado='5000', observaciones='Multa'))
+    record = _record(session, '2031-02-01')
+    assert record['estado'] == 'Pagado'
+    assert record['monto_esperado'] == Decimal('30000')
+    assert record['monto_multa'] == Decimal('5000')
+    assert record['monto_pagado'] == Decimal('35000')
+    assert record['observaciones'] == 'Arriendo\\nMulta'
+    assert record['fecha_pago'] == fecha_pago
+
+
+def test_pagado_period_without_fine_is_overwritten(session):
+    _pay(session, _payment('2031-03-01'))
+    _pay(session, _payment('2031-03-01', monto_esperado='32000', monto_pagado='32000', observaciones='Corrección'))
+    record = _record(session, '2031-03-01')
+    assert (record['monto_esperado'], record['monto_pagado'], record['observaciones']) == (Decimal('32000'), Decimal('32000'), 'Corrección')
+
+
+def test_non_pagado_period_is_overwritten(session):
+    session._ensure_connection()
+    cursor = session.connection.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO registros_pago (id_contrato, periodo, fecha_pago, monto_esperado, monto_multa, estado, monto_pagado, observaciones)
+            VALUES (%s, '2031-04-01', NULL, 28000, 1000, 'Pendiente', 0, 'Pendiente de pago')
+        """, (CONTRACT,))
+        session.connection.commit()
+    finally:
+        cursor.close()
+
+    _pay(session, _payment('2031-04-01', monto_multa='2000', monto_pagado='32000', observaciones='Pago con multa'))
+    record = _record(session, '2031-04-01')
+    assert record['estado'] == 'Pagado'
+    assert record['monto_esperado'] == Decimal('30000')
+    assert record['monto_multa'] == Decimal('2000')
+    assert record['monto_pagado'] == Decimal('32000')
+    assert record['observaciones'] == 'Pago con multa'
+    assert record['fecha_pago'] is not None
+
+
+def test_duplicate_period_in_one_batch_behaves_like_sequential_writes(session):
+    # La segunda fila ve la primera ya insertada como 'Pagado' y solo suma la multa.
+    _pay(session, _payment('2031-05-01'), _payment('2031-05-01', monto_multa='5000', monto_pagado='5000', observaciones='Multa'))
+    record = _record(session, '2031-05-01')
+    assert record['monto_multa'] == Decimal('5000')
+    assert record['monto_pagado'] == Decimal('35000')
+    assert record['observaciones'] == 'Arriendo\\nMulta'
+
+    # Sin multa la fila repetida sobrescribe a la anterior.
+    _pay(session, _payment('2031-06-01'), _payment('2031-06-01', monto_esperado='31000', monto_pagado='31000', observaciones='Segunda'))
+    record = _record(session, '2031-06-01')
+    assert (record['monto_esperado'], record['monto_pagado'], record['observaciones']) == (Decimal('31000'), Decimal('31000'), 'Segunda')
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from src.core.blob_store import BlobNotFound, BlobStore
+from src.core.db_manager import DBManager
+
+
+def _contract_columns(cursor):
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'contratos_archivos'
+    """)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def test_migration_moves_dump_pdfs_to_blob_store(db_manager):
+    with db_manager.session():
+        db_manager._ensure_connection()
+        cursor = db_manager.connection.cursor()
+        try:
+            columns = _contract_columns(cursor)
+            cursor.execute("SELECT id, hash_archivo, tamano_archivo FROM contratos_archivos WHERE id IN (36, 37) ORDER BY id")
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+    assert 'datos_archivo' not in columns
+    assert {'hash_archivo', 'tamano_archivo'} <= columns
+    assert [row[0] for row in rows] == [36, 37]
+    for _, digest, size in rows:
+        assert db_manager.blob_store.size(digest) == size
+        with open(db_manager.blob_store.path_for(digest), 'rb') as f:
+            assert f.read(5) == b'%PDF-'
+
+
+def test_template_round_trip_releases_blob(db_manager):
+    digest, size = db_manager.blob_store.put_bytes(b'%PDF-1.4 plantilla de prueba')
+    data = {
+        'nombre_contrato': 'Contrato de prueba', 'descripcion': None, 'nombre_archivo': 'prueba_plantilla.pdf',
+        'p1_auto': '30000', 'p2_auto': '25000', 'p1_moto': '15000', 'p2_moto': '0', 'multa': '0.5'
+    }
+    with db_manager.session():
+        ok, message = db_manager.save_contract_template(data, (digest, size))
+        assert ok, message
+        template = next(t for t in db_manager.get_contract_templates() if t['nombre_archivo'] == 'prueba_plantilla.pdf')
+        assert db_manager.get_contract_file(template['id']) == {
+            'nombre_archivo': 'prueba_plantilla.pdf', 'hash_archivo': digest, 'tamano_archivo': size
+        }
+        ok, message = db_manager.delete_contract_template(template['id'])
+        assert ok, message
+
+    assert not db_manager.blob_store.exists(digest)
+
+
+class _ReferenceCursor:
+    # Responde la consulta de _release_blob según las filas confirmadas en references.
+    def __init__(self, references):
+        self.references = references
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        self.rows = [(1,)] if params[0] in self.references else []
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def blob_manager(tmp_path):
+    manager = DBManager()
+    manager.blob_store = BlobStore(str(tmp_path))
+    return manager
+
+
+def test_release_waits_for_concurrent_insert_to_commit(blob_manager):
+    digest, _ = blob_manager.blob_store.put_bytes(b'%PDF-1.4 contenido compartido')
+    references = set()
+    inside = threading.Event()
+
+    def save():
+        with blob_manager._blob_reference(digest):
+            inside.set()
+            time.sleep(0.2)
+            references.add(digest)  # COMMIT de la plantilla nueva
+
+    thread = threading.Thread(target=save)
+    thread.start()
+    assert inside.wait(timeout=5)
+    blob_manager._release_blob(_ReferenceCursor(references), digest)
+    thread.join(timeout=5)
+
+    assert blob_manager.blob_store.exists(digest)
+
+
+def test_insert_after_release_fails_instead_of_pointing_at_deleted_blob(blob_manager):
+    digest, _ = blob_manager.blob_store.put_bytes(b'%PDF-1.4 contenido compartido')
+    blob_manager._release_blob(_ReferenceCursor(set()), digest)
+
+    with pytest.raises(BlobNotFound):
+        with blob_manager._blob_reference(digest):
+            pass
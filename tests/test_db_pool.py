@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+from src.core.db_pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def pool(fake_connect):
+    pool = ConnectionPool({}, size=1, timeout=2)
+    yield pool
+    pool.close()
+
+
+def test_reuses_released_connection(pool):
+    slot = pool.acquire()
+    pool.release(slot)
+    assert pool.acquire() is slot
+    assert pool.stats()['open'] == 1
+
+
+def test_times_out_when_pool_is_exhausted(pool):
+    pool.timeout = 0.1
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_waiter_wakes_up_when_connection_is_discarded(pool):
+    slot = pool.acquire()
+    result = {}
+
+    def waiter():
+        start = time.monotonic()
+        result['slot'] = pool.acquire()
+        result['waited'] = time.monotonic() - start
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)
+    # Conexión perdida: libera cupo sin devolver nada a la cola de libres.
+    pool.release(slot, discard=True)
+    thread.join(timeout=5)
+
+    assert result['slot'] is not slot
+    assert result['waited'] < 1
+    assert slot.raw.closed
+    assert pool.stats()['open'] == 1
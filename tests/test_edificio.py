@@ -0,0 +1,94 @@
+import mysql.connector
+import pytest
+
+from src.core import edificio
+
+
+class _UnitsCursor:
+    # Simula la restricción única de la tabla: un INSERT con una fila repetida falla completo, como en InnoDB.
+    def __init__(self, database):
+        self.database = database
+        self.rows = []
+
+    def execute(self, query, params=()):
+        if query.startswith('SELECT'):
+            self.rows = [(numero, tipo) for _, numero, tipo in self.database.committed]
+            return
+        self.database.statements += 1
+        rows = [tuple(params[i:i + 3]) for i in range(0, len(params), 3)]
+        for row in rows:
+            if row[1] in self.database.taken:
+                raise mysql.connector.IntegrityError(msg=f"Duplicate entry '{row[1]}'", errno=1062)
+            if self.database.deadlock_on == row[1]:
+                raise mysql.connector.DatabaseError(msg="Deadlock found", errno=edificio.DEADLOCK_ERRNO)
+        self.database.pending.extend(rows)
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class _UnitsDatabase:
+    def __init__(self, taken=(), deadlock_on=None):
+        self.taken = set(taken)
+        self.deadlock_on = deadlock_on
+        self.committed = []
+        self.pending = []
+        self.statements = 0
+        self.connection = self
+
+    def _ensure_connection(self):
+        pass
+
+    def invalidate_resources_cache(self):
+        pass
+
+    def cursor(self):
+        return _UnitsCursor(self)
+
+    def commit(self):
+        self.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+def test_conflicting_row_is_reported_and_rest_of_chunk_is_inserted():
+    # '1207' lo insertó otra sesión después de leer los existentes.
+    database = _UnitsDatabase(taken={'1207'})
+    result = edificio.create_departamentos_ranges(database, 1, '1-1500')
+
+    assert result['success']
+    assert result['message'] == "Se crearon 1499 departamentos. Errores: Depto 1207 ya existe"
+    assert sorted(int(numero) for _, numero, _ in database.committed) == [n for n in range(1, 1501) if n != 1207]
+    # Solo el chunk con el conflicto se reintenta fila por fila.
+    assert database.statements == 3 + edificio.BULK_INSERT_CHUNK_SIZE
+
+
+def test_deadlock_rolls_back_the_whole_batch():
+    database = _UnitsDatabase(deadlock_on='1207')
+    result = edificio.create_departamentos_ranges(database, 1, '1-1500')
+
+    assert not result['success']
+    assert database.committed == []
+
+
+@pytest.mark.parametrize('rangos_por_tipo', [{'AUTO': '1-10', 'BICI': '1-5'}, {'': '1-5'}])
+def test_invalid_parking_type_is_rejected_before_inserting(rangos_por_tipo):
+    database = _UnitsDatabase()
+    result = edificio.create_estacionamientos_ranges(database, 1, rangos_por_tipo)
+
+    assert not result['success']
+    assert 'use AUTO o MOTO' in result['message']
+    assert database.statements == 0
+
+
+def test_parking_type_is_normalized():
+    database = _UnitsDatabase()
+    result = edificio.create_estacionamientos_ranges(database, 1, {'auto': '1-3', ' Moto ': '1'})
+
+    assert result['success']
+    assert [(numero, tipo) for _, numero, tipo in database.committed] == [('1', 'AUTO'), ('2', 'AUTO'), ('3', 'AUTO'), ('1', 'MOTO')]
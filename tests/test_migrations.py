@@ -0,0 +1,88 @@
+import mysql.connector
+import pytest
+
+from src.core.db_manager import _explain
+from src.core.migrations import _apply, _explain_plans, _load_module, _parse_sql, list_migrations
+
+# Índice que debe elegir MySQL para cada consulta "-- explain:" / EXPLAIN de las migraciones, una vez aplicadas.
+EXPECTED_KEYS = {
+    (1, 0): 'idx_fecha_pago_id',
+    (1, 1): 'idx_estado_fecha_pago',
+    (1, 2): 'idx_fecha_pago_id',
+    (2, 0): 'idx_estado_nombre',
+    (2, 1): 'idx_residente_estado',
+    (3, 0): 'idx_hash_archivo',
+    (4, 0): 'PRIMARY',
+}
+
+
+def _explain_queries():
+    queries = []
+    for version, name, path, kind in list_migrations():
+        explains = _parse_sql(path)[1] if kind == 'sql' else list(getattr(_load_module(version, path), 'EXPLAIN', []))
+        for position, query in enumerate(explains):
+            queries.append(pytest.param(version, position, query, id=f"{version:03d}_{name}-{position}"))
+    return queries
+
+
+def test_every_explain_query_has_an_expected_index():
+    assert {(p.values[0], p.values[1]) for p in _explain_queries()} == set(EXPECTED_KEYS)
+
+
+def test_all_migrations_applied(db_manager):
+    with db_manager.session():
+        db_manager._ensure_connection()
+        cursor = db_manager.connection.cursor()
+        try:
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+    assert applied == {version for version, _, _, _ in list_migrations()}
+
+
+@pytest.mark.parametrize('version, position, query', _explain_queries())
+def test_explain_queries_use_expected_index(seeded_database, version, position, query):
+    with seeded_database.session():
+        seeded_database._ensure_connection()
+        plan = _explain(seeded_database.connection, query)
+    assert plan[0]['key'] == EXPECTED_KEYS[(version, position)]
+    assert plan[0]['type'] != 'ALL'
+
+
+class _FailingConnection:
+    raise_on_warnings = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, *args):
+        raise mysql.connector.Error(msg="Unknown column 'hash_archivo' in 'where clause'", errno=1054)
+
+    def close(self):
+        pass
+
+
+def test_explain_errors_do_not_abort_migration():
+    assert _explain_plans(_FailingConnection(), "antes", ["SELECT id FROM contratos_archivos WHERE hash_archivo = 'x'"]) == [None]
+
+
+def test_migration_001_replaces_history_scan_with_fecha_pago_index(seeded_database):
+    version, name, path, kind = list_migrations()[0]
+    with seeded_database.session():
+        seeded_database._ensure_connection()
+        cursor = seeded_database.connection.cursor()
+        try:
+            # Se deshace 001 y se vuelve a aplicar para comparar el plan del historial antes y después.
+            cursor.execute("ALTER TABLE registros_pago DROP INDEX idx_fecha_pago_id, DROP INDEX idx_estado_fecha_pago")
+            cursor.execute("DELETE FROM schema_migrations WHERE version = %s", (version,))
+            seeded_database.connection.commit()
+            before, after = _apply(seeded_database, cursor, version, name, path, kind)
+        finally:
+            cursor.close()
+
+    history_before, history_after = before[0][0], after[0][0]
+    assert history_before['table'] == history_after['table'] == 'registros_pago'
+    assert history_before['type'] == 'ALL' or 'filesort' in (history_before['Extra'] or '')
+    assert history_after['key'] == 'idx_fecha_pago_id'
+    assert 'filesort' not in (history_after['Extra'] or '')
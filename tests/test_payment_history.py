@@ -0,0 +1,28 @@
+import pytest
+
+from src.core.db_manager import _explain
+
+
+@pytest.mark.parametrize('filters', [
+    {'fecha_desde': '2020-03-01', 'fecha_hasta': '2020-03-31'},
+    {'fecha_desde': '2020-03-01', 'fecha_hasta': '2020-03-31', 'tipo': 'Multa'},
+], ids=['rango', 'rango_multas'])
+def test_date_filtered_history_uses_fecha_pago_index(seeded_database, filters):
+    query, params = seeded_database._payment_history_query(filters)
+    with seeded_database.session():
+        seeded_database._ensure_connection()
+        plan = {row['table']: row for row in _explain(seeded_database.connection, query, params)}
+
+    assert plan['rp']['key'] == 'idx_fecha_pago_id'
+    assert all(row['type'] != 'ALL' for row in plan.values())
+
+
+def test_abandoned_history_stream_does_not_break_next_report(seeded_database):
+    filters = {'fecha_desde': '2016-01-01', 'fecha_hasta': '2025-12-31'}
+    with seeded_database.session():
+        rows = seeded_database.iter_payment_history(filters)
+        first = [next(rows) for _ in range(10)]
+        rows.close()
+        page = seeded_database.get_payment_history(filters, native=True, page_size=10)
+    assert [r['id'] for r in page['records']] == [r['id'] for r in first]
+    assert seeded_database.report_pool.stats()['in_use'] == 0
@@ -0,0 +1,176 @@
+import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from src.core.db_manager import DBManager
+from src.core.payment_status import build_statuses, decode_bitmap, has_month
+from src.core.periodos import month_index
+
+DUMP_CONTRACT = 91
+
+
+def _query(db_manager, sql, params=()):
+    db_manager._ensure_connection()
+    cursor = db_manager.connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _paid_months(db_manager, contract_id):
+    rows = _query(db_manager, "SELECT mes_base, meses_pagados FROM estado_pagos_contrato WHERE id_contrato = %s", (contract_id,))
+    mes_base, meses_pagados = rows[0]
+    bitmap = decode_bitmap(meses_pagados)
+    return {month for month in range(mes_base, mes_base + bitmap.bit_length()) if has_month(bitmap, mes_base, month)}
+
+
+def test_migration_materializes_every_dump_contract(db_manager):
+    with db_manager.session():
+        contracts = {row[0] for row in _query(db_manager, "SELECT id FROM contratos")}
+        materialized = {row[0] for row in _query(db_manager, "SELECT id_contrato FROM estado_pagos_contrato")}
+        expected = {month_index(row[0]) for row in _query(
+            db_manager, "SELECT periodo FROM registros_pago WHERE id_contrato = %s AND monto_esperado > 0", (DUMP_CONTRACT,))}
+        paid = _paid_months(db_manager, DUMP_CONTRACT)
+    assert contracts <= materialized
+    assert paid == expected
+
+
+def test_status_list_reads_materialized_rows(db_manager):
+    with db_manager.session():
+        rows = db_manager.get_all_active_residents_for_status(native=True)
+    by_contract = {row['id_contrato']: row for row in rows}
+    assert DUMP_CONTRACT in by_contract
+    assert by_contract[DUMP_CONTRACT]['mes_base'] is not None
+    assert by_contract[DUMP_CONTRACT]['primer_mes_impago'] is not None
+
+
+def test_payment_writes_refresh_status(db_manager):
+    periodo = datetime.date(2030, 1, 1)
+    payment = {
+        'id_contrato': DUMP_CONTRACT, 'periodo': periodo.isoformat(), 'monto_esperado': Decimal('85000'),
+        'monto_multa': Decimal('0'), 'monto_pagado': Decimal('85000'), 'observaciones': 'Pago de prueba'
+    }
+    with db_manager.session():
+        ok, message = db_manager.register_bulk_payments([payment])
+        assert ok, message
+        assert month_index(periodo) in _paid_months(db_manager, DUMP_CONTRACT)
+
+        payment_id = _query(db_manager, "SELECT id FROM registros_pago WHERE id_contrato = %s AND periodo = %s",
+                            (DUMP_CONTRACT, periodo))[0][0]
+        ok, message = db_manager.delete_payment_record(payment_id)
+        assert ok, message
+        assert month_index(periodo) not in _paid_months(db_manager, DUMP_CONTRACT)
+
+
+class _RecordingCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class _RecordingConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.cursors = []
+
+    def cursor(self, *args, **kwargs):
+        # Debe ser un cursor de tuplas aunque quien llama use dictionary=True.
+        assert not args and not kwargs
+        cursor = _RecordingCursor(self.rows)
+        self.cursors.append(cursor)
+        return cursor
+
+
+def test_refresh_uses_its_own_tuple_cursor():
+    enero = month_index(datetime.date(2025, 1, 1))
+    connection = _RecordingConnection([(5, datetime.date(2025, 1, 10), enero, 1, datetime.datetime(2025, 1, 12, 9, 30))])
+    manager = DBManager()
+    manager._local.slot = SimpleNamespace(raw=connection)
+
+    manager._refresh_payment_status([5])
+
+    _, upsert_params = connection.cursors[0].executed[1]
+    assert upsert_params == (5, enero, b'\x01', enero + 1, datetime.datetime(2025, 1, 12, 9, 30))
+
+
+class _StatusSource:
+    # Filas con la forma de get_all_active_residents_for_status; las sin materializar traen NULL en estado_pagos_contrato.
+    def __init__(self, contracts, payments):
+        self.contracts = contracts
+        self.payments = payments
+        self.materialized = {}
+        self.refreshed = []
+
+    def get_all_active_residents_for_status(self, native=False):
+        rows = []
+        for contract in self.contracts:
+            mes_base, meses_pagados, primer_mes_impago = self.materialized.get(contract['id_contrato'], (None, None, None))
+            rows.append(dict(contract, mes_base=mes_base, meses_pagados=meses_pagados, primer_mes_impago=primer_mes_impago))
+        return rows
+
+    def refresh_payment_status(self, contract_ids):
+        self.refreshed.extend(contract_ids)
+        rows = [(c['id_contrato'], c['fecha_inicio'], month, True, None)
+                for c in self.contracts if c['id_contrato'] in contract_ids
+                for month in self.payments.get(c['id_contrato'], [None])]
+        for contract_id, mes_base, meses_pagados, primer_mes_impago, _ in build_statuses(rows):
+            self.materialized[contract_id] = (mes_base, meses_pagados, primer_mes_impago)
+        return True
+
+
+def test_status_list_refreshes_contracts_without_materialized_row(pagos, monkeypatch):
+    monkeypatch.setitem(pagos.uf_data_cache, 'date', datetime.date(2025, 6, 20))
+    contract = {'id_residente': 1, 'nombre_completo': 'Residente Al Día', 'rut': '1-9', 'id_contrato': 7,
+                'fecha_inicio': datetime.date(2025, 1, 5), 'nombre_contrato': 'Contrato'}
+    source = _StatusSource([contract], {7: [month_index(datetime.date(2025, m, 1)) for m in range(1, 7)]})
+
+    status = pagos.get_resident_status_list(source)['status_list']
+
+    # Sin recalcular, el contrato figuraría con todos los meses desde enero impagos.
+    assert source.refreshed == [7]
+    assert (status[0]['estado'], status[0]['dias_atraso']) == ('Al día', 0)
+
+
+def test_status_list_reports_error_when_refresh_fails(pagos, monkeypatch):
+    monkeypatch.setitem(pagos.uf_data_cache, 'date', datetime.date(2025, 6, 20))
+    contract = {'id_residente': 1, 'nombre_completo': 'Residente', 'rut': '1-9', 'id_contrato': 7,
+                'fecha_inicio': datetime.date(2025, 1, 5), 'nombre_contrato': 'Contrato'}
+    source = _StatusSource([contract], {})
+    monkeypatch.setattr(source, 'refresh_payment_status', lambda contract_ids: False)
+
+    assert 'error' in pagos.get_resident_status_list(source)
+
+
+def test_save_resident_with_contract_materializes_status(db_manager):
+    with db_manager.session():
+        est_id = _query(db_manager, "SELECT id FROM estacionamientos WHERE estado = 'DISPONIBLE' ORDER BY id LIMIT 1")[0][0]
+        data = {
+            'residente': {'nombre_completo': 'Residente Estado Pagos', 'rut': '11111111-1', 'email': '', 'telefono': ''},
+            'departamentos': [], 'pagadores_secundarios': [], 'vehiculos': [],
+            'estacionamientos': [{'id': est_id}],
+            'contrato': {'id_contrato_archivo': 36, 'fecha_inicio': '2025-03-31'},
+        }
+        ok, message = db_manager.save_resident(data)
+        assert ok, message
+        resident_id, contract_id = _query(
+            db_manager, "SELECT r.id, c.id FROM residentes r JOIN contratos c ON c.id_residente = r.id WHERE r.rut = %s",
+            ('11111111-1',))[0]
+        assert _query(db_manager, "SELECT primer_mes_impago FROM estado_pagos_contrato WHERE id_contrato = %s",
+                      (contract_id,))[0][0] == month_index(datetime.date(2025, 3, 1))
+
+        data['contrato']['fecha_inicio'] = '2025-06-15'
+        ok, message = db_manager.save_resident(data, resident_id)
+        assert ok, message
+        assert _query(db_manager, "SELECT primer_mes_impago FROM estado_pagos_contrato WHERE id_contrato = %s",
+                      (contract_id,))[0][0] == month_index(datetime.date(2025, 6, 1))
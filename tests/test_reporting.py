@@ -0,0 +1,95 @@
+import mysql.connector
+import pytest
+
+from settings.config import DB_REPORT_POOL_CONFIG, REPORT_WORKERS
+from src.core.db_manager import DBManager
+from src.core.db_pool import ConnectionPool, PoolTimeout
+
+
+def test_report_pool_is_larger_than_report_workers(fake_connect):
+    # Con todas las exportaciones transmitiendo a la vez debe quedar al menos una conexión para las pantallas.
+    assert DB_REPORT_POOL_CONFIG['size'] > REPORT_WORKERS
+    manager = DBManager()
+    manager.report_pool_config = {**DB_REPORT_POOL_CONFIG, 'size': 1}
+    pool = manager._open_report_pool()
+    try:
+        assert pool.size == REPORT_WORKERS + 1
+        exports = [pool.acquire() for _ in range(REPORT_WORKERS)]
+        pool.release(pool.acquire())
+        for slot in exports:
+            pool.release(slot)
+    finally:
+        pool.close()
+
+
+def test_exhausted_pool_raises_instead_of_returning_no_connection(fake_connect):
+    manager = DBManager()
+    manager.pool = ConnectionPool({}, size=1, timeout=0.05)
+    busy = manager.pool.acquire()
+    try:
+        with pytest.raises(PoolTimeout):
+            manager._ensure_connection()
+        assert manager.connection is None
+    finally:
+        manager.pool.release(busy)
+        manager.pool.close()
+
+
+class _StreamingCursor:
+    description = (('id', 3, None, None, None, None, 0, 0, None),)
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, query, params=()):
+        # Igual que mysql-connector: no se puede usar la conexión con un resultado sin leer.
+        if self.connection.unread:
+            raise mysql.connector.InternalError(msg="Unread result found")
+        self.rows = [(i,) for i in range(1200)]
+        self.connection.unread = True
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        if not batch:
+            self.connection.unread = False
+        return batch
+
+    def close(self):
+        if self.connection.unread:
+            raise mysql.connector.InternalError(msg="Unread result found")
+
+
+class _StreamingConnection:
+    in_transaction = False
+
+    def __init__(self, **config):
+        self.unread = False
+
+    def cursor(self, *args, **kwargs):
+        return _StreamingCursor(self)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+    def consume_results(self):
+        self.unread = False
+
+
+@pytest.mark.parametrize('report_pool', [True, False], ids=['pool_reportes', 'conexion_principal'])
+def test_abandoned_export_stream_leaves_connection_usable(monkeypatch, report_pool):
+    monkeypatch.setattr(mysql.connector, 'connect', _StreamingConnection)
+    manager = DBManager()
+    manager.pool = ConnectionPool({}, size=1)
+    manager.report_pool = ConnectionPool({}, size=1) if report_pool else None
+    try:
+        with manager.session():
+            rows = manager.iter_payment_audit_log()
+            assert next(rows) == {'id': 0}
+            rows.close()
+            assert len(list(manager.iter_payment_audit_log())) == 1200
+    finally:
+        manager.close()
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from src.core.search_index import MAX_RESULTS, MIN_TERM_LENGTH, ResidentSearchIndex, normalize_code, normalize_text
+
+NOMBRES = ['José', 'María', 'Ana', 'Pedro', 'Núñez', 'González', 'Pérez', 'Muñoz', 'Rojas', 'Díaz']
+
+
+def _residents(count, seed=8):
+    rng = random.Random(seed)
+    rows = []
+    for rid in range(1, count + 1):
+        nombre = ' '.join(rng.sample(NOMBRES, 3))
+        rut = f"{rng.randint(5_000_000, 25_000_000):,}".replace(',', '.') + f"-{rng.choice('0123456789K')}"
+        patentes = [f"{rng.choice('BCDFGH')}{rng.choice('BCDFGH')}{rng.choice('JKLPRS')}{rng.randint(10, 99)}{rng.randint(10, 99)}"
+                    for _ in range(rng.randint(0, 2))]
+        rows.append((rid, nombre, rut, rng.choice(('Activo', 'Inactivo')), patentes))
+    return rows
+
+
+def _expected(rows, term):
+    # Búsqueda lineal equivalente: subcadena del nombre normalizado o del RUT/patente sin puntos ni guiones.
+    terms = {normalize_text(term), normalize_code(term)}
+    return {rid for rid, fields in rows.items() if any(t in field for t in terms for field in fields)}
+
+
+@pytest.fixture(scope='module')
+def residents():
+    return _residents(300)
+
+
+@pytest.fixture
+def index(residents):
+    index = ResidentSearchIndex()
+    index.load(residents)
+    return index
+
+
+def test_search_matches_linear_scan(residents, index):
+    fields = {rid: [normalize_text(nombre), normalize_code(rut), *map(normalize_code, patentes)]
+              for rid, nombre, rut, _, patentes in residents}
+    rng = random.Random(80)
+    for _ in range(200):
+        _, nombre, rut, _, patentes = rng.choice(residents)
+        source = rng.choice([nombre, rut, *patentes])
+        start = rng.randrange(max(1, len(source) - 5))
+        term = source[start:start + rng.randint(4, 8)]
+        expected = _expected(fields, term)
+        assert len(expected) <= MAX_RESULTS
+        if len(normalize_text(term)) >= MIN_TERM_LENGTH and len(normalize_code(term)) >= MIN_TERM_LENGTH:
+            assert index.search(term) == expected, term
+
+
+@pytest.mark.parametrize('term', ['a', 'Jo', '  ', '1-2'])
+def test_short_terms_fall_back_to_like(index, term):
+    assert index.search(term) is None
+
+
+def test_broad_terms_fall_back_to_like():
+    rows = [(rid, f"Residente {rid}", f"{rid}-K", 'Activo', ()) for rid in range(1, MAX_RESULTS + 2)]
+    index = ResidentSearchIndex()
+    index.load(rows)
+
+    assert index.search('resid') is None
+    assert index.search('resid', 'Inactivo') == set()
+    assert index.search('Residente 1000') == {1000}
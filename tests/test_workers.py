@@ -0,0 +1,32 @@
+import sys
+
+from src.core.workers import WorkerPool
+
+APP_MODULES = ('app', 'src.core.db_manager', 'src.core.db_pool', 'src.core.pagos')
+
+
+def _child_state(records):
+    # Se ejecuta en el proceso hijo: informa qué módulos de la aplicación cargó y qué filas recibió.
+    return [name for name in APP_MODULES if name in sys.modules], records
+
+
+def test_process_render_sends_plain_rows_without_loading_app():
+    pool = WorkerPool('test', kind='process', workers=1)
+    try:
+        loaded, records = pool.render(_child_state, ({'id': i} for i in range(3)))
+    finally:
+        pool.shutdown()
+
+    assert loaded == []
+    assert records == [{'id': 0}, {'id': 1}, {'id': 2}]
+
+
+def test_thread_render_keeps_streaming_rows():
+    rows = iter([{'id': 1}])
+    pool = WorkerPool('test', kind='thread', workers=1)
+    try:
+        _, records = pool.render(_child_state, rows)
+    finally:
+        pool.shutdown()
+
+    assert records is rows